@@ -1,13 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 import os
 import base64
-import uuid
 from app.api.deps import get_db
 from app.core.config import settings
+from app.core.terminal_ui import ui
+from app.models.assets import ProjectAsset
 from app.models.projects import Project as ProjectModel
-from app.services.assets import write_bytes
+from app.services.assets import (
+    AssetError,
+    asset_path,
+    asset_to_dict,
+    store_stream,
+    upload_chunks,
+    write_bytes
+)
 
 router = APIRouter(prefix="/api/assets", tags=["assets"]) 
 
@@ -30,44 +39,65 @@ async def upload_logo(project_id: str, body: LogoRequest, db: Session = Depends(
 
 @router.post("/{project_id}/upload")
 async def upload_image(project_id: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload an image file to project assets directory"""
-    print(f"📤 Image upload request: project_id={project_id}, filename={file.filename}")
-    
+    """Upload an image file to project assets directory (stored once per content hash)"""
     # Verify project exists
     row = db.get(ProjectModel, project_id)
     if not row:
-        print(f"❌ Project not found: {project_id}")
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Check if file is an image
-    print(f"📁 File info: content_type={file.content_type}, size={file.size}")
     if not file.content_type or not file.content_type.startswith('image/'):
-        print(f"❌ Invalid file type: {file.content_type}")
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Create assets directory if it doesn't exist
-    project_assets = os.path.join(settings.projects_root, project_id, "assets")
-    print(f"📁 Assets directory: {project_assets}")
-    os.makedirs(project_assets, exist_ok=True)
+    return await _store_upload(db, project_id, upload_chunks(file), file.filename, file.content_type)
+
+
+@router.put("/{project_id}/upload/stream")
+async def upload_image_stream(project_id: str, request: Request, filename: str | None = None,
+                              db: Session = Depends(get_db)):
+    """Upload an image sent as the raw request body, streamed to disk as it arrives"""
+    row = db.get(ProjectModel, project_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Project not found")
     
-    # Generate unique filename to avoid conflicts
-    file_extension = os.path.splitext(file.filename or 'image.png')[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(project_assets, unique_filename)
-    print(f"💾 Saving to: {file_path}")
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip()
+    if not content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
     
+    return await _store_upload(db, project_id, request.stream(), filename, content_type)
+
+
+async def _store_upload(db: Session, project_id: str, chunks, filename: str | None, content_type: str) -> dict:
     try:
-        # Save file
-        content = await file.read()
-        write_bytes(file_path, content)
-        print(f"✅ File saved successfully: {len(content)} bytes")
-        
-        return {
-            "path": f"assets/{unique_filename}",
-            "absolute_path": file_path,
-            "filename": unique_filename,
-            "original_filename": file.filename
-        }
+        asset, created = await store_stream(db, project_id, chunks, filename, content_type)
+    except AssetError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
-        print(f"❌ Failed to save file: {e}")
+        ui.error(f"Failed to save upload: {e}", "Assets")
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    
+    ui.info(f"{'Stored' if created else 'Reused'} asset {asset.filename} ({asset.size} bytes)", "Assets")
+    return {
+        **asset_to_dict(asset),
+        "deduplicated": not created
+    }
+
+
+@router.get("/{project_id}/assets/{asset_id}")
+async def get_asset(project_id: str, asset_id: str, db: Session = Depends(get_db)):
+    """Asset metadata, including thumbnail processing status"""
+    asset = db.get(ProjectAsset, asset_id)
+    if not asset or asset.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset_to_dict(asset)
+
+
+@router.get("/{project_id}/assets/{asset_id}/thumbnail")
+async def get_asset_thumbnail(project_id: str, asset_id: str, db: Session = Depends(get_db)):
+    """Thumbnail image of an asset (404 until the workers have made it)"""
+    asset = db.get(ProjectAsset, asset_id)
+    if not asset or asset.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    if not asset.thumbnail_filename:
+        raise HTTPException(status_code=404, detail=f"Thumbnail not available ({asset.processing_status})")
+    return FileResponse(asset_path(asset, asset.thumbnail_filename))
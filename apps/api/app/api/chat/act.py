@@ -2,15 +2,16 @@
 Act Execution API Endpoints
 Handles CLI execution and AI actions
 """
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 import uuid
 import asyncio
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from app.api.deps import get_db
+from app.db.session import SessionLocal
 from app.models.projects import Project
 from app.models.messages import Message
 from app.models.sessions import Session as ChatSession
@@ -18,17 +19,27 @@ from app.models.commits import Commit
 from app.models.user_requests import UserRequest
 from app.services.cli.unified_manager import UnifiedCLIManager, CLIType
 from app.services.git_ops import commit_all
+from app.services.scheduler import scheduler, ScheduledRun, SchedulerError
+from app.services.assets import AssetError, prepare_attachments, resolve_assets
 from app.core.websocket.manager import manager
 from app.core.terminal_ui import ui
+from app.core.tracing import tracer
 
 
 router = APIRouter()
 
 
 class ImageAttachment(BaseModel):
-    name: str
-    base64_data: str
+    name: str = ""
+    base64_data: str | None = None
     mime_type: str = "image/jpeg"
+    asset_id: str | None = None  # Asset uploaded via /api/assets/{project_id}/upload, instead of inline data
+
+    @model_validator(mode="after")
+    def _require_content(self):
+        if not self.base64_data and not self.asset_id:
+            raise ValueError("Image attachment needs base64_data or asset_id")
+        return self
 
 
 class ActRequest(BaseModel):
@@ -38,6 +49,10 @@ class ActRequest(BaseModel):
     fallback_enabled: bool = True
     images: List[ImageAttachment] = []
     is_initial_prompt: bool = False
+    priority: int = 0  # Higher runs first within the project's queue
+    reject_if_busy: bool = False  # Fail with 409 instead of queueing behind a running request
+    timeout_seconds: int | None = None  # Wall-clock budget (defaults to RUN_TIMEOUT_SECONDS, 0 = none)
+    token_budget: int | None = None  # Token budget (defaults to RUN_TOKEN_BUDGET, 0 = none)
 
 
 class ActResponse(BaseModel):
@@ -45,6 +60,36 @@ class ActResponse(BaseModel):
     conversation_id: str
     status: str
     message: str
+    request_id: str | None = None
+    queue_position: int | None = None  # 0 = running, 1+ = waiting
+
+
+async def attach_images(
+    db: Session,
+    project_id: str,
+    instruction: str,
+    images: List[ImageAttachment]
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Store/resolve image attachments as project assets and list their paths in the instruction"""
+    if not images:
+        return instruction, []
+    attachments = await prepare_attachments(db, project_id, images)
+    references = [
+        path for path in dict.fromkeys(attachment["path"] for attachment in attachments) if path not in instruction
+    ]
+    if references:
+        instruction = instruction + "\n\n" + "\n".join(
+            f"Image #{index} path: {path}" for index, path in enumerate(references, 1)
+        )
+    return instruction, attachments
+
+
+def check_image_references(db: Session, project_id: str, images: List[ImageAttachment]) -> None:
+    """Reject a request referencing assets the project does not have"""
+    try:
+        resolve_assets(db, project_id, [image.asset_id for image in images if image.asset_id])
+    except AssetError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
 async def execute_act_instruction(
@@ -113,7 +158,10 @@ async def execute_chat_task(
     db: Session,
     cli_preference: CLIType = None,
     fallback_enabled: bool = True,
-    is_initial_prompt: bool = False
+    is_initial_prompt: bool = False,
+    request_id: str = None,
+    timeout_seconds: Optional[int] = None,
+    token_budget: Optional[int] = None
 ):
     """Background task for executing Chat instructions"""
     try:
@@ -136,6 +184,14 @@ async def execute_chat_task(
         
         # Update session status to running
         session.status = "running"
+        
+        if request_id:
+            user_request = db.query(UserRequest).filter(UserRequest.id == request_id).first()
+            if user_request:
+                user_request.started_at = datetime.utcnow()
+                user_request.cli_type_used = cli_preference.value
+                user_request.model_used = project_selected_model
+        
         db.commit()
         
         # Send chat_start event to trigger loading indicator
@@ -143,7 +199,8 @@ async def execute_chat_task(
             "type": "chat_start",
             "data": {
                 "session_id": session.id,
-                "instruction": instruction
+                "instruction": instruction,
+                "request_id": request_id
             }
         })
         
@@ -153,25 +210,43 @@ async def execute_chat_task(
             project_path=project_repo_path,
             session_id=session.id,
             conversation_id=conversation_id,
-            db=db
+            db=db,
+            timeout_seconds=timeout_seconds,
+            token_budget=token_budget
         )
         
+        # Attached images become files on disk the CLI is pointed at
+        cli_instruction, attachments = await attach_images(db, project_id, instruction, images)
+        
         result = await cli_manager.execute_instruction(
-            instruction=instruction,
+            instruction=cli_instruction,
             cli_type=cli_preference,
             fallback_enabled=project_fallback_enabled,
-            images=images,
+            images=attachments,
             model=project_selected_model,
             is_initial_prompt=is_initial_prompt
         )
         
         
+        # Run stopped by its time/token budget
+        if result and result.get("cancelled"):
+            await mark_request_cancelled(db, project_id, session.id, request_id, "chat", reason=result.get("error"))
+            return
+        
         # Handle result
         if result and result.get("success"):
             # For chat mode, we don't commit changes - just update session status
             session.status = "completed"
             session.completed_at = datetime.utcnow()
             
+            if request_id:
+                user_request = db.query(UserRequest).filter(UserRequest.id == request_id).first()
+                if user_request:
+                    user_request.is_completed = True
+                    user_request.is_successful = True
+                    user_request.completed_at = datetime.utcnow()
+                    user_request.result_metadata = {"cli_used": result.get("cli_used")}
+            
         else:
             # Error message
             error_msg = Message(
@@ -194,6 +269,14 @@ async def execute_chat_task(
             session.error = result.get("error") if result else "No CLI available"
             session.completed_at = datetime.utcnow()
             
+            if request_id:
+                user_request = db.query(UserRequest).filter(UserRequest.id == request_id).first()
+                if user_request:
+                    user_request.is_completed = True
+                    user_request.is_successful = False
+                    user_request.completed_at = datetime.utcnow()
+                    user_request.error_message = result.get("error") if result else "No CLI available"
+            
             # Send error message via WebSocket
             error_data = {
                 "id": error_msg.id,
@@ -218,7 +301,8 @@ async def execute_chat_task(
             "type": "chat_complete",
             "data": {
                 "status": session.status,
-                "session_id": session.id
+                "session_id": session.id,
+                "request_id": request_id
             }
         })
         
@@ -230,6 +314,14 @@ async def execute_chat_task(
         session.error = str(e)
         session.completed_at = datetime.utcnow()
         
+        if request_id:
+            user_request = db.query(UserRequest).filter(UserRequest.id == request_id).first()
+            if user_request:
+                user_request.is_completed = True
+                user_request.is_successful = False
+                user_request.completed_at = datetime.utcnow()
+                user_request.error_message = str(e)
+        
         error_msg = Message(
             id=str(uuid.uuid4()),
             project_id=project_id,
@@ -250,6 +342,7 @@ async def execute_chat_task(
             "data": {
                 "status": "failed",
                 "session_id": session.id,
+                "request_id": request_id,
                 "error": str(e)
             }
         })
@@ -265,7 +358,9 @@ async def execute_act_task(
     cli_preference: CLIType = None,
     fallback_enabled: bool = True,
     is_initial_prompt: bool = False,
-    request_id: str = None
+    request_id: str = None,
+    timeout_seconds: Optional[int] = None,
+    token_budget: Optional[int] = None
 ):
     """Background task for executing Act instructions"""
     try:
@@ -315,14 +410,19 @@ async def execute_act_task(
             project_path=project_repo_path,
             session_id=session.id,
             conversation_id=conversation_id,
-            db=db
+            db=db,
+            timeout_seconds=timeout_seconds,
+            token_budget=token_budget
         )
         
+        # Attached images become files on disk the CLI is pointed at
+        cli_instruction, attachments = await attach_images(db, project_id, instruction, images)
+        
         result = await cli_manager.execute_instruction(
-            instruction=instruction,
+            instruction=cli_instruction,
             cli_type=cli_preference,
             fallback_enabled=project_fallback_enabled,
-            images=images,
+            images=attachments,
             model=project_selected_model,
             is_initial_prompt=is_initial_prompt
         )
@@ -331,12 +431,18 @@ async def execute_act_task(
         # Handle result
         ui.info(f"Result received: success={result.get('success') if result else None}, cli={result.get('cli_used') if result else None}", "ACT")
         
+        # Run stopped by its time/token budget
+        if result and result.get("cancelled"):
+            await mark_request_cancelled(db, project_id, session.id, request_id, "act", reason=result.get("error"))
+            return
+        
         if result and result.get("success"):
             # Commit changes if any
             if result.get("has_changes"):
                 try:
                     commit_message = f"🤖 {result.get('cli_used', 'AI')}: {instruction[:100]}"
-                    commit_result = commit_all(project_repo_path, commit_message)
+                    with tracer.span("git.commit"):
+                        commit_result = commit_all(project_repo_path, commit_message)
                     
                     if commit_result["success"]:
                         commit = Commit(
@@ -495,11 +601,134 @@ async def execute_act_task(
         })
 
 
+async def mark_request_cancelled(
+    db: Session,
+    project_id: str,
+    session_id: Optional[str],
+    request_id: Optional[str],
+    request_type: str = "act",
+    reason: str = "Cancelled by user"
+):
+    """Mark the UserRequest and Session rows of a cancelled run and notify clients"""
+    now = datetime.utcnow()
+    
+    user_request = db.get(UserRequest, request_id) if request_id else None
+    if user_request and not user_request.is_completed:
+        user_request.is_completed = True
+        user_request.is_successful = False
+        user_request.completed_at = now
+        user_request.error_message = reason
+        user_request.result_metadata = {**(user_request.result_metadata or {}), "cancelled": True}
+    
+    session = db.get(ChatSession, session_id) if session_id else None
+    if session and session.status not in ("completed", "failed"):
+        session.status = "cancelled"
+        session.completed_at = now
+    
+    db.commit()
+    
+    await manager.broadcast_to_project(project_id, {
+        "type": f"{request_type}_complete",
+        "data": {
+            "status": "cancelled",
+            "session_id": session_id,
+            "request_id": request_id,
+            "error": reason
+        }
+    })
+
+
+async def run_scheduled_task(
+    request_type: str,
+    project_info: dict,
+    session_id: str,
+    instruction: str,
+    conversation_id: str,
+    images: List[ImageAttachment],
+    cli_preference: CLIType,
+    fallback_enabled: bool,
+    is_initial_prompt: bool,
+    request_id: str,
+    timeout_seconds: Optional[int] = None,
+    token_budget: Optional[int] = None
+):
+    """Scheduler entry point: runs an ACT/chat task with its own DB session"""
+    # The request-scoped session is closed once the endpoint returns, so open a dedicated one
+    db = SessionLocal()
+    try:
+        session = db.get(ChatSession, session_id)
+        if not session:
+            ui.error(f"Session {session_id} not found for request {request_id[:8]}...", "Scheduler")
+            return
+        
+        task = execute_act_task if request_type == "act" else execute_chat_task
+        with tracer.trace(request_id, f"{request_type}.run", project_id=project_info['id']):
+            await task(
+                project_info,
+                session,
+                instruction,
+                conversation_id,
+                images,
+                db,
+                cli_preference,
+                fallback_enabled,
+                is_initial_prompt,
+                request_id,
+                timeout_seconds=timeout_seconds,
+                token_budget=token_budget
+            )
+    except asyncio.CancelledError:
+        db.rollback()
+        await mark_request_cancelled(db, project_info['id'], session_id, request_id, request_type)
+        raise
+    finally:
+        db.close()
+
+
+async def schedule_run(
+    request_type: str,
+    project_info: dict,
+    session_id: str,
+    body: ActRequest,
+    conversation_id: str,
+    cli_preference: CLIType,
+    fallback_enabled: bool,
+    request_id: str
+) -> int:
+    """Hand a persisted request over to the execution scheduler. Returns its queue position."""
+    async def runner():
+        await run_scheduled_task(
+            request_type,
+            project_info,
+            session_id,
+            body.instruction,
+            conversation_id,
+            body.images,
+            cli_preference,
+            fallback_enabled,
+            body.is_initial_prompt,
+            request_id,
+            timeout_seconds=body.timeout_seconds,
+            token_budget=body.token_budget
+        )
+    
+    return await scheduler.submit(
+        ScheduledRun(
+            request_id=request_id,
+            project_id=project_info['id'],
+            cli_type=cli_preference.value,
+            runner=runner,
+            priority=body.priority,
+            request_type=request_type
+        ),
+        reject_if_busy=body.reject_if_busy
+    )
+
+
 @router.post("/{project_id}/act", response_model=ActResponse)
 async def run_act(
     project_id: str,
     body: ActRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Execute instruction using unified CLI system"""
@@ -511,6 +740,14 @@ async def run_act(
         ui.error(f"Project {project_id} not found", "ACT API")
         raise HTTPException(status_code=404, detail="Project not found")
     
+    check_image_references(db, project_id, body.images)
+    
+    # Reject early (before persisting anything) if the scheduler would not accept the run
+    try:
+        scheduler.check_admission(project_id, reject_if_busy=body.reject_if_busy)
+    except SchedulerError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
     # Determine CLI preference
     cli_preference = CLIType(body.cli_preference or project.preferred_cli)
     fallback_enabled = body.fallback_enabled if body.fallback_enabled is not None else project.fallback_enabled
@@ -527,7 +764,8 @@ async def run_act(
             "type": "act_instruction",
             "cli_preference": cli_preference.value,
             "fallback_enabled": fallback_enabled,
-            "has_images": len(body.images) > 0
+            "has_images": len(body.images) > 0,
+            "asset_ids": [image.asset_id for image in body.images if image.asset_id]
         },
         conversation_id=conversation_id,
         created_at=datetime.utcnow()
@@ -594,25 +832,23 @@ async def run_act(
         'selected_model': project.selected_model
     }
     
-    # Add background task
-    background_tasks.add_task(
-        execute_act_task,
-        project_info,
-        session,
-        body.instruction,
-        conversation_id,
-        body.images,
-        db,
-        cli_preference,
-        fallback_enabled,
-        body.is_initial_prompt,
-        request_id
-    )
+    # Queue the run (starts immediately when the project and CLI have a free slot)
+    try:
+        queue_position = await schedule_run(
+            "act", project_info, session.id, body, conversation_id,
+            cli_preference, fallback_enabled, request_id
+        )
+    except SchedulerError as e:
+        await mark_request_cancelled(db, project_id, session.id, request_id, "act", reason=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
     return ActResponse(
         session_id=session.id,
         conversation_id=conversation_id,
-        status="running",
-        message="Act execution started"
+        status="running" if queue_position == 0 else "queued",
+        message="Act execution started" if queue_position == 0 else f"Act execution queued (position {queue_position})",
+        request_id=request_id,
+        queue_position=queue_position
     )
 
 
@@ -620,7 +856,6 @@ async def run_act(
 async def run_chat(
     project_id: str,
     body: ActRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Execute chat instruction using unified CLI system (same as act but different event type)"""
@@ -631,6 +866,14 @@ async def run_chat(
         ui.error(f"Project {project_id} not found", "CHAT API")
         raise HTTPException(status_code=404, detail="Project not found")
     
+    check_image_references(db, project_id, body.images)
+    
+    # Reject early (before persisting anything) if the scheduler would not accept the run
+    try:
+        scheduler.check_admission(project_id, reject_if_busy=body.reject_if_busy)
+    except SchedulerError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
     # Determine CLI preference
     cli_preference = CLIType(body.cli_preference or project.preferred_cli)
     fallback_enabled = body.fallback_enabled if body.fallback_enabled is not None else project.fallback_enabled
@@ -647,7 +890,8 @@ async def run_chat(
             "type": "chat_instruction",
             "cli_preference": cli_preference.value,
             "fallback_enabled": fallback_enabled,
-            "has_images": len(body.images) > 0
+            "has_images": len(body.images) > 0,
+            "asset_ids": [image.asset_id for image in body.images if image.asset_id]
         },
         conversation_id=conversation_id,
         created_at=datetime.utcnow()
@@ -665,6 +909,19 @@ async def run_chat(
     )
     db.add(session)
     
+    # Track the chat run as a UserRequest so the scheduler queue state is persisted
+    request_id = str(uuid.uuid4())
+    user_request = UserRequest(
+        id=request_id,
+        project_id=project_id,
+        user_message_id=user_message.id,
+        session_id=session.id,
+        instruction=body.instruction,
+        request_type="chat",
+        created_at=datetime.utcnow()
+    )
+    db.add(user_request)
+    
     try:
         db.commit()
     except Exception as e:
@@ -684,6 +941,7 @@ async def run_chat(
                 "parent_message_id": None,
                 "session_id": session.id,
                 "conversation_id": conversation_id,
+                "request_id": request_id,
                 "created_at": user_message.created_at.isoformat()
             },
             "timestamp": user_message.created_at.isoformat()
@@ -700,23 +958,54 @@ async def run_chat(
         'selected_model': project.selected_model
     }
     
-    # Add background task for chat (same as act but with different event type)
-    background_tasks.add_task(
-        execute_chat_task,
-        project_info,
-        session,
-        body.instruction,
-        conversation_id,
-        body.images,
-        db,
-        cli_preference,
-        fallback_enabled,
-        body.is_initial_prompt
-    )
+    # Queue the chat run (same as act but with different event type)
+    try:
+        queue_position = await schedule_run(
+            "chat", project_info, session.id, body, conversation_id,
+            cli_preference, fallback_enabled, request_id
+        )
+    except SchedulerError as e:
+        await mark_request_cancelled(db, project_id, session.id, request_id, "chat", reason=e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     
     return ActResponse(
         session_id=session.id,
         conversation_id=conversation_id,
-        status="running",
-        message="Chat execution started"
-    )
\ No newline at end of file
+        status="running" if queue_position == 0 else "queued",
+        message="Chat execution started" if queue_position == 0 else f"Chat execution queued (position {queue_position})",
+        request_id=request_id,
+        queue_position=queue_position
+    )
+
+
+@router.get("/{project_id}/queue")
+async def get_project_queue(project_id: str, db: Session = Depends(get_db)):
+    """Get the running and queued ACT/chat requests for a project"""
+    project = db.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return scheduler.snapshot(project_id)
+
+
+@router.post("/{project_id}/requests/{request_id}/cancel")
+async def cancel_request(project_id: str, request_id: str, db: Session = Depends(get_db)):
+    """Cancel a queued or running ACT/chat request"""
+    user_request = db.get(UserRequest, request_id)
+    if not user_request or user_request.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Request not found")
+    
+    if user_request.is_completed:
+        return {"request_id": request_id, "status": user_request.status}
+    
+    location = await scheduler.cancel(request_id)
+    if location == "running":
+        # The running task marks its rows as cancelled while unwinding
+        ui.info(f"Cancelling running request {request_id[:8]}...", "Scheduler")
+        return {"request_id": request_id, "status": "cancelling"}
+    
+    # Queued (or orphaned) request: nothing is executing, so finalize it here
+    await mark_request_cancelled(
+        db, project_id, user_request.session_id, request_id, user_request.request_type or "act"
+    )
+    return {"request_id": request_id, "status": "cancelled"}
\ No newline at end of file
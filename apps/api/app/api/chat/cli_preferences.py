@@ -10,6 +10,7 @@ from typing import Optional, Dict, Any
 from app.api.deps import get_db
 from app.models.projects import Project
 from app.services.cli import UnifiedCLIManager, CLIType
+from app.services.cli.session_cache import project_sessions
 
 
 router = APIRouter()
@@ -42,31 +43,27 @@ class AllCLIStatusResponse(BaseModel):
 @router.get("/{project_id}/cli/available")
 async def get_cli_available(project_id: str, db: Session = Depends(get_db)):
     """Get CLI information for project (used by frontend ProjectSettings)"""
-    project = db.get(Project, project_id)
-    if not project:
+    state = project_sessions.get(project_id)
+    if not state.persisted:
         raise HTTPException(status_code=404, detail="Project not found")
     
     return {
-        "current_preference": project.preferred_cli,
-        "current_model": project.selected_model,
-        "fallback_enabled": project.fallback_enabled
+        "current_preference": state.preferred_cli,
+        "current_model": state.selected_model,
+        "fallback_enabled": state.fallback_enabled
     }
 
 
 @router.get("/{project_id}/cli-preference")
 async def get_cli_preference(project_id: str, db: Session = Depends(get_db)):
     """Get current CLI preference for a project"""
-    project = db.get(Project, project_id)
-    if not project:
+    state = project_sessions.get(project_id)
+    if not state.persisted:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Handle projects that might not have these fields set
-    preferred_cli = getattr(project, 'preferred_cli', 'claude')
-    selected_model = getattr(project, 'selected_model', None)
-    
     return {
-        "preferred_cli": preferred_cli,
-        "selected_model": selected_model
+        "preferred_cli": state.preferred_cli,
+        "selected_model": state.selected_model
     }
 
 
@@ -77,10 +74,6 @@ async def set_cli_preference(
     db: Session = Depends(get_db)
 ):
     """Set CLI preference for a project"""
-    project = db.get(Project, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
     # Validate CLI type
     try:
         cli_type = CLIType(body.preferred_cli)
@@ -90,12 +83,12 @@ async def set_cli_preference(
             detail=f"Invalid CLI type: {body.preferred_cli}"
         )
     
-    # Update project preferences
-    project.preferred_cli = cli_type.value
-    db.commit()
+    # Update project preferences (row and cache)
+    if not project_sessions.set_preferences(project_id, preferred_cli=cli_type.value):
+        raise HTTPException(status_code=404, detail="Project not found")
     
     return {
-        "preferred_cli": project.preferred_cli,
+        "preferred_cli": cli_type.value,
         "message": f"CLI preference updated to {cli_type.value}"
     }
 
@@ -107,15 +100,11 @@ async def set_model_preference(
     db: Session = Depends(get_db)
 ):
     """Set model preference for a project"""
-    project = db.get(Project, project_id)
-    if not project:
+    if not project_sessions.set_preferences(project_id, selected_model=body.model_id):
         raise HTTPException(status_code=404, detail="Project not found")
     
-    project.selected_model = body.model_id
-    db.commit()
-    
     return {
-        "selected_model": project.selected_model,
+        "selected_model": body.model_id,
         "message": f"Model preference updated to {body.model_id}"
     }
 
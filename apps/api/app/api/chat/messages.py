@@ -14,6 +14,8 @@ from app.models.projects import Project
 from app.models.messages import Message
 from app.models.user_requests import UserRequest
 from app.core.websocket.manager import manager
+from app.services.message_metadata import load_raw_event
+from app.services.transcripts import message_record, transcripts
 
 
 router = APIRouter()
@@ -61,29 +63,53 @@ async def get_messages(
     
     messages = query.order_by(Message.created_at.desc()).limit(limit).all()
     
+    # Older sessions live in transcript files; merge their newest records with the table rows
+    # unless the table alone already fills the page with messages newer than anything archived
+    records = [message_record(msg) for msg in messages]
+    if len(messages) < limit or (messages and transcripts.may_hold_newer(messages[-1].created_at)):
+        records.extend(await transcripts.recent_messages(db, project_id, limit, conversation_id, cli_filter))
+        records.sort(key=lambda record: record["created_at"])
+        records = records[-limit:] if limit else []
+    else:
+        records.reverse()
+    
     # Filter out messages marked as hidden from UI
-    filtered_messages = []
-    for msg in messages:
-        if msg.metadata_json and msg.metadata_json.get("hidden_from_ui", False):
+    filtered_records = []
+    for record in records:
+        metadata = record.get("metadata_json")
+        if metadata and metadata.get("hidden_from_ui", False):
             continue  # Skip hidden messages
-        filtered_messages.append(msg)
+        filtered_records.append(record)
     
     return [
         MessageResponse(
-            id=msg.id,
-            role=msg.role,
-            message_type=msg.message_type,
-            content=msg.content,
-            metadata_json=msg.metadata_json,
-            parent_message_id=msg.parent_message_id,
-            session_id=msg.session_id,
-            conversation_id=msg.conversation_id,
-            cli_source=msg.metadata_json.get("cli_type") if msg.metadata_json else None,
-            created_at=msg.created_at
-        ) for msg in reversed(filtered_messages)
+            id=record["id"],
+            role=record["role"],
+            message_type=record.get("message_type"),
+            content=record["content"],
+            metadata_json=record.get("metadata_json"),
+            parent_message_id=record.get("parent_message_id"),
+            session_id=record.get("session_id"),
+            conversation_id=record.get("conversation_id"),
+            cli_source=record["metadata_json"].get("cli_type") if record.get("metadata_json") else None,
+            created_at=datetime.fromisoformat(record["created_at"])
+        ) for record in filtered_records
     ]
 
 
+@router.get("/{project_id}/messages/{message_id}/event")
+async def get_message_event(project_id: str, message_id: str, db: Session = Depends(get_db)):
+    """Get the raw CLI event a message was built from (kept out of metadata_json)"""
+    message = db.get(Message, message_id)
+    if not message or message.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    raw_event = load_raw_event(db, message_id)
+    if raw_event is None:
+        raise HTTPException(status_code=404, detail="No raw event stored for this message")
+    return raw_event
+
+
 @router.get("/{project_id}/active-session")
 async def get_active_session(project_id: str, db: Session = Depends(get_db)):
     """Get the currently active session for a project"""
@@ -219,6 +245,7 @@ async def clear_messages(
     
     deleted_count = query.delete()
     db.commit()
+    deleted_count += transcripts.delete_messages(db, project_id, conversation_id)
     
     await manager.send_message(project_id, {
         "type": "messages_cleared",
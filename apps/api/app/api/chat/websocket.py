@@ -22,7 +22,8 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str):
         while True:
             try:
                 data = await websocket.receive_text()
-                ui.debug(f"Received data: {data}", "WebSocket")
+                if ui.debug_enabled:
+                    ui.debug(f"Received data: {data}", "WebSocket")
                 # Handle incoming WebSocket messages if needed
                 # For now, we just maintain the connection
             except WebSocketDisconnect:
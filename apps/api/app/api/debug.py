@@ -0,0 +1,24 @@
+"""
+Debug API
+Request trace waterfalls
+"""
+from fastapi import APIRouter, HTTPException
+
+from app.core.tracing import tracer
+
+router = APIRouter(prefix="/api/debug", tags=["debug"])
+
+
+@router.get("/traces")
+async def list_traces(limit: int = 50):
+    """Most recent traced request ids (newest first)"""
+    return {"request_ids": tracer.recent(limit)}
+
+
+@router.get("/traces/{request_id}")
+async def get_trace(request_id: str):
+    """Waterfall of the spans recorded for a request"""
+    waterfall = tracer.waterfall(request_id)
+    if waterfall is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return waterfall
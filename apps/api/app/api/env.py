@@ -2,8 +2,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from app.api.deps import get_db
+from app.core.websocket.manager import manager
 from app.models.env_vars import EnvVar
 from app.models.projects import Project as ProjectModel
 from app.services.env_manager import (
@@ -13,13 +15,34 @@ from app.services.env_manager import (
     delete_env_var,
     sync_env_file_to_db,
     sync_db_to_env_file,
-    get_env_var_conflicts
+    get_env_var_conflicts,
+    get_env_file_change,
+    env_snapshots
 )
-from app.core.crypto import secret_box
+from app.services.local_runtime import preview_status
 
 router = APIRouter(prefix="/api/env", tags=["env"]) 
 
 
+async def report_env_file_change(project_id: str) -> Optional[dict]:
+    """Describe the last .env write and tell a running preview whether it needs a restart"""
+    change = get_env_file_change(project_id)
+    if change is None:
+        return None
+    report = change.to_dict()
+    report["preview_running"] = preview_status(project_id) == "running"
+    if change.written and report["preview_running"]:
+        await manager.send_message(project_id, {
+            "type": "preview_env_changed",
+            "data": {
+                "keys": change.keys,
+                "restart_required": change.restart_required
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    return report
+
+
 class EnvVarCreate(BaseModel):
     key: str
     value: str
@@ -47,6 +70,7 @@ class SyncResponse(BaseModel):
     success: bool
     synced_count: int
     message: str
+    env_file: Optional[dict] = None
 
 
 class ConflictResponse(BaseModel):
@@ -63,30 +87,20 @@ async def get_env_vars(project_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Project not found")
     
     try:
-        # Get encrypted vars from DB
-        db_env_vars = db.query(EnvVar).filter(
-            EnvVar.project_id == project_id
-        ).all()
-        
-        result = []
-        for env_var in db_env_vars:
-            try:
-                # Decrypt value for API response
-                decrypted_value = secret_box.decrypt(env_var.value_encrypted)
-                result.append(EnvVarResponse(
-                    id=env_var.id,
-                    key=env_var.key,
-                    value=decrypted_value,
-                    scope=env_var.scope,
-                    var_type=env_var.var_type,
-                    is_secret=env_var.is_secret,
-                    description=env_var.description
-                ))
-            except Exception as e:
-                print(f"⚠️  Failed to decrypt env var {env_var.key}: {e}")
-                continue
-        
-        return result
+        # Decrypted values come from the project's cached env snapshot
+        snapshot = env_snapshots.get(db, project_id)
+        return [
+            EnvVarResponse(
+                id=env_var.id,
+                key=env_var.key,
+                value=env_var.value,
+                scope=env_var.scope,
+                var_type=env_var.var_type,
+                is_secret=env_var.is_secret,
+                description=env_var.description
+            )
+            for env_var in snapshot.rows
+        ]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get env vars: {str(e)}")
@@ -111,7 +125,8 @@ async def create_env_variable(project_id: str, body: EnvVarCreate, db: Session =
         return {
             "success": True,
             "message": f"Environment variable '{body.key}' created and synced to .env file",
-            "id": env_var.id
+            "id": env_var.id,
+            "env_file": await report_env_file_change(project_id)
         }
         
     except Exception as e:
@@ -135,7 +150,8 @@ async def update_env_variable(project_id: str, key: str, body: EnvVarUpdate, db:
         
         return {
             "success": True,
-            "message": f"Environment variable '{key}' updated and synced to .env file"
+            "message": f"Environment variable '{key}' updated and synced to .env file",
+            "env_file": await report_env_file_change(project_id)
         }
         
     except HTTPException:
@@ -161,7 +177,8 @@ async def delete_env_variable(project_id: str, key: str, db: Session = Depends(g
         
         return {
             "success": True,
-            "message": f"Environment variable '{key}' deleted and synced to .env file"
+            "message": f"Environment variable '{key}' deleted and synced to .env file",
+            "env_file": await report_env_file_change(project_id)
         }
         
     except HTTPException:
@@ -222,7 +239,8 @@ async def sync_database_to_file(project_id: str, db: Session = Depends(get_db)):
         return SyncResponse(
             success=True,
             synced_count=synced_count,
-            message=f"Synced {synced_count} environment variables from database to .env file"
+            message=f"Synced {synced_count} environment variables from database to .env file",
+            env_file=await report_env_file_change(project_id)
         )
         
     except Exception as e:
@@ -19,6 +19,7 @@ from app.models.messages import Message
 from app.models.project_services import ProjectServiceConnection
 from app.models.sessions import Session as SessionModel
 from app.services.project.initializer import initialize_project
+from app.services.cli.session_cache import project_sessions
 from app.core.websocket.manager import manager as websocket_manager
 
 # Project ID validation regex
@@ -354,6 +355,7 @@ async def create_project(
     db.add(project)
     db.commit()
     db.refresh(project)
+    project_sessions.prime(project)
     
     # Send immediate status update
     await websocket_manager.broadcast_to_project(project.id, {
@@ -472,6 +474,19 @@ async def delete_project(project_id: str, db: Session = Depends(get_db)):
     db.delete(project)
     db.commit()
     
+    # Drop the project's cached state and archived transcripts
+    from app.services.env_manager import env_snapshots, get_project_env_path
+    from app.services.env_file import env_files
+    from app.services.transcripts import transcripts
+    from app.services.prompts import prompt_store
+    from app.services.cli.client_pool import claude_clients
+    env_snapshots.discard(project_id)
+    project_sessions.invalidate(project_id)
+    env_files.forget(get_project_env_path(project_id))
+    transcripts.delete_project(project_id)
+    prompt_store.invalidate(project_id)
+    await claude_clients.discard(project_id)
+    
     # Clean up project files from disk
     try:
         from app.services.project.initializer import cleanup_project
@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
 from app.models.projects import Project as ProjectModel
-from app.services.claude_act import load_system_prompt, get_system_prompt
+from app.services.prompts import prompt_store
 
 
 router = APIRouter()
@@ -17,6 +17,7 @@ router = APIRouter()
 class SystemPromptResponse(BaseModel):
     system_prompt: str
     project_id: str
+    is_custom: bool = False
 
 
 class SystemPromptUpdate(BaseModel):
@@ -31,12 +32,13 @@ async def get_project_system_prompt(project_id: str, db: Session = Depends(get_d
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Load system prompt for the project
-    system_prompt = get_system_prompt(project_id)
+    # The project's own prompt if it has one, else the default
+    custom = prompt_store.override(project_id)
     
     return SystemPromptResponse(
-        system_prompt=system_prompt,
-        project_id=project_id
+        system_prompt=custom if custom is not None else prompt_store.default(),
+        project_id=project_id,
+        is_custom=custom is not None
     )
 
 
@@ -52,8 +54,12 @@ async def update_project_system_prompt(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # TODO: Implement system prompt update logic
-    # This would involve saving the custom system prompt to a project-specific location
+    system_prompt = body.system_prompt.strip()
+    if not system_prompt:
+        raise HTTPException(status_code=400, detail="System prompt cannot be empty")
+    
+    # Persisted per project; the next instruction picks it up
+    prompt_store.set_override(project_id, system_prompt)
     
     return {
         "message": "System prompt updated successfully",
@@ -69,8 +75,7 @@ async def reset_project_system_prompt(project_id: str, db: Session = Depends(get
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # TODO: Implement system prompt reset logic
-    # This would involve removing any custom system prompt for the project
+    prompt_store.set_override(project_id, None)
     
     return {
         "message": "System prompt reset to default",
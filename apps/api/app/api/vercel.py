@@ -12,7 +12,7 @@ from datetime import datetime
 from app.api.deps import get_db
 from app.models.projects import Project
 from app.models.project_services import ProjectServiceConnection
-from app.services.vercel_service import VercelService, VercelAPIError, check_project_availability, start_deployment_monitoring, stop_deployment_monitoring, get_active_monitoring_projects
+from app.services.vercel_service import VercelService, VercelAPIError, check_project_availability, start_deployment_monitoring, stop_deployment_monitoring, get_active_monitoring_projects, deployment_watcher
 from app.services.token_service import get_token
 
 logger = logging.getLogger(__name__)
@@ -444,7 +444,8 @@ async def get_current_deployment_status(project_id: str, db: Session = Depends(g
         "deployment_id": current_deployment["deployment_id"],
         "status": current_deployment["status"],
         "deployment_url": current_deployment["deployment_url"],
-        "last_checked_at": current_deployment["last_checked_at"]
+        # Polls that saw no change are not written to the DB; the watcher knows the latest check
+        "last_checked_at": deployment_watcher.last_checked_at(project_id) or current_deployment.get("last_checked_at")
     }
 
 
@@ -464,7 +465,7 @@ async def get_active_monitoring():
     """현재 활성화된 모니터링 목록"""
     try:
         active_projects = get_active_monitoring_projects()
-        return {"active_projects": active_projects}
+        return {"active_projects": active_projects, **deployment_watcher.stats()}
     except Exception as e:
         logger.error(f"Failed to get active monitoring: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -47,5 +47,71 @@ class Settings(BaseModel):
     preview_port_start: int = int(os.getenv("PREVIEW_PORT_START", "3100"))
     preview_port_end: int = int(os.getenv("PREVIEW_PORT_END", "3999"))
 
+    # Execution scheduler: concurrent CLI runs per CLI type and queued runs per project
+    # Per-CLI overrides: MAX_CONCURRENT_RUNS_CLAUDE, MAX_CONCURRENT_RUNS_CURSOR, MAX_CONCURRENT_RUNS_GEMINI
+    max_concurrent_runs: int = int(os.getenv("MAX_CONCURRENT_RUNS", "2"))
+    max_queued_runs_per_project: int = int(os.getenv("MAX_QUEUED_RUNS_PER_PROJECT", "10"))
+
+    # Warm Claude SDK clients: a project's CLI process is kept running between turns (false = one process
+    # per instruction); at most N idle clients, closed after the idle timeout or above the RSS cap (MB, 0 = none)
+    claude_client_pool: bool = os.getenv("CLAUDE_CLIENT_POOL", "true").lower() == "true"
+    claude_client_pool_size: int = int(os.getenv("CLAUDE_CLIENT_POOL_SIZE", "4"))
+    claude_client_idle_seconds: float = float(os.getenv("CLAUDE_CLIENT_IDLE_SECONDS", "600"))
+    claude_client_max_rss_mb: int = int(os.getenv("CLAUDE_CLIENT_MAX_RSS_MB", "1536"))
+
+    # Per-run budgets (0 disables). Requests may lower/raise them individually.
+    run_timeout_seconds: int = int(os.getenv("RUN_TIMEOUT_SECONDS", "1800"))
+    run_token_budget: int = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+
+    # message_delta frames per second per streaming message (0 disables incremental text)
+    message_delta_fps: int = int(os.getenv("MESSAGE_DELTA_FPS", "10"))
+
+    # Longest stdout/stderr line accepted from a CLI; longer lines are truncated
+    cli_max_line_bytes: int = int(os.getenv("CLI_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+
+    # Message metadata: longest tool input string kept inline (longer ones become a head + hash), and
+    # the optional compressed side store for raw CLI events (cap per event, compressed bytes)
+    message_tool_input_max_chars: int = int(os.getenv("MESSAGE_TOOL_INPUT_MAX_CHARS", "1024"))
+    message_raw_events: bool = os.getenv("MESSAGE_RAW_EVENTS", "true").lower() == "true"
+    message_raw_event_max_bytes: int = int(os.getenv("MESSAGE_RAW_EVENT_MAX_BYTES", str(64 * 1024)))
+
+    # Transcript archival: messages of sessions finished more than N days ago (0 disables) move to
+    # gzip JSONL files under TRANSCRIPTS_ROOT; the archival pass runs every interval
+    transcripts_root: str = os.getenv("TRANSCRIPTS_ROOT", str(PROJECT_ROOT / "data" / "transcripts"))
+    message_archive_after_days: float = float(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "30"))
+    message_archive_interval_seconds: float = float(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+    # Image assets: largest upload (bytes), chunk size uploads are streamed to disk in, thumbnail edge (px),
+    # largest edge of the copy handed to CLIs (bigger images get a downscaled copy, 0 = never) and thumbnail workers
+    asset_max_upload_bytes: int = int(os.getenv("ASSET_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    asset_upload_chunk_bytes: int = int(os.getenv("ASSET_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    asset_thumbnail_size: int = int(os.getenv("ASSET_THUMBNAIL_SIZE", "256"))
+    asset_max_image_dimension: int = int(os.getenv("ASSET_MAX_IMAGE_DIMENSION", "2048"))
+    asset_thumbnail_workers: int = int(os.getenv("ASSET_THUMBNAIL_WORKERS", "2"))
+
+    # Request tracing: traces kept in memory, and an optional JSONL file finished traces are appended to
+    trace_buffer_size: int = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "")
+
+    # run_shell_command tool: wall-clock limit, bytes kept per stream (head + tail) and commands per project
+    shell_timeout_seconds: int = int(os.getenv("SHELL_TIMEOUT_SECONDS", "600"))
+    shell_max_output_bytes: int = int(os.getenv("SHELL_MAX_OUTPUT_BYTES", str(1024 * 1024)))
+    shell_max_concurrent_per_project: int = int(os.getenv("SHELL_MAX_CONCURRENT_PER_PROJECT", "2"))
+
+    # Third-party API clients (GitHub, Vercel): base URLs (overridable, e.g. for a local stub server),
+    # timeouts, pooled connections per host, idle keep-alive and retries of transient failures
+    github_api_url: str = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    vercel_api_url: str = os.getenv("VERCEL_API_URL", "https://api.vercel.com")
+    http_timeout_seconds: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    http_connect_timeout_seconds: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    http_max_connections_per_host: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+    http_keepalive_seconds: float = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+    http_max_retries: int = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+
+    # Terminal logging: minimum level (debug/info/success/warning/error) and output format
+    # (auto = colored when stdout is a TTY, plain text otherwise; or rich/plain/json)
+    log_level: str = os.getenv("LOG_LEVEL", "debug" if os.getenv("DEBUG", "false").lower() == "true" else "info")
+    log_format: str = os.getenv("LOG_FORMAT", "auto")
+
 
 settings = Settings()
\ No newline at end of file
@@ -1,4 +1,6 @@
 import base64
+import hashlib
+import hmac
 import os
 from typing import Optional
 from cryptography.fernet import Fernet
@@ -12,6 +14,8 @@ class SecretBox:
             # Dev fallback: generate ephemeral key
             key = base64.urlsafe_b64encode(os.urandom(32)).decode()
         self._fernet = Fernet(key)
+        # Separate key for fingerprints, so comparing values never needs a decrypt
+        self._digest_key = hashlib.sha256(b"secretbox-digest:" + key.encode("utf-8")).digest()
 
     def encrypt(self, plaintext: str) -> str:
         token = self._fernet.encrypt(plaintext.encode("utf-8"))
@@ -20,5 +24,9 @@ class SecretBox:
     def decrypt(self, ciphertext: str) -> str:
         return self._fernet.decrypt(ciphertext.encode("utf-8")).decode("utf-8")
 
+    def digest(self, plaintext: str) -> str:
+        """Keyed content hash of a value (HMAC-SHA256), safe to keep next to the ciphertext"""
+        return hmac.new(self._digest_key, plaintext.encode("utf-8"), hashlib.sha256).hexdigest()
+
 
 secret_box = SecretBox()
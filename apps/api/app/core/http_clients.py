@@ -0,0 +1,144 @@
+"""
+Shared HTTP clients for third-party APIs (GitHub, Vercel)
+
+One pooled httpx.AsyncClient per origin, created at application startup (or on first use
+outside the API server) and closed at shutdown, so repeated calls (deployment status polling
+in particular) reuse kept-alive connections instead of paying a TCP+TLS handshake every time.
+HTTP/2 is negotiated when the optional h2 package is installed.
+
+Failed requests are retried with exponential backoff: connection failures always (the request
+never reached the server), read timeouts, dropped connections and 502/503/504 responses only
+for idempotent methods, and 429 responses honoring Retry-After.
+"""
+import asyncio
+import random
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+
+try:
+    import h2  # noqa: F401 enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+# Errors raised before the request was sent; safe to retry for any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Errors after the request may have reached the server
+IN_FLIGHT_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.ReadError, httpx.WriteError,
+                    httpx.RemoteProtocolError)
+MAX_RETRY_AFTER_SECONDS = 30.0
+
+
+class HTTPClients:
+    """Origin -> pooled AsyncClient, with a retrying request() helper"""
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections_per_host: int = 10,
+        keepalive_expiry: float = 60.0,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.transport = transport
+        self._clients: Dict[Tuple[bytes, bytes, Optional[int]], httpx.AsyncClient] = {}
+
+    def open(self, *urls: str) -> None:
+        """Create the clients for these API base URLs ahead of the first request"""
+        for url in urls:
+            self.client(url)
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """The shared client for url's origin (scheme, host, port)"""
+        parsed = httpx.URL(url)
+        key = (parsed.raw_scheme, parsed.raw_host, parsed.port)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport
+            )
+        return client
+
+    async def request(self, method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """Send a request through the shared client, retrying transient failures"""
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        retries = self.max_retries if max_retries is None else max_retries
+        client = self.client(url)
+
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except NOT_SENT_ERRORS as e:
+                if attempt >= retries:
+                    raise
+                reason, delay = e.__class__.__name__, self._backoff(attempt)
+            except IN_FLIGHT_ERRORS as e:
+                if not idempotent or attempt >= retries:
+                    raise
+                reason, delay = e.__class__.__name__, self._backoff(attempt)
+            else:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                if not retryable or attempt >= retries:
+                    return response
+                reason = f"HTTP {response.status_code}"
+                delay = self._retry_after(response) or self._backoff(attempt)
+                await response.aclose()
+
+            attempt += 1
+            ui.debug(f"Retrying {method} {url} after {reason} in {delay:.2f}s (attempt {attempt + 1})", "HTTP")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close every pooled connection (application shutdown)"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.base_delay * 2 ** attempt * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return min(max(float(value), 0.0), MAX_RETRY_AFTER_SECONDS) if value else None
+        except ValueError:
+            # HTTP-date form; fall back to exponential backoff
+            return None
+
+
+http_clients = HTTPClients(
+    timeout=settings.http_timeout_seconds,
+    connect_timeout=settings.http_connect_timeout_seconds,
+    max_connections_per_host=settings.http_max_connections_per_host,
+    keepalive_expiry=settings.http_keepalive_seconds,
+    max_retries=settings.http_max_retries
+)
@@ -1,30 +1,264 @@
-import time
+"""
+Metrics collection
+In-memory counters/histograms rendered in Prometheus text format at /metrics
+"""
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items)
+        return lines
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+
+class Histogram(_Metric):
+    """Bucketed observations (count, sum and cumulative buckets) per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the monotonic duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = self._header()
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {int(state[-1])}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                ",".join(key): {"count": state[-1], "sum": state[-2]}
+                for key, state in self._values.items()
+            }
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+
+# Global registry and the metrics recorded across the API
+metrics = MetricsRegistry()
+
+TOOL_CALLS = metrics.counter("claudable_tool_calls_total", "Tool executions by outcome", ("tool", "status"))
+TOOL_DURATION = metrics.histogram("claudable_tool_call_duration_seconds", "Tool execution time", ("tool",))
+TOOL_ARG_SIZE = metrics.histogram("claudable_tool_call_arg_bytes", "Total size of string/bytes tool arguments", ("tool",), SIZE_BUCKETS)
+
+CLI_RUNS = metrics.counter("claudable_cli_runs_total", "CLI executions by outcome", ("cli", "status"))
+CLI_RUN_DURATION = metrics.histogram("claudable_cli_run_duration_seconds", "CLI execution wall-clock time", ("cli",))
+
+WS_SENDS = metrics.counter("claudable_ws_sends_total", "WebSocket frames sent per connection", ("type", "status"))
+WS_SEND_DURATION = metrics.histogram("claudable_ws_send_duration_seconds", "Time to fan a frame out to a project's connections")
+WS_FRAME_SIZE = metrics.histogram("claudable_ws_frame_bytes", "Serialized WebSocket frame size", buckets=SIZE_BUCKETS)
+
+DB_FLUSHES = metrics.counter("claudable_db_flushes_total", "SQLAlchemy session flushes")
+DB_FLUSH_DURATION = metrics.histogram("claudable_db_flush_duration_seconds", "SQLAlchemy session flush time")
+DB_COMMITS = metrics.counter("claudable_db_commits_total", "SQLAlchemy session commits")
+
+
+def payload_size(value: Any, _depth: int = 0) -> int:
+    """Approximate size of an argument (string/bytes lengths, summed through containers)"""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if _depth >= 3:
+        return 0
+    if isinstance(value, dict):
+        return sum(payload_size(item, _depth + 1) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(item, _depth + 1) for item in value)
+    return 0
+
+
 def monitor_tool_execution(tool_name):
+    """Record duration, outcome and argument size of a tool coroutine (arguments themselves are never logged)"""
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            # args[0] is the manager instance for the decorated methods
+            arg_bytes = payload_size(args[1:]) + payload_size(kwargs)
+            start = time.perf_counter()
+            status = "failure"
             try:
-                result = await func(*args, **kwargs)
-                status = "success"
+                with tracer.span(f"tool.{tool_name}", arg_bytes=arg_bytes) as span:
+                    result = await func(*args, **kwargs)
+                    # Tools report most failures as {"success": False} rather than raising
+                    if not (isinstance(result, dict) and result.get("success") is False):
+                        status = "success"
+                    if span is not None:
+                        span.set(outcome=status)
                 return result
-            except Exception as e:
-                status = "failure"
-                raise e
             finally:
-                duration = time.time() - start_time
-                # Log to a structured logger (e.g., JSON format)
-                logger.info({
-                    "event": "tool_execution",
-                    "tool_name": tool_name,
-                    "duration_ms": duration * 1000,
-                    "status": status,
-                    "args": kwargs
-                })
+                duration = time.perf_counter() - start
+                TOOL_CALLS.inc(tool=tool_name, status=status)
+                TOOL_DURATION.observe(duration, tool=tool_name)
+                TOOL_ARG_SIZE.observe(arg_bytes, tool=tool_name)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug({
+                        "event": "tool_execution",
+                        "tool_name": tool_name,
+                        "duration_ms": round(duration * 1000, 2),
+                        "status": status,
+                        "arg_bytes": arg_bytes
+                    })
         return wrapper
     return decorator
+
+
+def instrument_db_sessions(session_factory) -> None:
+    """Count/time flushes and count commits for every session created by session_factory"""
+    from sqlalchemy import event
+
+    @event.listens_for(session_factory, "before_flush")
+    def _before_flush(session, flush_context, instances):
+        session.info["_flush_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_flush_postexec")
+    def _after_flush(session, flush_context):
+        started = session.info.pop("_flush_started", None)
+        DB_FLUSHES.inc()
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            DB_FLUSH_DURATION.observe(elapsed)
+            tracer.accumulate("db.flush", elapsed)
+
+    @event.listens_for(session_factory, "before_commit")
+    def _before_commit(session):
+        session.info["_commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        DB_COMMITS.inc()
+        started = session.info.pop("_commit_started", None)
+        if started is not None:
+            tracer.accumulate("db.commit", time.perf_counter() - started)
@@ -1,9 +1,18 @@
 """
 Clean Terminal UI System
 Inspired by Claude Code's design principles
+
+Messages are filtered by level on the calling thread and handed to a background writer thread,
+which formats and renders them, so logging never blocks the event loop on terminal I/O.
 """
+import atexit
+import json
 import logging
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional, Dict, Any
 from enum import Enum
 from rich.console import Console
 from rich.panel import Panel
@@ -14,6 +23,8 @@ from rich.layout import Layout
 from rich import box
 import sys
 
+from app.core.config import settings
+
 
 class LogLevel(Enum):
     DEBUG = "debug"
@@ -23,12 +34,59 @@ class LogLevel(Enum):
     ERROR = "error"
 
 
+LEVEL_ORDER = {
+    LogLevel.DEBUG: 10,
+    LogLevel.INFO: 20,
+    LogLevel.SUCCESS: 25,
+    LogLevel.WARNING: 30,
+    LogLevel.ERROR: 40
+}
+
+OUTPUT_FORMATS = ("rich", "plain", "json")
+
+# Pending records before new ones are dropped (counted and reported) instead of growing memory
+MAX_QUEUED_RECORDS = 10000
+
+
+def _parse_level(value: Optional[str]) -> LogLevel:
+    try:
+        return LogLevel((value or "info").lower())
+    except ValueError:
+        return LogLevel.INFO
+
+
+def _resolve_format(value: Optional[str], stream) -> str:
+    value = (value or "auto").lower()
+    if value in OUTPUT_FORMATS:
+        return value
+    isatty = getattr(stream, "isatty", None)
+    return "rich" if isatty is not None and isatty() else "plain"
+
+
 class TerminalUI:
     """Clean terminal interface without emojis"""
     
-    def __init__(self):
-        self.console = Console(file=sys.stdout, force_terminal=True)
+    def __init__(
+        self,
+        level: Optional[str] = None,
+        output_format: Optional[str] = None,
+        stream=None,
+        background: bool = True
+    ):
+        self.stream = stream or sys.stdout
+        self.level = _parse_level(level or settings.log_level)
+        self._threshold = LEVEL_ORDER[self.level]
+        self.output_format = _resolve_format(output_format or settings.log_format, self.stream)
+        rich_output = self.output_format == "rich"
+        self.console = Console(file=self.stream, force_terminal=rich_output, no_color=not rich_output)
         self._setup_colors()
+
+        self.background = background
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=MAX_QUEUED_RECORDS)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._closed = False
     
     def _setup_colors(self):
         """Define color scheme similar to Claude Code"""
@@ -48,18 +106,23 @@ class TerminalUI:
             LogLevel.ERROR: "[ERROR]"
         }
     
+    def set_level(self, level: str) -> None:
+        self.level = _parse_level(level)
+        self._threshold = LEVEL_ORDER[self.level]
+
+    def is_enabled(self, level: LogLevel) -> bool:
+        """Whether messages at this level are emitted; guard expensive debug formatting with it"""
+        return LEVEL_ORDER[level] >= self._threshold
+
+    @property
+    def debug_enabled(self) -> bool:
+        return self._threshold <= LEVEL_ORDER[LogLevel.DEBUG]
+
     def log(self, message: str, level: LogLevel = LogLevel.INFO, component: Optional[str] = None):
         """Log a message with clean formatting"""
-        prefix = self.prefixes[level]
-        color = self.colors[level]
-        
-        if component:
-            formatted_message = f"{prefix} [{component}] {message}"
-        else:
-            formatted_message = f"{prefix} {message}"
-        
-        text = Text(formatted_message, style=color)
-        self.console.print(text)
+        if LEVEL_ORDER[level] < self._threshold:
+            return
+        self._submit(self._write_record, (time.time(), level, message, component))
     
     def debug(self, message: str, component: Optional[str] = None):
         """Debug level message"""
@@ -83,6 +146,9 @@ class TerminalUI:
     
     def panel(self, content: str, title: Optional[str] = None, style: str = "blue"):
         """Display content in a clean panel"""
+        if self.output_format == "json":
+            self._submit(self._write_json, ({"event": "panel", "title": title, "content": content},))
+            return
         panel = Panel(
             content,
             title=title,
@@ -90,10 +156,12 @@ class TerminalUI:
             box=box.ROUNDED,
             padding=(1, 2)
         )
-        self.console.print(panel)
+        self._submit(self._print, (panel,))
     
     def ascii_logo(self):
         """Display ASCII art logo for Claudable"""
+        if self.output_format == "json":
+            return
         # Create "CLAUDABLE" logo with orange color from the image
         logo_text = Text()
         
@@ -105,20 +173,17 @@ class TerminalUI:
         logo_text.append("╚██████╗███████╗██║  ██║╚██████╔╝██████╔╝██║  ██║██████╔╝███████╗███████╗\n", style="rgb(182,109,77)")
         logo_text.append(" ╚═════╝╚══════╝╚═╝  ╚═╝ ╚═════╝ ╚═════╝ ╚═╝  ╚═╝╚═════╝ ╚══════╝╚══════╝", style="rgb(182,109,77)")
         
-        self.console.print()
-        
-        # Print the logo
-        self.console.print(logo_text)
-        self.console.print()
-        
         # Tagline
         tagline = Text("Connect Claude Code. Build what you want. Deploy instantly.", style="rgb(182,109,77) bold")
         
-        self.console.print(tagline)
-        self.console.print()  # Add blank line
+        # Blank lines around the logo and after the tagline
+        self._submit(self._print, ("", logo_text, "", tagline, ""))
     
     def status_line(self, items: Dict[str, str]):
         """Display a status line with key-value pairs"""
+        if self.output_format == "json":
+            self._submit(self._write_json, ({"event": "status", **items},))
+            return
         table = Table.grid(padding=1)
         
         for key, value in items.items():
@@ -133,11 +198,10 @@ class TerminalUI:
         # Add values row  
         table.add_row(*[Text(value, style="white") for value in values])
         
-        self.console.print(table)
+        self._submit(self._print, (table,))
     
     def connection_status(self, project_id: str, status: str):
         """WebSocket connection status"""
-        status_color = "green" if status == "connected" else "red" if status == "disconnected" else "yellow"
         self.log(f"WebSocket {status} for project: {project_id}", LogLevel.INFO, "WebSocket")
     
     def session_info(self, session_id: str, cli_type: str, model: str):
@@ -152,9 +216,95 @@ class TerminalUI:
             message += f": {details}"
         self.log(message, level)
 
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Block until everything queued so far has been written"""
+        if self._worker is None or not self._worker.is_alive():
+            return True
+        done = threading.Event()
+        self._submit(done.set, (), block=True)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Drain the queue and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join(timeout)
+
+    # Rendering (writer thread)
+
+    def _submit(self, render: Callable, args, block: bool = False) -> None:
+        if not self.background or self._closed:
+            self._render(render, args)
+            return
+        if self._worker is None:
+            self._start_worker()
+        try:
+            self._queue.put((render, args), block=block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="terminal-ui", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        reported_drops = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.dropped != reported_drops:
+                dropped, reported_drops = self.dropped - reported_drops, self.dropped
+                self._render(self._write_record, (time.time(), LogLevel.WARNING, f"Dropped {dropped} log messages (queue full)", "Logging"))
+            self._render(*item)
+
+    def _render(self, render: Callable, args) -> None:
+        try:
+            render(*args)
+        except Exception:
+            # Logging must never take the caller down; losing one line is acceptable
+            pass
+
+    def _write_record(self, created: float, level: LogLevel, message: str, component: Optional[str]) -> None:
+        prefix = self.prefixes[level]
+        if component:
+            formatted_message = f"{prefix} [{component}] {message}"
+        else:
+            formatted_message = f"{prefix} {message}"
+
+        if self.output_format == "rich":
+            self.console.print(Text(formatted_message, style=self.colors[level]))
+        elif self.output_format == "json":
+            self._write_json({
+                "ts": datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": level.value,
+                "component": component or None,
+                "message": message
+            })
+        else:
+            stamp = datetime.fromtimestamp(created).strftime("%H:%M:%S")
+            self.stream.write(f"{stamp} {formatted_message}\n")
+            self.stream.flush()
+
+    def _write_json(self, record: Dict[str, Any]) -> None:
+        record.setdefault("ts", datetime.now(timezone.utc).isoformat(timespec="milliseconds"))
+        self.stream.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def _print(self, *renderables) -> None:
+        for renderable in renderables:
+            self.console.print(renderable)
+
 
 # Global instance
 ui = TerminalUI()
+atexit.register(ui.close)
 
 
 class TerminalUIHandler(logging.Handler):
@@ -176,6 +326,8 @@ class TerminalUIHandler(logging.Handler):
             }
             
             level = level_map.get(record.levelno, LogLevel.INFO)
+            if not self.ui.is_enabled(level):
+                return
             component = record.name if record.name != "root" else None
             
             self.ui.log(record.getMessage(), level, component)
@@ -0,0 +1,239 @@
+"""
+Request tracing
+Spans keyed by UserRequest.id, kept in an in-memory ring buffer (optionally appended to a JSONL file)
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+_current_trace: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+
+class Span:
+    """A timed stage of a request"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "status")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str] = None, start: Optional[float] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start if start is not None else time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "aggregates", "finished")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        # name -> [count, total_seconds, max_seconds]
+        self.aggregates: Dict[str, List[float]] = {}
+        self.finished = False
+
+
+class Tracer:
+    """Collects spans per request and exports finished traces"""
+
+    def __init__(self, max_traces: int = 200, max_spans_per_trace: int = 2000, export_path: Optional[str] = None):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self.export_path = export_path
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return _current_trace.get()
+
+    def _get_trace(self, trace_id: str) -> _Trace:
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                trace = self._traces[trace_id] = _Trace(trace_id)
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            return trace
+
+    def _add(self, span: Span) -> None:
+        trace = self._get_trace(span.trace_id)
+        if len(trace.spans) < self.max_spans_per_trace:
+            trace.spans.append(span)
+
+    @contextmanager
+    def trace(self, trace_id: str, name: str, **attributes):
+        """Root span for a request; binds the trace to the current context and exports it on exit"""
+        trace_token = _current_trace.set(trace_id)
+        try:
+            with self.span(name, **attributes) as span:
+                yield span
+        finally:
+            _current_trace.reset(trace_token)
+            self._finish(trace_id)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Child span of the current span; a no-op (yields None) outside a trace"""
+        trace_id = _current_trace.get()
+        if trace_id is None:
+            yield None
+            return
+
+        span = Span(trace_id, name, parent_id=_current_span.get(), attributes=attributes)
+        self._add(span)
+        span_token = _current_span.set(span.span_id)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            span.attributes.setdefault("error", str(e)[:200])
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(span_token)
+
+    def record(self, trace_id: Optional[str], name: str, start: float, end: float, **attributes) -> None:
+        """Add an already-measured span (epoch seconds), e.g. time spent queued"""
+        trace_id = trace_id or _current_trace.get()
+        if trace_id is None:
+            return
+        parent_id = _current_span.get() if trace_id == _current_trace.get() else None
+        span = Span(trace_id, name, parent_id=parent_id, start=start, attributes=attributes)
+        span.end = end
+        self._add(span)
+
+    def accumulate(self, name: str, seconds: float) -> None:
+        """Fold a high-frequency operation (DB commit, WS send) into per-trace totals"""
+        trace_id = _current_trace.get()
+        if trace_id is None:
+            return
+        trace = self._get_trace(trace_id)
+        stats = trace.aggregates.get(name)
+        if stats is None:
+            trace.aggregates[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def waterfall(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Spans ordered by start time with offsets/durations relative to the first span"""
+        trace = self._traces.get(trace_id)
+        if trace is not None:
+            spans = [span.to_dict() for span in trace.spans]
+            aggregates = {
+                name: {"count": int(stats[0]), "total_ms": round(stats[1] * 1000, 2), "max_ms": round(stats[2] * 1000, 2)}
+                for name, stats in trace.aggregates.items()
+            }
+            finished = trace.finished
+        else:
+            record = self._load_exported(trace_id)
+            if record is None:
+                return None
+            spans, aggregates, finished = record["spans"], record["aggregates"], True
+
+        if not spans:
+            return None
+        spans.sort(key=lambda span: span["start"])
+        origin = spans[0]["start"]
+        end = max((span["end"] or time.time()) for span in spans)
+        depths: Dict[str, int] = {}
+        for span in spans:
+            depths[span["span_id"]] = depths.get(span["parent_id"], -1) + 1 if span["parent_id"] else 0
+
+        return {
+            "request_id": trace_id,
+            "finished": finished,
+            "started_at": origin,
+            "duration_ms": round((end - origin) * 1000, 2),
+            "spans": [
+                {
+                    "span_id": span["span_id"],
+                    "parent_id": span["parent_id"],
+                    "name": span["name"],
+                    "depth": depths[span["span_id"]],
+                    "offset_ms": round((span["start"] - origin) * 1000, 2),
+                    "duration_ms": round(((span["end"] or time.time()) - span["start"]) * 1000, 2),
+                    "in_progress": span["end"] is None,
+                    "status": span["status"],
+                    "attributes": span["attributes"]
+                }
+                for span in spans
+            ],
+            "aggregates": aggregates
+        }
+
+    def recent(self, limit: int = 50) -> List[str]:
+        with self._lock:
+            return list(self._traces.keys())[-limit:][::-1]
+
+    def _finish(self, trace_id: str) -> None:
+        trace = self._traces.get(trace_id)
+        if trace is None:
+            return
+        trace.finished = True
+        if not self.export_path:
+            return
+        record = {
+            "trace_id": trace_id,
+            "spans": [span.to_dict() for span in trace.spans],
+            "aggregates": {
+                name: {"count": int(stats[0]), "total_ms": round(stats[1] * 1000, 2), "max_ms": round(stats[2] * 1000, 2)}
+                for name, stats in trace.aggregates.items()
+            }
+        }
+        try:
+            with self._lock, open(self.export_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            pass
+
+    def _load_exported(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        if not self.export_path:
+            return None
+        found = None
+        try:
+            with open(self.export_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    if trace_id in line:
+                        record = json.loads(line)
+                        if record.get("trace_id") == trace_id:
+                            found = record
+        except (OSError, ValueError):
+            return None
+        return found
+
+
+# Global tracer instance
+tracer = Tracer(
+    max_traces=settings.trace_buffer_size,
+    export_path=settings.trace_export_path or None
+)
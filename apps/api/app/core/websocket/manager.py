@@ -4,7 +4,10 @@ Handles WebSocket connections for real-time chat updates
 """
 from typing import Dict, List
 import json
+import time
 from fastapi import WebSocket
+from app.core.monitoring import WS_FRAME_SIZE, WS_SEND_DURATION, WS_SENDS
+from app.core.tracing import tracer
 from app.core.terminal_ui import ui
 
 
@@ -39,15 +42,25 @@ class ConnectionManager:
     async def send_message(self, project_id: str, message_data: dict):
         """Send message to all WebSocket connections for a project"""
         if project_id in self.active_connections:
+            # Serialize once for all connections
+            payload = json.dumps(message_data)
+            frame_type = message_data.get("type", "unknown")
+            WS_FRAME_SIZE.observe(len(payload))
+            started = time.perf_counter()
             for connection in self.active_connections[project_id][:]:
                 try:
-                    await connection.send_text(json.dumps(message_data))
+                    await connection.send_text(payload)
+                    WS_SENDS.inc(type=frame_type, status="ok")
                 except Exception:
+                    WS_SENDS.inc(type=frame_type, status="failed")
                     # Connection failed - remove it silently
                     try:
                         self.active_connections[project_id].remove(connection)
                     except (ValueError, KeyError):
                         pass
+            elapsed = time.perf_counter() - started
+            WS_SEND_DURATION.observe(elapsed)
+            tracer.accumulate("ws.send", elapsed)
 
     async def broadcast_status(self, project_id: str, status: str, data: dict = None):
         """Broadcast status update to all connections"""
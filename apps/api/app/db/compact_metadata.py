@@ -0,0 +1,78 @@
+"""
+One-off migration: compact message metadata stored before the compact schema
+
+Moves raw CLI events out of messages.metadata_json into the message_events side table
+(or drops them with --drop-raw-events), truncates long tool inputs, then VACUUMs the SQLite
+file and prints a before/after size report. Safe to re-run; compacted rows are skipped.
+
+    python -m app.db.compact_metadata [--batch-size 500] [--drop-raw-events] [--no-vacuum]
+"""
+import argparse
+import os
+from typing import Dict
+
+from sqlalchemy import text
+
+import app.models  # noqa: F401 registers all tables
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import SessionLocal, db_path, engine
+from app.services.message_metadata import compact_existing_messages, metadata_size_report
+
+
+def _file_size() -> int:
+    # WAL/journal files count too; VACUUM rewrites the main file
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal", db_path + "-journal") if os.path.exists(path))
+
+
+def _print_report(label: str, report: Dict[str, int], file_bytes: int) -> None:
+    print(f"{label}:")
+    print(f"  database file        : {file_bytes / 1024:12.1f} KiB")
+    print(f"  messages             : {report['messages']:12d}")
+    print(f"  metadata_json        : {report['metadata_bytes'] / 1024:12.1f} KiB")
+    print(f"  raw events (side)    : {report['raw_events']:12d}, {report['raw_event_bytes'] / 1024:.1f} KiB compressed")
+
+
+def run(batch_size: int, vacuum: bool) -> None:
+    # Creates message_events on databases that predate it
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        before_file = _file_size()
+        _print_report("Before", metadata_size_report(db), before_file)
+
+        stats = compact_existing_messages(db, batch_size=batch_size)
+        print(f"Compacted {stats['compacted']} of {stats['scanned']} candidate messages, "
+              f"{stats['raw_events_stored']} raw events moved to message_events")
+    finally:
+        db.close()
+
+    if vacuum and settings.database_url.startswith("sqlite"):
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    db = SessionLocal()
+    try:
+        after_file = _file_size()
+        _print_report("After", metadata_size_report(db), after_file)
+        if before_file:
+            print(f"Database file: {before_file / 1024:.1f} KiB -> {after_file / 1024:.1f} KiB "
+                  f"({(1 - after_file / before_file) * 100:.1f}% smaller)")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-raw-events", action="store_true", help="discard raw events instead of moving them")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (the file keeps its size until the next one)")
+    args = parser.parse_args()
+
+    if args.drop_raw_events:
+        settings.message_raw_events = False
+    run(args.batch_size, vacuum=not args.no_vacuum)
+
+
+if __name__ == "__main__":
+    main()
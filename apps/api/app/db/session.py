@@ -2,6 +2,7 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 from app.core.config import settings
+from app.core.monitoring import instrument_db_sessions
 
 # Ensure data directory exists
 db_path = settings.database_url.replace("sqlite:///", "")
@@ -27,6 +28,7 @@ if settings.database_url.startswith("sqlite"):
         cursor.close()
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+instrument_db_sessions(SessionLocal)
 
 def get_db():
     """Database session dependency"""
@@ -1,4 +1,5 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.api.projects import router as projects_router
@@ -13,12 +14,20 @@ from app.api.project_services import router as project_services_router
 from app.api.github import router as github_router
 from app.api.vercel import router as vercel_router
 from app.api.search import router as search_router
+from app.api.debug import router as debug_router
+from app.core.config import settings
+from app.core.http_clients import http_clients
 from app.core.logging import configure_logging
+from app.core.monitoring import metrics
 from app.core.terminal_ui import ui
 from sqlalchemy import inspect
 from app.db.base import Base
 import app.models  # noqa: F401 ensures models are imported for metadata
 from app.db.session import engine
+from app.services.vercel_service import deployment_watcher
+from app.services.transcripts import transcripts
+from app.services.cli.client_pool import claude_clients
+from app.services.assets import asset_processor
 import os
 
 configure_logging()
@@ -66,6 +75,7 @@ app.include_router(project_services_router)  # Project services API
 app.include_router(github_router)  # GitHub integration API
 app.include_router(vercel_router)  # Vercel integration API
 app.include_router(search_router)  # Search API
+app.include_router(debug_router)  # Request traces
 
 
 @app.get("/health")
@@ -74,6 +84,12 @@ def health():
     return {"ok": True}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition of tool, CLI, WebSocket and DB metrics
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     # Auto create tables if not exist; production setups should use Alembic
@@ -82,6 +98,24 @@ def on_startup() -> None:
     Base.metadata.create_all(bind=engine)
     ui.success("Database initialization complete")
     
+    # Requests queued/running in a previous process can never finish; close them out
+    from app.db.session import SessionLocal
+    from app.services.scheduler import recover_interrupted_requests
+    db = SessionLocal()
+    try:
+        recover_interrupted_requests(db)
+    finally:
+        db.close()
+    
+    # Pooled clients for the GitHub/Vercel APIs, shared by all requests and background monitors
+    http_clients.open(settings.github_api_url, settings.vercel_api_url)
+    
+    # Periodically move messages of old finished sessions into transcript files
+    transcripts.start()
+    
+    # Closes warm Claude SDK clients that sat idle too long or grew past the memory cap
+    claude_clients.start()
+    
     # Show available endpoints
     ui.info("API server ready")
     ui.panel(
@@ -100,3 +134,12 @@ def on_startup() -> None:
         "Port": os.getenv("PORT", "8000")
     }
     ui.status_line(env_info)
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await deployment_watcher.aclose()
+    await transcripts.aclose()
+    await claude_clients.aclose()
+    asset_processor.shutdown()
+    await http_clients.aclose()
@@ -1,6 +1,9 @@
 # Import all models to ensure they are registered with the metadata
 from app.models.projects import Project
+from app.models.project_prompts import ProjectPrompt
+from app.models.assets import ProjectAsset
 from app.models.messages import Message
+from app.models.message_events import MessageEvent
 from app.models.sessions import Session
 from app.models.tools import ToolUsage
 from app.models.commits import Commit
@@ -12,7 +15,10 @@ from app.models.user_requests import UserRequest
 
 __all__ = [
     "Project",
+    "ProjectPrompt",
+    "ProjectAsset",
     "Message",
+    "MessageEvent",
     "Session",
     "ToolUsage",
     "Commit",
@@ -0,0 +1,32 @@
+"""
+Uploaded project assets (images attached to instructions)
+"""
+from sqlalchemy import String, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.db.base import Base
+
+
+class ProjectAsset(Base):
+    """A file under the project's assets/ directory, stored once per content hash"""
+    __tablename__ = "project_assets"
+    __table_args__ = (UniqueConstraint("project_id", "sha256", name="uq_project_assets_sha256"),)
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    project_id: Mapped[str] = mapped_column(String(64), ForeignKey("projects.id", ondelete="CASCADE"), index=True)
+    
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)  # Name under assets/
+    original_filename: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    mime_type: Mapped[str] = mapped_column(String(128), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    
+    # Filled in by the thumbnail workers (images only)
+    width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    thumbnail_filename: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    resized_filename: Mapped[str | None] = mapped_column(String(255), nullable=True)  # Downscaled copy for CLIs
+    processing_status: Mapped[str] = mapped_column(String(32), default="pending", nullable=False)  # pending, ready, failed, skipped
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,23 @@
+"""
+Raw CLI events behind persisted messages (optional side store)
+"""
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Boolean, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.db.base import Base
+
+
+class MessageEvent(Base):
+    """Compressed raw event a message was built from, kept out of messages.metadata_json"""
+    __tablename__ = "message_events"
+
+    message_id: Mapped[str] = mapped_column(String(64), ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True)
+    
+    # zlib-compressed JSON of the event
+    encoding: Mapped[str] = mapped_column(String(16), default="zlib", nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    raw_size: Mapped[int] = mapped_column(Integer, nullable=False)  # Uncompressed JSON bytes
+    truncated: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)  # Long strings were cut to fit the cap
+    
+    # Timestamp
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,19 @@
+"""
+Per-project system prompt overrides
+"""
+from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.db.base import Base
+
+
+class ProjectPrompt(Base):
+    """Custom system prompt replacing app/prompt/system-prompt.md for one project"""
+    __tablename__ = "project_prompts"
+
+    project_id: Mapped[str] = mapped_column(String(64), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    system_prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -79,6 +79,8 @@ class UserRequest(Base):
             return "pending" if not self.started_at else "running"
         elif self.is_successful is True:
             return "completed"
+        elif self.result_metadata and self.result_metadata.get("cancelled"):
+            return "cancelled"
         else:
             return "failed"
             
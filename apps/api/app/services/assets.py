@@ -1,6 +1,37 @@
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import mimetypes
 import os
+import re
+import tempfile
+import threading
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+from app.models.assets import ProjectAsset
+
+try:
+    from PIL import Image, ImageOps
+    IMAGING_AVAILABLE = True
+except ImportError:
+    IMAGING_AVAILABLE = False
+
+
+# Thumbnails and downscaled copies, under the project's assets/ directory
+DERIVED_DIR = "derived"
+# Longest an ACT run waits for an attachment's downscaled copy before using the original
+PROCESSING_WAIT_SECONDS = 10.0
+# Image types the thumbnail workers cannot decode
+UNPROCESSABLE_TYPES = frozenset({"image/svg+xml"})
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
 
 
 def ensure_dir(path: str) -> None:
@@ -17,3 +48,269 @@ def write_text(path: str, data: str) -> None:
     ensure_dir(str(Path(path).parent))
     with open(path, "w", encoding="utf-8") as f:
         f.write(data)
+
+
+class AssetError(Exception):
+    """Raised when an upload or asset reference is rejected"""
+    def __init__(self, message: str, status_code: int = 400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+def project_assets_dir(project_id: str) -> str:
+    return os.path.join(settings.projects_root, project_id, "assets")
+
+
+def asset_path(asset: ProjectAsset, filename: Optional[str] = None) -> str:
+    """Absolute path of an asset file (or of one of its derived files)"""
+    return os.path.join(project_assets_dir(asset.project_id), filename or asset.filename)
+
+
+def _extension(filename: Optional[str], mime_type: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if _EXTENSION.match(extension):
+        return extension
+    return mimetypes.guess_extension(mime_type) or ".bin"
+
+
+def asset_to_dict(asset: ProjectAsset) -> Dict[str, Any]:
+    return {
+        "id": asset.id,
+        "path": f"assets/{asset.filename}",
+        "absolute_path": asset_path(asset),
+        "filename": asset.filename,
+        "original_filename": asset.original_filename,
+        "mime_type": asset.mime_type,
+        "size": asset.size,
+        "sha256": asset.sha256,
+        "width": asset.width,
+        "height": asset.height,
+        "thumbnail_path": f"assets/{asset.thumbnail_filename}" if asset.thumbnail_filename else None,
+        "processing_status": asset.processing_status
+    }
+
+
+async def upload_chunks(upload: Any, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Chunks of a FastAPI UploadFile, without reading it into memory at once"""
+    chunk_size = chunk_size or settings.asset_upload_chunk_bytes
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def store_stream(db: Session, project_id: str, chunks: AsyncIterator[bytes],
+                       filename: Optional[str], mime_type: str) -> Tuple[ProjectAsset, bool]:
+    """Write an upload to the project's assets while hashing it; returns (asset, created).
+
+    Content already stored for the project is not written twice: the existing asset is returned.
+    """
+    assets_dir = project_assets_dir(project_id)
+    await asyncio.to_thread(ensure_dir, assets_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=assets_dir, prefix=".upload-", suffix=".tmp")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.asset_max_upload_bytes:
+                    raise AssetError(f"File exceeds the {settings.asset_max_upload_bytes} byte upload limit", 413)
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        if size == 0:
+            raise AssetError("File is empty")
+
+        sha256 = hasher.hexdigest()
+        existing = db.query(ProjectAsset).filter(
+            ProjectAsset.project_id == project_id, ProjectAsset.sha256 == sha256
+        ).first()
+        if existing is not None and os.path.exists(asset_path(existing)):
+            return existing, False
+
+        final_name = f"{sha256[:32]}{_extension(filename, mime_type)}"
+        os.replace(tmp_path, os.path.join(assets_dir, final_name))
+        tmp_path = None
+        if existing is not None:
+            # Row outlived its file (e.g. assets/ cleaned by hand): restore it
+            existing.filename = final_name
+            db.commit()
+            return existing, False
+
+        processable = IMAGING_AVAILABLE and mime_type.startswith("image/") and mime_type not in UNPROCESSABLE_TYPES
+        asset = ProjectAsset(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            sha256=sha256,
+            filename=final_name,
+            original_filename=filename,
+            mime_type=mime_type,
+            size=size,
+            processing_status="pending" if processable else "skipped"
+        )
+        db.add(asset)
+        try:
+            db.commit()
+        except IntegrityError:
+            # The same content was stored concurrently
+            db.rollback()
+            return db.query(ProjectAsset).filter(
+                ProjectAsset.project_id == project_id, ProjectAsset.sha256 == sha256
+            ).one(), False
+        if processable:
+            asset_processor.submit(asset)
+        return asset, True
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+async def store_bytes(db: Session, project_id: str, data: bytes, filename: Optional[str],
+                      mime_type: str) -> Tuple[ProjectAsset, bool]:
+    async def single() -> AsyncIterator[bytes]:
+        yield data
+    return await store_stream(db, project_id, single(), filename, mime_type)
+
+
+def resolve_assets(db: Session, project_id: str, asset_ids: Iterable[str]) -> Dict[str, ProjectAsset]:
+    """id -> asset for ids that must all belong to the project"""
+    ids = list(dict.fromkeys(asset_ids))
+    if not ids:
+        return {}
+    assets = {
+        asset.id: asset for asset in
+        db.query(ProjectAsset).filter(ProjectAsset.project_id == project_id, ProjectAsset.id.in_(ids))
+    }
+    missing = [asset_id for asset_id in ids if asset_id not in assets]
+    if missing:
+        raise AssetError(f"Unknown asset ids: {', '.join(missing)}", 404)
+    return assets
+
+
+async def prepare_attachments(db: Session, project_id: str, images: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Image attachments of a run as files on disk: {"asset_id", "name", "mime_type", "path"}
+
+    Inline base64 images are stored as (deduplicated) assets, off the request path; attachments
+    referencing an asset id use the stored file. Large images point at their downscaled copy.
+    """
+    images = list(images or [])
+    assets = resolve_assets(db, project_id, [
+        image.asset_id for image in images if getattr(image, "asset_id", None)
+    ])
+    attached: List[Tuple[Any, ProjectAsset]] = []
+    for image in images:
+        asset_id = getattr(image, "asset_id", None)
+        if asset_id:
+            attached.append((image, assets[asset_id]))
+        elif getattr(image, "base64_data", None):
+            data = await asyncio.to_thread(base64.b64decode, image.base64_data)
+            asset, _ = await store_bytes(db, project_id, data, image.name, image.mime_type)
+            attached.append((image, asset))
+
+    # Downscaled copies are made by the workers; give them a moment before falling back to originals
+    await asyncio.gather(*(asset_processor.wait(asset.id) for _, asset in attached))
+    attachments = []
+    for image, asset in attached:
+        db.refresh(asset)
+        path = asset_path(asset, asset.resized_filename)
+        attachments.append({
+            "asset_id": asset.id,
+            "name": getattr(image, "name", None) or asset.original_filename or asset.filename,
+            "mime_type": mimetypes.guess_type(path)[0] if asset.resized_filename else asset.mime_type,
+            "path": path
+        })
+    return attachments
+
+
+class AssetProcessor:
+    """Thumbnail and downscaled-copy generation on a small thread pool"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, asset: ProjectAsset) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="asset-thumbnail"
+                )
+            future = self._executor.submit(self._process, asset.id, asset_path(asset), asset.sha256[:32])
+            self._pending[asset.id] = future
+        future.add_done_callback(lambda _: self._forget(asset.id, future))
+
+    def _forget(self, asset_id: str, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if self._pending.get(asset_id) is future:
+                del self._pending[asset_id]
+
+    async def wait(self, asset_id: str, timeout: float = PROCESSING_WAIT_SECONDS) -> None:
+        """Wait (bounded) for an asset's processing if it is still queued or running"""
+        with self._lock:
+            future = self._pending.get(asset_id)
+        if future is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+        except Exception:
+            pass
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _process(self, asset_id: str, source: str, stem: str) -> None:
+        from app.db.session import SessionLocal
+
+        updates: Dict[str, Any] = {}
+        try:
+            assets_dir = os.path.dirname(source)
+            ensure_dir(os.path.join(assets_dir, DERIVED_DIR))
+            with Image.open(source) as opened:
+                image = ImageOps.exif_transpose(opened)
+                updates["width"], updates["height"] = image.size
+
+                thumbnail_name = self._save_scaled(image, assets_dir, f"{stem}_{settings.asset_thumbnail_size}",
+                                                   settings.asset_thumbnail_size)
+                updates["thumbnail_filename"] = thumbnail_name
+                max_dimension = settings.asset_max_image_dimension
+                if max_dimension and max(image.size) > max_dimension:
+                    updates["resized_filename"] = self._save_scaled(image, assets_dir, f"{stem}_{max_dimension}",
+                                                                    max_dimension)
+            updates["processing_status"] = "ready"
+        except Exception as e:
+            ui.warning(f"Could not process image asset {asset_id}: {e}", "Assets")
+            updates = {"processing_status": "failed"}
+
+        db = SessionLocal()
+        try:
+            db.query(ProjectAsset).filter(ProjectAsset.id == asset_id).update(updates, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_scaled(image: "Image.Image", assets_dir: str, stem: str, edge: int) -> str:
+        """Save a copy fitting in edge x edge px; returns its name relative to assets/"""
+        copy = image.copy()
+        copy.thumbnail((edge, edge))
+        has_alpha = copy.mode in ("RGBA", "LA") or (copy.mode == "P" and "transparency" in copy.info)
+        if has_alpha:
+            name = f"{DERIVED_DIR}/{stem}.png"
+            copy.save(os.path.join(assets_dir, name), "PNG", optimize=True)
+        else:
+            name = f"{DERIVED_DIR}/{stem}.jpg"
+            copy.convert("RGB").save(os.path.join(assets_dir, name), "JPEG", quality=85, optimize=True)
+        return name
+
+
+asset_processor = AssetProcessor(workers=settings.asset_thumbnail_workers)
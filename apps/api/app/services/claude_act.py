@@ -2,7 +2,6 @@ import os
 from typing import Tuple, Optional, Callable
 import json
 from datetime import datetime
-from pathlib import Path
 
 from claude_code_sdk import query, ClaudeCodeOptions
 from claude_code_sdk.types import (
@@ -10,93 +9,31 @@ from claude_code_sdk.types import (
     ContentBlock, TextBlock, ThinkingBlock, ToolUseBlock, ToolResultBlock
 )
 
-
-DEFAULT_MODEL = os.getenv("CLAUDE_CODE_MODEL", "claude-sonnet-4-20250514")
+from app.services.prompts import prompt_store
 
 
-def find_prompt_file() -> Path:
-    """
-    Find the system-prompt.md file in app/prompt/ directory.
-    """
-    current_path = Path(__file__).resolve()
-    
-    # Get the app directory (current file is in app/services/)
-    app_dir = current_path.parent.parent  # app/
-    prompt_file = app_dir / 'prompt' / 'system-prompt.md'
-    
-    if prompt_file.exists():
-        return prompt_file
-    
-    # Fallback: look for system-prompt.md in various locations
-    fallback_locations = [
-        current_path.parent.parent / 'prompt' / 'system-prompt.md',  # app/prompt/
-        current_path.parent.parent.parent.parent / 'docs' / 'system-prompt.md',  # project-root/docs/
-        current_path.parent.parent.parent.parent / 'system-prompt.md',  # project-root/
-    ]
-    
-    for location in fallback_locations:
-        if location.exists():
-            return location
-    
-    # Return expected location even if it doesn't exist
-    return prompt_file
+DEFAULT_MODEL = os.getenv("CLAUDE_CODE_MODEL", "claude-sonnet-4-20250514")
 
 
 def load_system_prompt(force_reload: bool = False) -> str:
     """
-    Load system prompt from app/prompt/system-prompt.md file.
+    Load the default system prompt from app/prompt/system-prompt.md.
     Falls back to basic prompt if file not found.
     
     Args:
-        force_reload: If True, ignores cache and reloads from file
+        force_reload: If True, re-reads the file even if it did not change
     """
-    # Simple caching mechanism
-    if not force_reload and hasattr(load_system_prompt, '_cached_prompt'):
-        return load_system_prompt._cached_prompt
-    
-    try:
-        prompt_file = find_prompt_file()
-        
-        if prompt_file.exists():
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                print(f"✅ Loaded system prompt from: {prompt_file} ({len(content)} chars)")
-                
-                # Cache the loaded prompt
-                load_system_prompt._cached_prompt = content
-                return content
-        else:
-            print(f"⚠️  System prompt file not found at: {prompt_file}")
-            
-    except Exception as e:
-        print(f"❌ Error loading system prompt: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    # Fallback to basic prompt
-    fallback_prompt = (
-        "You are Claude Code, an advanced AI coding assistant specialized in building modern fullstack web applications.\n"
-        "You assist users by chatting with them and making changes to their code in real-time.\n\n"
-        "Constraints:\n"
-        "- Do not delete files entirely; prefer edits.\n"
-        "- Keep changes minimal and focused.\n"
-        "- Use UTF-8 encoding.\n"
-        "- Follow modern development best practices.\n"
-    )
-    
-    print(f"🔄 Using fallback system prompt ({len(fallback_prompt)} chars)")
-    load_system_prompt._cached_prompt = fallback_prompt
-    return fallback_prompt
+    return prompt_store.default(force_reload=force_reload)
 
 
-def get_system_prompt() -> str:
-    """Get the current system prompt (uses cached version)"""
-    return load_system_prompt(force_reload=False)
+def get_system_prompt(project_id: Optional[str] = None) -> str:
+    """Get the system prompt in effect for a project (its override, else the default)"""
+    return prompt_store.get(project_id)
 
 
-def get_initial_system_prompt() -> str:
-    """Get the initial system prompt for project creation (uses cached version)"""
-    return load_system_prompt(force_reload=False)
+def get_initial_system_prompt(project_id: Optional[str] = None) -> str:
+    """Get the initial system prompt for project creation"""
+    return prompt_store.get(project_id)
 
 
 # System prompt is now loaded dynamically via get_system_prompt() and get_initial_system_prompt()
@@ -0,0 +1,269 @@
+"""
+Warm Claude SDK clients
+
+Every ClaudeSDKClient spawns and initializes a Claude Code process before its first token. The
+pool keeps a project's client connected after a turn that completed cleanly, so the project's
+next instruction with the same Claude session and options is sent to the running process
+(which already holds the conversation) instead of starting and resuming a new one.
+
+The SDK requires connect() and disconnect() to happen in the same task (it keeps an anyio task
+group open in between), so each client is owned by a small host task that connects it, waits
+until the client is closed and then disconnects it. Runs only query and read the client.
+
+At most one idle client is kept per project and `max_clients` overall (least recently used
+evicted first). Idle clients are closed after `idle_seconds`, and a client whose CLI process
+exceeds `max_rss_mb` is closed instead of being kept. With the pool disabled every lease gets a
+fresh client that is closed on release, as before.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+
+
+# ClaudeCodeOptions fields a warm process was started with; a lease needing different values gets a new client
+FINGERPRINT_FIELDS = (
+    "system_prompt", "allowed_tools", "disallowed_tools", "permission_mode", "model",
+    "include_partial_messages", "cwd", "max_turns", "mcp_servers"
+)
+
+
+def options_fingerprint(options: Any) -> Tuple:
+    values = []
+    for name in FINGERPRINT_FIELDS:
+        value = getattr(options, name, None)
+        if isinstance(value, list):
+            value = tuple(value)
+        elif isinstance(value, dict):
+            value = repr(sorted(value.items()))
+        values.append(value)
+    return tuple(values)
+
+
+def _process_rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """Resident set size of a process (Linux /proc), None where unavailable"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class PooledClient:
+    """A connected SDK client and the host task that owns its connection"""
+
+    def __init__(self, project_id: str, options: Any, client_factory: Callable[..., Any]):
+        self.project_id = project_id
+        self.fingerprint = options_fingerprint(options)
+        self.client = client_factory(options=options)
+        self.session_id: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.turns = 0
+        self.closed = False
+        self._connected: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._host_task: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        # The SDK does not expose its CLI process; read it off the transport when present
+        process = getattr(getattr(self.client, "_transport", None), "_process", None)
+        return getattr(process, "pid", None)
+
+    @property
+    def alive(self) -> bool:
+        if self.closed or self._host_task is None or self._host_task.done():
+            return False
+        process = getattr(getattr(self.client, "_transport", None), "_process", None)
+        return getattr(process, "returncode", None) is None
+
+    def rss_bytes(self) -> Optional[int]:
+        return _process_rss_bytes(self.pid)
+
+    async def connect(self) -> None:
+        self._host_task = asyncio.create_task(self._host())
+        await asyncio.shield(self._connected)
+
+    async def _host(self) -> None:
+        try:
+            await self.client.connect()
+        except BaseException as e:
+            self.closed = True
+            if not self._connected.done():
+                self._connected.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        self._connected.set_result(None)
+        try:
+            await self._closing.wait()
+        finally:
+            # Also reached when the SDK's reader fails and cancels this task
+            self.closed = True
+            try:
+                await self.client.disconnect()
+            except Exception as e:
+                ui.debug(f"Claude SDK client disconnect failed: {e}", "Claude SDK")
+
+    async def close(self, timeout: float = 10.0) -> None:
+        self.closed = True
+        self._closing.set()
+        task = self._host_task
+        if task is None or task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        except Exception:
+            pass
+
+
+class ClaudeClientPool:
+    """Idle SDK clients by project, reused for the project's next turn in the same session"""
+
+    def __init__(self, enabled: bool, max_clients: int, idle_seconds: float, max_rss_mb: int,
+                 client_factory: Optional[Callable[..., Any]] = None):
+        self.enabled = enabled and max_clients > 0
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self._client_factory = client_factory
+        self._idle: "OrderedDict[str, PooledClient]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"warm": 0, "cold": 0, "evicted_idle": 0, "evicted_memory": 0, "evicted_lru": 0, "discarded": 0}
+
+    @property
+    def client_factory(self) -> Callable[..., Any]:
+        if self._client_factory is None:
+            from claude_code_sdk import ClaudeSDKClient
+            self._client_factory = ClaudeSDKClient
+        return self._client_factory
+
+    async def acquire(self, project_id: str, session_id: Optional[str], options: Any) -> Tuple[PooledClient, bool]:
+        """A connected client for one turn, and whether it is a warm one; hand it back with release()"""
+        if self.enabled:
+            pooled = self._idle.pop(project_id, None)
+            if pooled is not None:
+                if (pooled.alive and pooled.session_id is not None and pooled.session_id == session_id
+                        and pooled.fingerprint == options_fingerprint(options)):
+                    self.stats["warm"] += 1
+                    return pooled, True
+                # Different session (e.g. cleared) or options (model, system prompt, tools)
+                self.stats["discarded"] += 1
+                await pooled.close()
+
+        pooled = PooledClient(project_id, options, self.client_factory)
+        try:
+            await pooled.connect()
+        except BaseException:
+            # Cancelled (or budget hit) while connecting: the host task still finishes connect() and
+            # would then hold the CLI process open with no one to close it
+            await asyncio.shield(pooled.close())
+            raise
+        self.stats["cold"] += 1
+        return pooled, False
+
+    async def release(self, pooled: PooledClient, session_id: Optional[str], reusable: bool) -> None:
+        """Keep the client warm for the project's next turn, or close it"""
+        pooled.turns += 1
+        pooled.last_used = time.monotonic()
+        pooled.session_id = session_id
+        if not (self.enabled and reusable and session_id and pooled.alive):
+            await pooled.close()
+            return
+        if self.max_rss_bytes and (pooled.rss_bytes() or 0) > self.max_rss_bytes:
+            self.stats["evicted_memory"] += 1
+            ui.debug(f"Closing Claude SDK client of project {pooled.project_id}: over memory cap", "Claude SDK")
+            await pooled.close()
+            return
+
+        previous = self._idle.pop(pooled.project_id, None)
+        self._idle[pooled.project_id] = pooled
+        if previous is not None and previous is not pooled:
+            await previous.close()
+        while len(self._idle) > self.max_clients:
+            _, oldest = self._idle.popitem(last=False)
+            self.stats["evicted_lru"] += 1
+            await oldest.close()
+
+    async def discard(self, project_id: str) -> None:
+        """Close a project's idle client (project deleted, sessions reset)"""
+        pooled = self._idle.pop(project_id, None)
+        if pooled is not None:
+            await pooled.close()
+
+    async def evict(self) -> int:
+        """Close idle clients past idle_seconds, dead or over the memory cap; returns how many"""
+        now = time.monotonic()
+        expired = []
+        for project_id, pooled in list(self._idle.items()):
+            if not pooled.alive or now - pooled.last_used > self.idle_seconds:
+                self.stats["evicted_idle"] += 1
+            elif self.max_rss_bytes and (pooled.rss_bytes() or 0) > self.max_rss_bytes:
+                self.stats["evicted_memory"] += 1
+            else:
+                continue
+            expired.append(self._idle.pop(project_id))
+        for pooled in expired:
+            await pooled.close()
+        return len(expired)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "idle": [
+                {
+                    "project_id": pooled.project_id,
+                    "session_id": pooled.session_id,
+                    "turns": pooled.turns,
+                    "idle_seconds": round(now - pooled.last_used, 1),
+                    "rss_bytes": pooled.rss_bytes()
+                }
+                for pooled in self._idle.values()
+            ],
+            **self.stats
+        }
+
+    # Background eviction
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        idle = list(self._idle.values())
+        self._idle.clear()
+        await asyncio.gather(*(pooled.close() for pooled in idle), return_exceptions=True)
+
+    async def _run(self) -> None:
+        interval = max(1.0, min(self.idle_seconds / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict()
+            except Exception as e:
+                ui.error(f"Claude SDK client eviction failed: {e}", "Claude SDK")
+
+
+claude_clients = ClaudeClientPool(
+    enabled=settings.claude_client_pool,
+    max_clients=settings.claude_client_pool_size,
+    idle_seconds=settings.claude_client_idle_seconds,
+    max_rss_mb=settings.claude_client_max_rss_mb
+)
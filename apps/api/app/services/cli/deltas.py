@@ -0,0 +1,114 @@
+"""
+Incremental assistant text (message_delta frames)
+
+Adapters yield MessageDelta objects for text that is still streaming. The manager feeds them to a
+DeltaThrottler, which coalesces text per message id and sends at most `fps` frames per second.
+The consolidated Message is persisted once, under the same id, when the text is complete.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.terminal_ui import ui
+from app.core.websocket.manager import manager as ws_manager
+
+
+class MessageDelta:
+    """A chunk of text for a message that has not been persisted yet"""
+
+    __slots__ = ("message_id", "text", "role", "message_type")
+
+    def __init__(self, message_id: str, text: str, role: str = "assistant", message_type: str = "chat"):
+        self.message_id = message_id
+        self.text = text
+        self.role = role
+        self.message_type = message_type
+
+
+class _PendingStream:
+    __slots__ = ("role", "message_type", "chunks", "seq", "last_sent", "timer")
+
+    def __init__(self, role: str, message_type: str):
+        self.role = role
+        self.message_type = message_type
+        self.chunks: List[str] = []
+        self.seq = 0
+        self.last_sent = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class DeltaThrottler:
+    """Coalesces MessageDelta text per message id into rate-limited message_delta frames"""
+
+    def __init__(self, project_id: str, session_id: str, conversation_id: Optional[str], fps: int):
+        self.project_id = project_id
+        self.session_id = session_id
+        self.conversation_id = conversation_id
+        self.interval = 1.0 / fps if fps and fps > 0 else None
+        self._streams: Dict[str, _PendingStream] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval is not None
+
+    async def push(self, delta: MessageDelta) -> None:
+        """Queue text for a streaming message; sends immediately if the frame budget allows"""
+        if not self.enabled or not delta.text:
+            return
+
+        stream = self._streams.get(delta.message_id)
+        if stream is None:
+            stream = self._streams[delta.message_id] = _PendingStream(delta.role, delta.message_type)
+        stream.chunks.append(delta.text)
+
+        wait = stream.last_sent + self.interval - time.monotonic()
+        if wait <= 0:
+            await self._send(delta.message_id, stream)
+        elif stream.timer is None:
+            stream.timer = asyncio.get_running_loop().call_later(
+                wait, lambda: asyncio.ensure_future(self._send_scheduled(delta.message_id))
+            )
+
+    def complete(self, message_id: str) -> None:
+        """Drop pending text for a message whose final version is about to be sent"""
+        stream = self._streams.pop(message_id, None)
+        if stream and stream.timer:
+            stream.timer.cancel()
+
+    def close(self) -> None:
+        for message_id in list(self._streams):
+            self.complete(message_id)
+
+    async def _send_scheduled(self, message_id: str) -> None:
+        stream = self._streams.get(message_id)
+        if stream is None:
+            return
+        stream.timer = None
+        await self._send(message_id, stream)
+
+    async def _send(self, message_id: str, stream: _PendingStream) -> None:
+        if not stream.chunks:
+            return
+        text = "".join(stream.chunks)
+        stream.chunks.clear()
+        stream.seq += 1
+        stream.last_sent = time.monotonic()
+
+        frame: Dict[str, Any] = {
+            "type": "message_delta",
+            "data": {
+                "id": message_id,
+                "seq": stream.seq,
+                "delta": text,
+                "role": stream.role,
+                "message_type": stream.message_type,
+                "session_id": self.session_id,
+                "conversation_id": self.conversation_id
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        try:
+            await ws_manager.send_message(self.project_id, frame)
+        except Exception as e:
+            ui.debug(f"message_delta send failed: {e}", "Message")
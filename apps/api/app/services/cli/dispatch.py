@@ -0,0 +1,93 @@
+"""
+Table-driven dispatch for streamed CLI output
+Shared by the Claude SDK, Cursor and Gemini adapters
+"""
+import importlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+CLAUDE_SDK_TYPE_NAMES = (
+    "SystemMessage",
+    "AssistantMessage",
+    "UserMessage",
+    "ResultMessage",
+    "TextBlock",
+    "ToolUseBlock",
+    "ToolResultBlock",
+    "StreamEvent",
+)
+
+
+def load_claude_sdk_types() -> Dict[str, type]:
+    """Resolve the Claude SDK message/block classes once. Returns an empty mapping if no SDK is installed."""
+    for module_name in ("anthropic.claude_code.types", "claude_code_sdk.types"):
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        return {name: getattr(module, name) for name in CLAUDE_SDK_TYPE_NAMES if hasattr(module, name)}
+    return {}
+
+
+class MessageDispatcher:
+    """
+    Routes streamed messages to handlers registered by kind.
+
+    Dict events (Cursor/Gemini NDJSON) are keyed by their ``key_field``. Objects (Claude SDK
+    messages and content blocks) are keyed by class name: the MRO is walked once per class and
+    cached, so steady-state dispatch is a single dict lookup.
+    """
+
+    def __init__(self, key_field: str = "type", default: Optional[Callable[..., Any]] = None):
+        self.key_field = key_field
+        self.default = default
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._class_kinds: Dict[type, Optional[str]] = {}
+
+    def register(self, kind: str, handler: Callable[..., Any]) -> "MessageDispatcher":
+        self._handlers[kind] = handler
+        self._class_kinds.clear()
+        return self
+
+    def bind_types(self, types: Iterable[type]) -> "MessageDispatcher":
+        """Pre-resolve known classes so they never take the MRO walk"""
+        for cls in types:
+            self._class_kinds[cls] = self._resolve_class(cls)
+        return self
+
+    def classify(self, obj: Any) -> Optional[str]:
+        """Return the registered kind for obj, or None if no handler matches"""
+        if isinstance(obj, dict):
+            kind = obj.get(self.key_field)
+            return kind if kind in self._handlers else None
+
+        cls = type(obj)
+        try:
+            kind = self._class_kinds[cls]
+        except KeyError:
+            kind = self._class_kinds[cls] = self._resolve_class(cls)
+
+        if kind is None:
+            # Duck-typed objects carrying e.g. type="result"
+            attr = getattr(obj, self.key_field, None)
+            if isinstance(attr, str) and attr in self._handlers:
+                return attr
+        return kind
+
+    def handler(self, kind: Optional[str]) -> Optional[Callable[..., Any]]:
+        if kind is None:
+            return self.default
+        return self._handlers.get(kind, self.default)
+
+    def dispatch(self, obj: Any, *args, **kwargs) -> Any:
+        """Call the handler for obj (or the default). Returns None when nothing matches."""
+        handler = self.handler(self.classify(obj))
+        if handler is None:
+            return None
+        return handler(obj, *args, **kwargs)
+
+    def _resolve_class(self, cls: type) -> Optional[str]:
+        for klass in cls.__mro__:
+            if klass.__name__ in self._handlers:
+                return klass.__name__
+        return None
@@ -0,0 +1,86 @@
+"""
+Batched text edits for the replace / multi_edit tools
+
+Edits are grouped per file and applied in order to the file's content in memory. A file is only
+written when every edit matched the expected number of times and the content actually changed.
+"""
+import difflib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+MAX_DIFF_LINES = 200
+
+
+class EditError(Exception):
+    """An edit that cannot be applied as requested"""
+    def __init__(self, message: str, index: int, found: Optional[int] = None):
+        self.message = message
+        self.index = index
+        self.found = found
+        super().__init__(message)
+
+
+def normalize_edits(
+    edits: List[Dict[str, Any]],
+    resolve: Optional[Callable[[str], str]] = None
+) -> Dict[str, Tuple[str, List[Tuple[int, Dict[str, Any]]]]]:
+    """Group edits by file, keeping their request order and original index
+
+    Files are keyed by resolve(file_path) so that different spellings of one file ("c.txt",
+    "./c.txt") land in the same group; each group keeps the first spelling for reporting.
+    """
+    grouped: Dict[str, Tuple[str, List[Tuple[int, Dict[str, Any]]]]] = {}
+    for index, edit in enumerate(edits):
+        if not isinstance(edit, dict) or not edit.get("file_path"):
+            raise EditError("Each edit needs a file_path", index)
+        if "old_string" not in edit or "new_string" not in edit:
+            raise EditError("Each edit needs old_string and new_string", index)
+        file_path = edit["file_path"]
+        key = resolve(file_path) if resolve is not None else file_path
+        grouped.setdefault(key, (file_path, []))[1].append((index, edit))
+    return grouped
+
+
+def apply_edits(content: Optional[str], edits: List[Tuple[int, Dict[str, Any]]]) -> Tuple[str, int]:
+    """Apply edits to content (None = file does not exist). Returns (new content, replacements)"""
+    replacements = 0
+    for index, edit in edits:
+        old_string, new_string = edit["old_string"], edit["new_string"]
+        expected = edit.get("expected_replacements")
+        expected = 1 if expected is None else int(expected)
+
+        if old_string == "":
+            # An empty old_string creates the file, as in the Gemini CLI replace tool
+            if content is not None:
+                raise EditError("old_string is empty but the file already exists", index)
+            content = new_string
+            replacements += 1
+            continue
+        if content is None:
+            raise EditError("File does not exist", index)
+        if old_string == new_string:
+            raise EditError("old_string and new_string are identical", index)
+
+        found = content.count(old_string)
+        if found != expected:
+            raise EditError(
+                f"Expected {expected} occurrence(s) of old_string but found {found}", index, found
+            )
+        content = content.replace(old_string, new_string)
+        replacements += found
+    return content if content is not None else "", replacements
+
+
+def compact_diff(path: str, before: str, after: str, context: int = 1) -> str:
+    """Unified diff with minimal context, capped at MAX_DIFF_LINES lines"""
+    lines = list(difflib.unified_diff(
+        before.splitlines(keepends=True),
+        after.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}",
+        n=context
+    ))
+    if len(lines) > MAX_DIFF_LINES:
+        omitted = len(lines) - MAX_DIFF_LINES
+        lines = lines[:MAX_DIFF_LINES] + [f"... [{omitted} more diff lines]\n"]
+    return "".join(line if line.endswith("\n") else line + "\n" for line in lines)
@@ -0,0 +1,65 @@
+"""
+Non-blocking file helpers for the tool executor
+
+Reads and writes run in aiofiles' thread pool instead of on the event loop. Writes go to a
+temporary file in the target directory that is renamed over the destination, so readers never
+observe a partially written file.
+"""
+import asyncio
+import os
+import uuid
+from itertools import islice
+from typing import Any, Dict, Optional
+
+import aiofiles
+import aiofiles.os
+
+
+async def read_text(path: str, encoding: str = "utf-8") -> str:
+    async with aiofiles.open(path, "r", encoding=encoding) as f:
+        return await f.read()
+
+
+def _read_lines(path: str, offset: int, limit: Optional[int], encoding: str) -> Dict[str, Any]:
+    with open(path, "r", encoding=encoding) as f:
+        lines = list(islice(f, offset, None if limit is None else offset + limit))
+        # One more line tells whether the window reached the end of the file
+        has_more = limit is not None and next(f, None) is not None
+    return {
+        "content": "".join(lines),
+        "offset": offset,
+        "lines": len(lines),
+        "next_offset": offset + len(lines) if has_more else None
+    }
+
+
+async def read_text_window(path: str, offset: int = 0, limit: Optional[int] = None,
+                           encoding: str = "utf-8") -> Dict[str, Any]:
+    """Lines [offset, offset + limit) of a text file, without loading the rest of it"""
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must be non-negative")
+    # Single hop to a worker thread rather than one per line
+    return await asyncio.to_thread(_read_lines, path, offset, limit, encoding)
+
+
+async def atomic_write_text(path: str, content: str, encoding: str = "utf-8") -> None:
+    """Write content to a temp file next to path, then rename it over path"""
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        async with aiofiles.open(tmp_path, "w", encoding=encoding) as f:
+            await f.write(content)
+            await f.flush()
+        try:
+            # Keep the permissions of the file being replaced (e.g. executable scripts)
+            mode = (await aiofiles.os.stat(path)).st_mode
+            await asyncio.to_thread(os.chmod, tmp_path, mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        await aiofiles.os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
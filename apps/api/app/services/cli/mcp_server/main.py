@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse
 import uvicorn
 import logging
 from app.services.cli.unified_manager import UnifiedCLIManager
+from app.services.cli.tools import tool_registry
 from app.api.deps import get_db
 
 # Set up logging
@@ -22,21 +23,33 @@ PROJECT_PATH = None
 SESSION_ID = None
 CONVERSATION_ID = None
 
+# Upper bound on calls accepted by one /call_tools request
+MAX_BATCH_CALLS = 100
+
+_cli_manager = None
+
 def get_cli_manager():
-    """Get a CLI manager instance with current server state"""
+    """Get the CLI manager for the current server state, created on first use"""
+    global _cli_manager
+    if _cli_manager is not None:
+        return _cli_manager
     try:
         db_session = next(get_db())
-        return UnifiedCLIManager(
+        _cli_manager = UnifiedCLIManager(
             project_id=PROJECT_ID,
             project_path=PROJECT_PATH,
             session_id=SESSION_ID,
             conversation_id=CONVERSATION_ID,
             db=db_session
         )
+        return _cli_manager
     except Exception as e:
         logger.error(f"Failed to create CLI manager: {e}")
         raise
 
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
 # Root endpoint for health check
 @app.get("/")
 async def root():
@@ -53,86 +66,8 @@ async def list_tools():
     """List available tools - primary endpoint"""
     logger.info("Tools requested via GET /tools")
     
-    def get_schema(schema: dict):
-        return {"input_schema": schema}
-
-    tools = [
-        {
-            "name": "run_shell_command",
-            "description": "Executes a shell command within a secure, sandboxed environment",
-            **get_schema({
-                "type": "object",
-                "properties": {"command": {"type": "string", "description": "The shell command to execute"}},
-                "required": ["command"]
-            })
-        },
-        {
-            "name": "write_file",
-            "description": "Writes content to a file",
-            **get_schema({
-                "type": "object",
-                "properties": {
-                    "file_path": {"type": "string", "description": "Path to the file"},
-                    "content": {"type": "string", "description": "Content to write"}
-                },
-                "required": ["file_path", "content"]
-            })
-        },
-        {
-            "name": "read_file",
-            "description": "Reads content from a file",
-            **get_schema({
-                "type": "object",
-                "properties": {"file_path": {"type": "string", "description": "Path to the file"}},
-                "required": ["file_path"]
-            })
-        },
-        {
-            "name": "replace",
-            "description": "Replaces text in a file",
-            **get_schema({
-                "type": "object",
-                "properties": {
-                    "file_path": {"type": "string", "description": "Path to the file"},
-                    "old_string": {"type": "string", "description": "Text to replace"},
-                    "new_string": {"type": "string", "description": "Replacement text"},
-                    "expected_replacements": {"type": "integer", "description": "Number of replacements expected. Defaults to 1."}
-                },
-                "required": ["file_path", "old_string", "new_string"]
-            })
-        },
-        {
-            "name": "list_directory",
-            "description": "Lists directory contents",
-            **get_schema({
-                "type": "object",
-                "properties": {"path": {"type": "string", "description": "Directory path"}},
-                "required": ["path"]
-            })
-        },
-        {
-            "name": "glob",
-            "description": "Find files matching a pattern",
-            **get_schema({
-                "type": "object",
-                "properties": {"pattern": {"type": "string", "description": "Glob pattern"}},
-                "required": ["pattern"]
-            })
-        },
-        {
-            "name": "search_file_content",
-            "description": "Search for patterns in files",
-            **get_schema({
-                "type": "object",
-                "properties": {
-                    "pattern": {"type": "string", "description": "Search pattern"},
-                    "path": {"type": "string", "description": "Optional search path"},
-                    "include": {"type": "string", "description": "Optional glob pattern to filter files"}
-                },
-                "required": ["pattern"]
-            })
-        }
-    ]
+    # Same registry the tool executor routes calls through
+    tools = tool_registry.list_tools()
 
     server_name = "claudable-tools"
     tools_response = {
@@ -182,32 +117,123 @@ async def execute_tool_alt(request: dict):
     logger.info(f"Tool execution received (alt): {request}")
     return await execute_tool_internal(request)
 
+# Batched tool execution
+@app.post("/call_tools")
+async def call_tools(request: dict):
+    """Execute many independent tool calls in one round trip
+
+    Body: {"calls": [<call_tool request>, ...]}. Read-only calls run concurrently; calls writing a
+    path run after earlier calls touching it, and shell commands run alone. Results come back in
+    request order.
+    """
+    logger.info(f"Batch tool call received: {len(request.get('calls') or [])} calls")
+    return await execute_tools_internal(request)
+
+@app.post("/mcp/callTools")
+async def call_tools_mcp(request: dict):
+    return await execute_tools_internal(request)
+
 import os
 
+class InvalidToolCall(ValueError):
+    """A tool call whose arguments cannot be parsed; keeps the name it was sent with"""
+    def __init__(self, message: str, tool_name=None):
+        self.message = message
+        self.tool_name = tool_name
+        super().__init__(message)
+
+def _field(value, key: str):
+    return value.get(key) if isinstance(value, dict) else None
+
+def parse_tool_call(request: dict):
+    """Extract (tool name, arguments) from the request formats the various MCP clients send"""
+    tool = request.get("tool")
+    tool_name = (request.get("name") or 
+                (tool if isinstance(tool, str) else None) or
+                request.get("tool_name") or 
+                request.get("toolName") or
+                _field(request.get("function"), "name") or
+                _field(tool, "name"))
+    
+    if isinstance(tool_name, str) and "/" in tool_name:
+        tool_name = tool_name.split("/")[-1]
+    
+    arguments = (request.get("arguments") or
+                request.get("args") or
+                request.get("parameters") or
+                request.get("input") or
+                _field(request.get("function"), "arguments") or
+                _field(tool, "arguments") or
+                _field(tool, "input") or
+                {})
+    if isinstance(arguments, str):
+        # OpenAI-style function calls carry their arguments as a JSON string
+        try:
+            arguments = json.loads(arguments)
+        except ValueError as e:
+            raise InvalidToolCall(f"Arguments are not valid JSON: {e}", tool_name) from e
+    return tool_name, arguments
+
+def validate_tool_call(call) -> tuple:
+    """(tool name, arguments, error message or None) for one call of a batch"""
+    if not isinstance(call, dict):
+        return None, None, "Each call must be an object"
+    try:
+        tool_name, arguments = parse_tool_call(call)
+    except InvalidToolCall as e:
+        return e.tool_name, None, e.message
+    if not tool_name:
+        return tool_name, arguments, "Missing tool name"
+    if not isinstance(tool_name, str):
+        return tool_name, arguments, "Tool name must be a string"
+    if not isinstance(arguments, dict):
+        return tool_name, arguments, "Tool arguments must be an object"
+    return tool_name, arguments, None
+
+async def execute_tools_internal(request: dict):
+    """Internal batch execution logic"""
+    calls = request.get("calls")
+    if not isinstance(calls, list) or not calls:
+        return JSONResponse({"isError": True, "error": "Request needs a non-empty 'calls' list"}, status_code=400)
+    if len(calls) > MAX_BATCH_CALLS:
+        return JSONResponse(
+            {"isError": True, "error": f"At most {MAX_BATCH_CALLS} calls per batch"}, status_code=400
+        )
+
+    results = [None] * len(calls)
+    runnable = []
+    for index, call in enumerate(calls):
+        # A malformed call fails on its own instead of failing the whole batch
+        tool_name, arguments, error = validate_tool_call(call)
+        if error is not None:
+            results[index] = {"success": False, "error": {"type": "InvalidArguments", "message": error}}
+        else:
+            runnable.append(index)
+        calls[index] = {"name": tool_name, "args": arguments}
+
+    try:
+        executed = await tool_registry.execute_batch(get_cli_manager(), [calls[i] for i in runnable])
+    except Exception as e:
+        logger.error(f"Error executing tool batch: {e}")
+        return JSONResponse({"isError": True, "error": f"Internal server error: {str(e)}"}, status_code=500)
+    for index, result in zip(runnable, executed):
+        results[index] = result
+
+    failed = sum(1 for result in results if not result.get("success", False))
+    logger.info(f"Batch of {len(calls)} tool calls finished ({failed} failed)")
+    # JSONResponse already renders compactly; results stay structured instead of JSON-in-text
+    return JSONResponse({
+        "isError": failed > 0,
+        "results": [
+            {"name": call["name"], "isError": not result.get("success", False), "result": result}
+            for call, result in zip(calls, results)
+        ]
+    })
+
 async def execute_tool_internal(request: dict):
     """Internal tool execution logic"""
     try:
-        tool_name = (request.get("name") or 
-                    request.get("tool") or
-                    request.get("tool_name") or 
-                    request.get("toolName") or
-                    (request.get("function") or {}).get("name") or
-                    (request.get("tool") or {}).get("name"))
-        
-        if isinstance(tool_name, str) and "/" in tool_name:
-            tool_name = tool_name.split("/")[-1]
-        
-        arguments = (request.get("arguments") or
-                    request.get("args") or
-                    request.get("parameters") or
-                    request.get("input") or
-                    (request.get("function") or {}).get("arguments") or
-                    (request.get("tool") or {}).get("arguments") or
-                    (request.get("tool") or {}).get("input") or
-                    {})
-        
-        # arguments[arg] = os.path.abspath(os.path.join(repo_path, arguments[arg]))
-        # logger.info(f"Resolved relative path '{arg}' to '{arguments[arg]}'")
+        tool_name, arguments = parse_tool_call(request)
 
         logger.info(f"Executing tool: {tool_name} with args: {arguments}")
 
@@ -224,7 +250,7 @@ async def execute_tool_internal(request: dict):
         
         response = {
             "isError": not result.get("success", False),
-            "content": [{"type": "text", "text": json.dumps(result, indent=2)}]
+            "content": [{"type": "text", "text": compact_json(result)}]
         }
         return JSONResponse(response)
             
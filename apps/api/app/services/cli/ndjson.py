@@ -0,0 +1,128 @@
+"""
+Streaming line framer for CLI stdout/stderr (NDJSON and plain text)
+
+Bytes are appended to a bytearray and complete lines are cut at newline offsets, scanning only
+newly received bytes, so framing is O(n) regardless of line length. Lines longer than
+max_line_bytes are truncated (the rest is skipped up to the next newline) instead of growing
+the buffer without bound.
+"""
+import asyncio
+import codecs
+from typing import AsyncIterator, List, Optional
+
+from app.core.config import settings
+
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class TruncatedLine(str):
+    """A line that exceeded max_line_bytes; holds the decoded head and the original byte size"""
+
+    original_size: int = 0
+
+    def __new__(cls, head: str, original_size: int):
+        line = super().__new__(cls, head)
+        line.original_size = original_size
+        return line
+
+
+class NDJSONFramer:
+    """Incremental bytes -> lines splitter with UTF-8 decoding and a line size cap"""
+
+    def __init__(self, max_line_bytes: Optional[int] = None, encoding: str = "utf-8"):
+        self.max_line_bytes = max_line_bytes or settings.cli_max_line_bytes
+        self.encoding = encoding
+        self.truncated_lines = 0
+        self._buffer = bytearray()
+        self._discarding = False
+        self._truncated_head = ""
+        self._truncated_size = 0
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """Add a chunk and return the lines it completed (without the trailing newline)"""
+        lines: List[str] = []
+        if not chunk:
+            return lines
+
+        if self._discarding:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                self._truncated_size += len(chunk)
+                return lines
+            self._truncated_size += newline
+            lines.append(self._finish_truncated())
+            chunk = chunk[newline + 1:]
+
+        buffer = self._buffer
+        scan_from = len(buffer)  # Bytes already in the buffer are known to contain no newline
+        buffer += chunk
+
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", scan_from)
+            if newline < 0:
+                break
+            if newline - start > self.max_line_bytes:
+                self._truncated_head = self._decode_head(buffer[start:start + self.max_line_bytes])
+                self._truncated_size = newline - start
+                lines.append(self._finish_truncated())
+            else:
+                lines.append(self._decode(buffer[start:newline]))
+            start = scan_from = newline + 1
+
+        if start:
+            del buffer[:start]
+
+        if len(buffer) > self.max_line_bytes:
+            # Keep the head of the oversized line and skip the rest until its newline arrives
+            self._truncated_head = self._decode_head(buffer[:self.max_line_bytes])
+            self._truncated_size = len(buffer)
+            self._discarding = True
+            buffer.clear()
+
+        return lines
+
+    def close(self) -> List[str]:
+        """Flush whatever is left once the stream has ended"""
+        if self._discarding:
+            return [self._finish_truncated()]
+        if not self._buffer:
+            return []
+        line = self._decode(self._buffer)
+        self._buffer.clear()
+        return [line]
+
+    def _decode(self, data) -> str:
+        line = bytes(data).decode(self.encoding, errors="replace")
+        return line[:-1] if line.endswith("\r") else line
+
+    def _decode_head(self, data) -> str:
+        # Incremental decoding drops a multi-byte sequence cut in half at the size cap
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        return decoder.decode(bytes(data), final=False)
+
+    def _finish_truncated(self) -> TruncatedLine:
+        line = TruncatedLine(self._truncated_head, self._truncated_size)
+        self.truncated_lines += 1
+        self._discarding = False
+        self._truncated_head = ""
+        self._truncated_size = 0
+        return line
+
+
+async def iter_lines(
+    stream: asyncio.StreamReader,
+    max_line_bytes: Optional[int] = None,
+    chunk_size: int = READ_CHUNK_SIZE
+) -> AsyncIterator[str]:
+    """Yield decoded lines from a subprocess stream without StreamReader's 64 KiB readline limit"""
+    framer = NDJSONFramer(max_line_bytes)
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        for line in framer.feed(chunk):
+            yield line
+    for line in framer.close():
+        yield line
@@ -0,0 +1,113 @@
+"""
+Subprocess helpers shared by the CLI adapters
+"""
+import asyncio
+import os
+import platform
+import signal
+from typing import Any, Dict, Optional
+
+
+def process_group_kwargs() -> Dict[str, Any]:
+    """Spawn kwargs that put the child in its own process group so its whole tree can be signalled"""
+    if platform.system() == "Windows":
+        return {}
+    return {"start_new_session": True}
+
+
+def _signal_tree(process: asyncio.subprocess.Process, sig: int) -> None:
+    if platform.system() == "Windows":
+        if sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+        return
+    try:
+        # Only signal a group the process leads: the group of a child spawned without
+        # process_group_kwargs() is our own
+        leads_group = os.getpgid(process.pid) == process.pid
+    except ProcessLookupError:
+        leads_group = False
+    if leads_group:
+        try:
+            os.killpg(process.pid, sig)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass
+    process.send_signal(sig)
+
+
+async def terminate_process_tree(
+    process: Optional[asyncio.subprocess.Process],
+    grace_period: float = 5.0
+) -> None:
+    """SIGTERM the process group, then SIGKILL it if it does not exit within the grace period"""
+    if process is None or process.returncode is not None:
+        return
+
+    try:
+        _signal_tree(process, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    try:
+        await asyncio.wait_for(process.wait(), timeout=grace_period)
+    except asyncio.TimeoutError:
+        try:
+            _signal_tree(process, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        await process.wait()
+
+
+async def wait_for_exit(process: asyncio.subprocess.Process, poll_interval: float = 0.05) -> int:
+    """Wait for the process itself to exit
+
+    Unlike process.wait(), which also waits for its pipes to close, this returns while background
+    children that inherited the pipes are still running.
+    """
+    while process.returncode is None:
+        await asyncio.sleep(poll_interval)
+    return process.returncode
+
+
+def process_group_id(process: asyncio.subprocess.Process) -> Optional[int]:
+    """Group a child spawned with process_group_kwargs() leads, None where groups are not used
+
+    Read it at spawn time: the group outlives its leader while background children remain.
+    """
+    if platform.system() == "Windows":
+        return None
+    try:
+        pgid = os.getpgid(process.pid)
+    except ProcessLookupError:
+        return None
+    return pgid if pgid == process.pid else None
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+async def terminate_process_group(pgid: Optional[int], grace_period: float = 2.0) -> None:
+    """SIGTERM what is left of a process group (even after its leader exited), then SIGKILL it"""
+    if pgid is None:
+        return
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+
+    deadline = asyncio.get_running_loop().time() + grace_period
+    while _group_alive(pgid) and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
@@ -0,0 +1,175 @@
+"""
+Process-wide cache of per-project CLI state
+
+Holds each project's resumable CLI session ids and its CLI preferences (preferred CLI, model,
+fallback) so starting an instruction does not query the projects table. Entries are loaded
+from the Project row on first use; writes go to the row first and update the cache only once
+committed. Anything that changes these columns behind the cache's back calls invalidate().
+
+The cache opens its own short-lived DB sessions, so callers' transactions are never committed
+as a side effect and it can be used from adapters that have no session of their own.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.terminal_ui import ui
+from app.models.projects import Project
+
+
+# CLI -> Project column holding its resumable session id (Gemini sessions are not persisted)
+SESSION_COLUMNS = {
+    "claude": "active_claude_session_id",
+    "cursor": "active_cursor_session_id",
+}
+
+_UNSET = object()
+
+
+class ProjectCLIState:
+    """Cached CLI columns of one project"""
+    __slots__ = ("sessions", "preferred_cli", "selected_model", "fallback_enabled", "persisted")
+
+    def __init__(self, project: Optional[Project] = None):
+        self.sessions: Dict[str, Optional[str]] = {
+            cli: getattr(project, column) if project is not None else None
+            for cli, column in SESSION_COLUMNS.items()
+        }
+        self.preferred_cli = (project.preferred_cli if project is not None else None) or "claude"
+        self.selected_model = project.selected_model if project is not None else None
+        self.fallback_enabled = project.fallback_enabled if project is not None and project.fallback_enabled is not None else True
+        # False for ids without a Project row (e.g. CLIs run against a bare directory): memory only
+        self.persisted = project is not None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "sessions": dict(self.sessions),
+            "preferred_cli": self.preferred_cli,
+            "selected_model": self.selected_model,
+            "fallback_enabled": self.fallback_enabled,
+        }
+
+
+def _default_session_factory() -> Session:
+    from app.db.session import SessionLocal
+    return SessionLocal()
+
+
+class ProjectSessionCache:
+    """project_id -> ProjectCLIState, thread-safe, with write-through to the projects table"""
+
+    def __init__(self, session_factory: Callable[[], Session] = _default_session_factory):
+        self.session_factory = session_factory
+        self._states: Dict[str, ProjectCLIState] = {}
+        # Bumped on every write/invalidation so a slow load cannot overwrite newer state
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Serializes writes so the row and the cache end up with the same last value
+        self._write_lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, project_id: str) -> ProjectCLIState:
+        with self._lock:
+            state = self._states.get(project_id)
+            generation = self._generations.get(project_id, 0)
+        if state is not None:
+            return state
+
+        db = self.session_factory()
+        try:
+            state = ProjectCLIState(db.get(Project, project_id))
+        finally:
+            db.close()
+        self.loads += 1
+
+        with self._lock:
+            if self._generations.get(project_id, 0) == generation:
+                self._states.setdefault(project_id, state)
+            return self._states.get(project_id, state)
+
+    def get_session_id(self, project_id: str, cli: str) -> Optional[str]:
+        return self.get(project_id).sessions.get(cli)
+
+    def set_session_id(self, project_id: str, cli: str, session_id: Optional[str]) -> bool:
+        """Store a CLI session id; returns whether it was persisted to the Project row"""
+        column = SESSION_COLUMNS.get(cli)
+        # Kept in memory even without a project row, so a CLI can still resume within the process
+        return self._write(project_id, {column: session_id} if column else {},
+                           lambda state: state.sessions.__setitem__(cli, session_id), memory_only_ok=True)
+
+    def clear_sessions(self, project_id: str) -> bool:
+        def apply(state: ProjectCLIState) -> None:
+            for cli in state.sessions:
+                state.sessions[cli] = None
+        return self._write(project_id, {column: None for column in SESSION_COLUMNS.values()}, apply)
+
+    def set_preferences(self, project_id: str, preferred_cli=_UNSET, selected_model=_UNSET,
+                        fallback_enabled=_UNSET) -> bool:
+        """Update the project's CLI preferences (only the arguments given)"""
+        columns = {
+            name: value for name, value in (
+                ("preferred_cli", preferred_cli),
+                ("selected_model", selected_model),
+                ("fallback_enabled", fallback_enabled),
+            ) if value is not _UNSET
+        }
+
+        def apply(state: ProjectCLIState) -> None:
+            for name, value in columns.items():
+                setattr(state, name, value)
+        return self._write(project_id, columns, apply)
+
+    def prime(self, project: Project) -> ProjectCLIState:
+        """Cache the CLI columns of a Project row the caller already loaded"""
+        state = ProjectCLIState(project)
+        with self._lock:
+            self._generations[project.id] = self._generations.get(project.id, 0) + 1
+            self._states[project.id] = state
+        return state
+
+    def invalidate(self, project_id: str) -> None:
+        """Drop a project's entry; the next get() reloads it from the database"""
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._states.pop(project_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for project_id in self._states:
+                self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._states.clear()
+
+    def _write(self, project_id: str, columns: Dict[str, object], apply: Callable[[ProjectCLIState], None],
+               memory_only_ok: bool = False) -> bool:
+        with self._write_lock:
+            persisted = False
+            if columns:
+                db = self.session_factory()
+                try:
+                    project = db.get(Project, project_id)
+                    if project is not None:
+                        for column, value in columns.items():
+                            setattr(project, column, value)
+                        db.commit()
+                        persisted = True
+                except Exception as e:
+                    db.rollback()
+                    ui.warning(f"Failed to persist CLI state for project {project_id}: {e}", "Session")
+                    # The row may or may not hold the new values; reload on next use
+                    self.invalidate(project_id)
+                    raise
+                finally:
+                    db.close()
+            if not persisted and not memory_only_ok:
+                return False
+
+            state = self.get(project_id)
+            with self._lock:
+                self._generations[project_id] = self._generations.get(project_id, 0) + 1
+                apply(state)
+                self._states[project_id] = state
+            return persisted
+
+
+project_sessions = ProjectSessionCache()
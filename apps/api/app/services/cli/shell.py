@@ -0,0 +1,220 @@
+"""
+Streaming shell execution for the run_shell_command tool
+
+Output is read incrementally instead of through communicate(): only the first and last
+max_output_bytes/2 of each stream are kept, live output is forwarded to the project's WebSocket
+in rate-limited cli_output frames, and the whole process group is killed once the command exits
+(background children included), times out or is cancelled. A per-project semaphore bounds how
+many commands run at once.
+"""
+import asyncio
+import codecs
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+from app.core.websocket.manager import manager as ws_manager
+from app.services.cli.ndjson import READ_CHUNK_SIZE
+from app.services.cli.process import (
+    process_group_id, process_group_kwargs, terminate_process_group, terminate_process_tree, wait_for_exit
+)
+
+
+# How long output pipes are still read after the shell exits; background children keep them open
+PIPE_DRAIN_SECONDS = 0.5
+
+
+class OutputCapture:
+    """Keeps the head and tail of a byte stream within max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    @property
+    def omitted(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            if len(self.tail) > self.tail_limit:
+                # bytearray trims its front in place, so this stays cheap for long streams
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    def text(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.omitted:
+            return head + self.tail.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        return f"{head}\n... [{self.omitted} bytes omitted] ...\n{tail}"
+
+
+class ShellOutputForwarder:
+    """Coalesces live command output into at most one cli_output frame per interval"""
+
+    def __init__(self, project_id: str, command_id: str, command: str, interval: float = 0.25,
+                 max_frame_bytes: int = 16384):
+        self.project_id = project_id
+        self.command_id = command_id
+        self.command = command
+        self.interval = interval
+        self.max_frame_bytes = max_frame_bytes
+        self._chunks: Dict[str, list] = {"stdout": [], "stderr": []}
+        self._sizes: Dict[str, int] = {"stdout": 0, "stderr": 0}
+        self._skipped: Dict[str, int] = {"stdout": 0, "stderr": 0}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: Optional[asyncio.Future] = None
+
+    def push(self, stream: str, text: str) -> None:
+        if not text:
+            return
+        if self._sizes[stream] >= self.max_frame_bytes:
+            # Runaway output: forward what fits in this frame and count the rest
+            self._skipped[stream] += len(text)
+        else:
+            self._chunks[stream].append(text)
+            self._sizes[stream] += len(text)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.interval, self._schedule_send)
+
+    async def close(self, exit_code: Optional[int], timed_out: bool = False) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._sending is not None:
+            await asyncio.gather(self._sending, return_exceptions=True)
+        await self._send(final={"exit_code": exit_code, "timed_out": timed_out})
+
+    def _schedule_send(self) -> None:
+        self._timer = None
+        self._sending = asyncio.ensure_future(self._send())
+
+    async def _send(self, final: Optional[Dict[str, Any]] = None) -> None:
+        for stream in ("stdout", "stderr"):
+            chunks, skipped = self._chunks[stream], self._skipped[stream]
+            if not chunks and not skipped:
+                continue
+            output = "".join(chunks)
+            if skipped:
+                output += f"\n... [{skipped} characters not forwarded] ...\n"
+            self._chunks[stream] = []
+            self._sizes[stream] = self._skipped[stream] = 0
+            await self._emit({"stream": stream, "output": output})
+        if final is not None:
+            await self._emit({"stream": "exit", "output": "", **final})
+
+    async def _emit(self, data: Dict[str, Any]) -> None:
+        frame = {
+            "type": "cli_output",
+            "cli_type": "shell",
+            "output": data["output"],
+            "data": {"command_id": self.command_id, "command": self.command, **data},
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        try:
+            await ws_manager.send_message(self.project_id, frame)
+        except Exception as e:
+            ui.debug(f"cli_output send failed: {e}", "Shell")
+
+
+_project_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def _slot(project_id: str) -> asyncio.Semaphore:
+    slot = _project_slots.get(project_id)
+    if slot is None:
+        slot = _project_slots[project_id] = asyncio.Semaphore(max(1, settings.shell_max_concurrent_per_project))
+    return slot
+
+
+async def _pump(stream: asyncio.StreamReader, name: str, capture: OutputCapture,
+                forwarder: Optional[ShellOutputForwarder]) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        capture.feed(chunk)
+        if forwarder is not None:
+            forwarder.push(name, decoder.decode(chunk))
+
+
+async def run_shell_command(
+    command: str,
+    cwd: str,
+    project_id: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_output_bytes: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run a shell command with a wall-clock timeout, bounded output capture and live forwarding"""
+    timeout = timeout or settings.shell_timeout_seconds or None
+    max_output_bytes = max_output_bytes or settings.shell_max_output_bytes
+    command_id = str(uuid.uuid4())
+    forwarder = ShellOutputForwarder(project_id, command_id, command) if project_id else None
+    stdout, stderr = OutputCapture(max_output_bytes), OutputCapture(max_output_bytes)
+
+    slot = _slot(project_id or "")
+    if slot.locked():
+        ui.info(f"Waiting for a shell slot (project {project_id})", "Shell")
+
+    async with slot:
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            **process_group_kwargs()
+        )
+        pgid = process_group_id(process)
+        pumps = [
+            asyncio.create_task(_pump(process.stdout, "stdout", stdout, forwarder)),
+            asyncio.create_task(_pump(process.stderr, "stderr", stderr, forwarder))
+        ]
+        timed_out = False
+        try:
+            try:
+                await asyncio.wait_for(wait_for_exit(process), timeout=timeout)
+                # Background children (`npm run dev &`) inherit the pipes, so EOF may never come:
+                # read what is already buffered, then stop
+                await asyncio.wait(pumps, timeout=PIPE_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                timed_out = True
+                ui.warning(f"Shell command timed out after {timeout}s: {command[:80]}", "Shell")
+        finally:
+            # Kill the whole group, including anything the command left running after it exited
+            # (and on cancellation)
+            await terminate_process_tree(process, grace_period=2.0)
+            await terminate_process_group(pgid, grace_period=2.0)
+            for pump in pumps:
+                pump.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+            if forwarder is not None:
+                await forwarder.close(process.returncode, timed_out)
+
+    result: Dict[str, Any] = {
+        "success": process.returncode == 0 and not timed_out,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "exit_code": process.returncode,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+        "command_id": command_id
+    }
+    if stdout.omitted or stderr.omitted:
+        result["truncated"] = {"stdout_bytes": stdout.total, "stderr_bytes": stderr.total}
+    if timed_out:
+        result["timed_out"] = True
+        result["error"] = {"type": "Timeout", "message": f"Command exceeded its time limit of {timeout}s and was killed"}
+    return result
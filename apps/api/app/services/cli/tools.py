@@ -0,0 +1,336 @@
+"""
+Tool registry for the tool executor
+
+Each tool declares its input schema (served by the MCP server's tool listing), the
+UnifiedCLIManager method implementing it, whether it is safe to retry, and an optional limit on
+concurrent executions. Only idempotent tools are retried, and only for transient error classes;
+deterministic failures (missing file, bad path, mismatched edit) are returned immediately.
+
+Tools also declare which workspace paths they read or write, so a batch of calls can run
+concurrently while calls touching the same path keep their request order.
+"""
+import asyncio
+import posixpath
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.terminal_ui import ui
+
+
+# Error types (exception class names reported by the tools) worth another attempt
+TRANSIENT_ERRORS = frozenset({
+    "TimeoutError",
+    "BlockingIOError",
+    "InterruptedError",
+    "ConnectionError",
+    "ConnectionResetError",
+    "BrokenPipeError",
+    "OperationalError",  # e.g. SQLite "database is locked"
+})
+
+
+# Workspace access declared by each tool
+READ = "read"
+WRITE = "write"
+EXCLUSIVE = "exclusive"
+ALL_PATHS = "*"
+
+
+class ToolSpec:
+    """Declaration of a single tool"""
+
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        description: str,
+        properties: Dict[str, Dict[str, Any]],
+        required: Optional[List[str]] = None,
+        idempotent: bool = False,
+        max_concurrency: Optional[int] = None,
+        access: str = EXCLUSIVE,
+        paths: Optional[Callable[[Dict[str, Any]], List[str]]] = None
+    ):
+        self.name = name
+        self.method = method
+        self.description = description
+        self.properties = properties
+        self.required = required or []
+        self.idempotent = idempotent
+        self.max_concurrency = max_concurrency
+        # How the tool touches the workspace, for ordering calls within a batch
+        self.access = access
+        self.paths = paths
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        return {"type": "object", "properties": self.properties, "required": self.required}
+
+    @property
+    def semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrency and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "input_schema": self.input_schema}
+
+
+def _error(error_type: str, message: str) -> Dict[str, Any]:
+    return {"success": False, "error": {"type": error_type, "message": message}}
+
+
+class _Access:
+    __slots__ = ("reads", "writes", "exclusive")
+
+    def __init__(self, reads: List[str], writes: List[str], exclusive: bool):
+        self.reads = reads
+        self.writes = writes
+        self.exclusive = exclusive
+
+
+def _normalize_path(path: Any) -> str:
+    path = posixpath.normpath(str(path or ".").replace("\\", "/")).lstrip("/")
+    return ALL_PATHS if path in (".", "") else path
+
+
+def _overlaps(first: List[str], second: List[str]) -> bool:
+    """Whether any two paths are equal or one contains the other"""
+    for a in first:
+        for b in second:
+            if a == ALL_PATHS or b == ALL_PATHS or a == b or a.startswith(b + "/") or b.startswith(a + "/"):
+                return True
+    return False
+
+
+def _conflicts(earlier: _Access, later: _Access) -> bool:
+    if earlier.exclusive or later.exclusive:
+        return True
+    return (
+        _overlaps(earlier.writes, later.reads + later.writes) or
+        _overlaps(later.writes, earlier.reads)
+    )
+
+
+class ToolRegistry:
+    """Name -> ToolSpec routing with argument validation, retry policy and concurrency limits"""
+
+    def __init__(self, base_delay: float = 0.2):
+        self.base_delay = base_delay
+        self._tools: Dict[str, ToolSpec] = {}
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        self._tools[spec.name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        return [spec.to_dict() for spec in self._tools.values()]
+
+    def is_retryable(self, spec: ToolSpec, result: Dict[str, Any]) -> bool:
+        if not spec.idempotent or result.get("success"):
+            return False
+        error = result.get("error")
+        return isinstance(error, dict) and error.get("type") in TRANSIENT_ERRORS
+
+    async def execute(self, owner: Any, name: Optional[str], args: Optional[Dict[str, Any]],
+                      max_retries: int = 2) -> Dict[str, Any]:
+        """Run tool `name` on owner (the UnifiedCLIManager), retrying transient failures of idempotent tools"""
+        spec = self._tools.get(name or "")
+        if spec is None:
+            return _error("ToolNotFound", f"Tool '{name}' is not a valid tool.")
+
+        args = args or {}
+        missing = [field for field in spec.required if field not in args]
+        if missing:
+            return _error("InvalidArguments", f"Missing required argument(s) for {name}: {', '.join(missing)}")
+        unknown = [field for field in args if field not in spec.properties]
+        if unknown:
+            ui.debug(f"Ignoring unknown argument(s) for {name}: {', '.join(unknown)}", "Tools")
+            args = {field: value for field, value in args.items() if field in spec.properties}
+
+        method = getattr(owner, spec.method)
+        attempt = 0
+        while True:
+            result = await self._call(spec, method, args)
+            if attempt >= max_retries or not self.is_retryable(spec, result):
+                return result
+            attempt += 1
+            ui.debug(f"Retrying {name} after {result['error']['type']} (attempt {attempt + 1})", "Tools")
+            await asyncio.sleep(self.base_delay * 2 ** (attempt - 1))
+
+    def _access(self, name: Optional[str], args: Any) -> _Access:
+        spec = self._tools.get(name or "")
+        if spec is None or spec.access == EXCLUSIVE or spec.paths is None or not isinstance(args, dict):
+            # Unknown tools fail fast anyway; a shell command may touch anything
+            return _Access([], [], exclusive=spec is not None and spec.access == EXCLUSIVE)
+        try:
+            paths = [_normalize_path(path) for path in spec.paths(args)]
+        except Exception:
+            paths = [ALL_PATHS]
+        if spec.access == READ:
+            return _Access(paths, [], exclusive=False)
+        return _Access([], paths, exclusive=False)
+
+    def plan_batch(self, calls: List[Dict[str, Any]]) -> List[List[int]]:
+        """For each call, the indexes of earlier calls it must wait for
+
+        Reads run concurrently; a call that writes a path waits for earlier calls reading or writing
+        it (or a containing directory), and exclusive tools (shell) wait for and block everything.
+        """
+        accesses = [self._access(call.get("name"), call.get("args")) for call in calls]
+        return [
+            [earlier for earlier in range(index) if _conflicts(accesses[earlier], access)]
+            for index, access in enumerate(accesses)
+        ]
+
+    async def execute_batch(self, owner: Any, calls: List[Dict[str, Any]], max_retries: int = 2,
+                            concurrency: int = 8) -> List[Dict[str, Any]]:
+        """Run independent tool calls ({"name", "args"}) concurrently, keeping conflicting calls in request order"""
+        dependencies = self.plan_batch(calls)
+        done = [asyncio.Event() for _ in calls]
+        limit = asyncio.Semaphore(concurrency)
+
+        async def run(index: int) -> Dict[str, Any]:
+            try:
+                for dependency in dependencies[index]:
+                    await done[dependency].wait()
+                async with limit:
+                    call = calls[index]
+                    return await self.execute(owner, call.get("name"), call.get("args"), max_retries)
+            finally:
+                done[index].set()
+
+        return list(await asyncio.gather(*(run(index) for index in range(len(calls)))))
+
+    async def _call(self, spec: ToolSpec, method, args: Dict[str, Any]) -> Dict[str, Any]:
+        semaphore = spec.semaphore
+        try:
+            if semaphore is None:
+                return await method(**args)
+            async with semaphore:
+                return await method(**args)
+        except Exception as e:
+            return _error(e.__class__.__name__, str(e))
+
+
+_PATH = {"type": "string", "description": "Path to the file"}
+
+
+def _file_path(args: Dict[str, Any]) -> List[str]:
+    return [args["file_path"]]
+
+
+tool_registry = ToolRegistry()
+
+tool_registry.register(ToolSpec(
+    "run_shell_command", "_run_shell_command",
+    "Executes a shell command within a secure, sandboxed environment",
+    {
+        "command": {"type": "string", "description": "The shell command to execute"},
+        "timeout": {"type": "number", "description": "Seconds before the command is killed (capped by the server limit)"}
+    },
+    required=["command"],
+    max_concurrency=4,
+    access=EXCLUSIVE
+))
+tool_registry.register(ToolSpec(
+    "write_file", "_write_file",
+    "Writes content to a file",
+    {
+        "file_path": _PATH,
+        "content": {"type": "string", "description": "Content to write"}
+    },
+    required=["file_path", "content"],
+    idempotent=True,
+    access=WRITE,
+    paths=_file_path
+))
+tool_registry.register(ToolSpec(
+    "read_file", "_read_file",
+    "Reads content from a file, optionally a window of lines for large files",
+    {
+        "file_path": _PATH,
+        "offset": {"type": "integer", "description": "0-based line to start reading from"},
+        "limit": {"type": "integer", "description": "Maximum number of lines to read"}
+    },
+    required=["file_path"],
+    idempotent=True,
+    access=READ,
+    paths=_file_path
+))
+tool_registry.register(ToolSpec(
+    "replace", "_replace",
+    "Replaces text in a file",
+    {
+        "file_path": _PATH,
+        "old_string": {"type": "string", "description": "Text to replace"},
+        "new_string": {"type": "string", "description": "Replacement text"},
+        "expected_replacements": {"type": "integer", "description": "Number of replacements expected. Defaults to 1."}
+    },
+    required=["file_path", "old_string", "new_string"],
+    access=WRITE,
+    paths=_file_path
+))
+tool_registry.register(ToolSpec(
+    "multi_edit", "_multi_edit",
+    "Applies several replacements to one or more files in a single call; no file is written unless "
+    "every edit matches its expected count. Returns a compact diff per file",
+    {
+        "edits": {
+            "type": "array",
+            "description": "Edits applied in order",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_path": _PATH,
+                    "old_string": {"type": "string", "description": "Text to replace (empty to create a new file)"},
+                    "new_string": {"type": "string", "description": "Replacement text"},
+                    "expected_replacements": {"type": "integer", "description": "Number of replacements expected. Defaults to 1."}
+                },
+                "required": ["file_path", "old_string", "new_string"]
+            }
+        }
+    },
+    required=["edits"],
+    access=WRITE,
+    paths=lambda args: [edit.get("file_path") for edit in args["edits"]]
+))
+tool_registry.register(ToolSpec(
+    "list_directory", "_list_directory",
+    "Lists directory contents",
+    {"path": {"type": "string", "description": "Directory path"}},
+    required=["path"],
+    idempotent=True,
+    access=READ,
+    paths=lambda args: [args["path"]]
+))
+tool_registry.register(ToolSpec(
+    "glob", "_glob",
+    "Find files matching a pattern",
+    {"pattern": {"type": "string", "description": "Glob pattern"}},
+    required=["pattern"],
+    idempotent=True,
+    max_concurrency=4,
+    access=READ,
+    paths=lambda args: [ALL_PATHS]
+))
+tool_registry.register(ToolSpec(
+    "search_file_content", "_search_file_content",
+    "Search for patterns in files",
+    {
+        "pattern": {"type": "string", "description": "Search pattern"},
+        "path": {"type": "string", "description": "Optional search path"},
+        "include": {"type": "string", "description": "Optional glob pattern to filter files"}
+    },
+    required=["pattern"],
+    idempotent=True,
+    max_concurrency=2,
+    access=READ,
+    paths=lambda args: [args.get("path") or ALL_PATHS]
+))
@@ -3,6 +3,7 @@ Unified CLI Manager for Multi-AI Agent Support
 Supports Claude Code SDK, Cursor Agent, Qwen Code, Gemini CLI, and Codex CLI
 """
 import asyncio
+import hashlib
 import json
 import os
 import re
@@ -10,7 +11,7 @@ import subprocess
 import uuid
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional, Callable, Dict, Any, AsyncGenerator, List
+from typing import Optional, Callable, Dict, Any, AsyncGenerator, List, Tuple
 from enum import Enum
 import tempfile
 import base64
@@ -20,7 +21,17 @@ import sys
 import aiohttp
 import time
 
-from app.core.monitoring import monitor_tool_execution
+from app.core.monitoring import CLI_RUN_DURATION, CLI_RUNS, monitor_tool_execution
+from app.core.tracing import tracer
+from app.services.cli.deltas import DeltaThrottler, MessageDelta
+from app.services.cli.dispatch import MessageDispatcher, load_claude_sdk_types
+from app.services.cli.edits import EditError, apply_edits, compact_diff, normalize_edits
+from app.services.cli.file_io import atomic_write_text, read_text, read_text_window
+from app.services.cli.ndjson import TruncatedLine, iter_lines
+from app.services.cli.process import process_group_kwargs, terminate_process_tree
+from app.services.cli.session_cache import project_sessions
+from app.services.cli.shell import run_shell_command
+from app.services.cli.tools import tool_registry
 
 
 def get_project_root() -> str:
@@ -44,13 +55,31 @@ def get_display_path(file_path: str) -> str:
         pass
     return file_path
 
+
+def project_id_from_path(project_path: str) -> str:
+    """Project id from a repo path (format: .../projects/{project_id}/repo)"""
+    path_parts = project_path.split("/")
+    if "repo" in path_parts and len(path_parts) >= 2:
+        # Get the folder before "repo"
+        repo_index = path_parts.index("repo")
+        if repo_index > 0:
+            return path_parts[repo_index - 1]
+    return path_parts[-1] if path_parts else project_path
+
 from app.models.messages import Message
 from app.models.sessions import Session
+from app.core.config import settings
 from app.core.websocket.manager import manager as ws_manager
 from app.core.terminal_ui import ui
+from app.services.message_metadata import compact_message
+from app.services.prompts import prompt_store
 
 # Claude Code SDK imports
 from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
+from app.services.cli.client_pool import claude_clients
+
+# SDK message/block classes, resolved once for the dispatch tables
+CLAUDE_SDK_TYPES = load_claude_sdk_types()
 
 
 # Model mapping from unified names to CLI-specific names
@@ -100,7 +129,16 @@ class BaseCLI(ABC):
     
     def __init__(self, cli_type: CLIType):
         self.cli_type = cli_type
-    
+        # Assistant text received but not yet yielded as a Message (flushed by the manager on abort)
+        self._partial_content = ""
+        self._partial_message_id: Optional[str] = None
+
+    def take_partial_content(self) -> Tuple[Optional[str], str]:
+        """Return and clear (message id, text) of assistant text that has not been yielded yet"""
+        result = (self._partial_message_id, self._partial_content)
+        self._partial_message_id, self._partial_content = None, ""
+        return result
+
     def _get_cli_model_name(self, model: Optional[str]) -> Optional[str]:
         """Convert unified model name to CLI-specific model name"""
         if not model:
@@ -108,18 +146,22 @@ class BaseCLI(ABC):
         
         from app.core.terminal_ui import ui
         
-        ui.debug(f"Input model: '{model}' for CLI: {self.cli_type.value}", "Model")
+        # Called on every model lookup; only build the messages when debug output is on
+        if ui.debug_enabled:
+            ui.debug(f"Input model: '{model}' for CLI: {self.cli_type.value}", "Model")
         cli_models = MODEL_MAPPING.get(self.cli_type.value, {})
         
         # Try exact match first
         if model in cli_models:
             mapped_model = cli_models[model]
-            ui.info(f"Mapped '{model}' to '{mapped_model}' for {self.cli_type.value}", "Model")
+            if ui.debug_enabled:
+                ui.debug(f"Mapped '{model}' to '{mapped_model}' for {self.cli_type.value}", "Model")
             return mapped_model
         
         # Try direct model name (already CLI-specific)
         if model in cli_models.values():
-            ui.info(f"Using direct model name '{model}' for {self.cli_type.value}", "Model")
+            if ui.debug_enabled:
+                ui.debug(f"Using direct model name '{model}' for {self.cli_type.value}", "Model")
             return model
         
         # For debugging: show available models
@@ -177,10 +219,10 @@ class BaseCLI(ABC):
             role=self._normalize_role(data.get("role", "assistant")),
             message_type="chat",
             content=self._extract_content(data),
+            # The event's own fields are the metadata; no second copy of it under another key
             metadata_json={
                 **data,
-                "cli_type": self.cli_type.value,
-                "original_format": data
+                "cli_type": self.cli_type.value
             },
             session_id=session_id,
             created_at=datetime.utcnow()
@@ -488,7 +530,22 @@ class ClaudeCodeCLI(BaseCLI):
     
     def __init__(self):
         super().__init__(CLIType.CLAUDE)
-        self.session_mapping: Dict[str, str] = {}
+
+        self._dispatcher = MessageDispatcher()
+        self._dispatcher.register("SystemMessage", self._on_system_message)
+        self._dispatcher.register("AssistantMessage", self._on_assistant_message)
+        self._dispatcher.register("UserMessage", self._on_user_message)
+        self._dispatcher.register("ResultMessage", self._on_result_message)
+        self._dispatcher.register("result", self._on_result_message)
+        self._dispatcher.register("StreamEvent", self._on_stream_event)
+        self._dispatcher.bind_types(CLAUDE_SDK_TYPES.values())
+
+        self._block_dispatcher = MessageDispatcher()
+        self._block_dispatcher.register("TextBlock", self._on_text_block)
+        self._block_dispatcher.register("ToolUseBlock", self._on_tool_use_block)
+        # ToolResultBlock: results are not shown in the UI
+        self._block_dispatcher.register("ToolResultBlock", lambda block, context, text_parts, messages: None)
+        self._block_dispatcher.bind_types(CLAUDE_SDK_TYPES.values())
     
     async def check_availability(self) -> Dict[str, Any]:
         """Check if Claude Code CLI is available"""
@@ -553,10 +610,9 @@ class ClaudeCodeCLI(BaseCLI):
         if log_callback:
             await log_callback("Starting execution...")
         
-        # Load system prompt
+        # Assembled once per project and reused until the prompt file or the project's override changes
         try:
-            from app.services.claude_act import get_system_prompt
-            system_prompt = get_system_prompt()
+            system_prompt = prompt_store.final(project_id_from_path(project_path), self.cli_type.value)
             ui.debug(f"System prompt loaded: {len(system_prompt)} chars", "Claude SDK")
         except Exception as e:
             ui.error(f"Failed to load system prompt: {e}", "Claude SDK")
@@ -631,6 +687,10 @@ node_modules/
                 continue_conversation=True
             )
         
+        # Token-level text (StreamEvent) is only available on SDK versions that support partial messages
+        if settings.message_delta_fps and "include_partial_messages" in getattr(ClaudeCodeOptions, "__dataclass_fields__", {}):
+            options.include_partial_messages = True
+
         ui.info(f"Using model: {cli_model}", "Claude SDK")
         ui.debug(f"Project path: {project_path}", "Claude SDK")
         ui.debug(f"Instruction: {instruction[:100]}...", "Claude SDK")
@@ -641,7 +701,7 @@ node_modules/
             os.chdir(project_path)
             
             # Get project ID for session management
-            project_id = project_path.split("/")[-1] if "/" in project_path else project_path
+            project_id = project_id_from_path(project_path)
             existing_session_id = await self.get_session_id(project_id)
             
             # Update options with resume session if available
@@ -649,170 +709,45 @@ node_modules/
                 options.resumeSessionId = existing_session_id
                 ui.info(f"Resuming session: {existing_session_id}", "Claude SDK")
             
+            # Pooled processes outlive this chdir, so they get the project directory explicitly
+            options.cwd = project_path
             try:
-                async with ClaudeSDKClient(options=options) as client:
+                pooled, warm = await claude_clients.acquire(project_id, existing_session_id, options)
+                client = pooled.client
+                if warm:
+                    ui.info(f"Reusing warm Claude SDK client (turn {pooled.turns + 1})", "Claude SDK")
+                turn_completed = False
+                try:
                     # Send initial query
                     await client.query(instruction)
-                    
-                    # Stream responses and extract session_id
-                    claude_session_id = None
-                    
+
+                    context = {
+                        "project_id": project_id,
+                        "project_path": project_path,
+                        "session_id": session_id,
+                        "cli_model": cli_model
+                    }
+
                     async for message_obj in client.receive_messages():
-                        
-                        # Import SDK types for isinstance checks
-                        try:
-                            from anthropic.claude_code.types import SystemMessage, AssistantMessage, UserMessage, ResultMessage
-                        except ImportError:
-                            try:
-                                from claude_code_sdk.types import SystemMessage, AssistantMessage, UserMessage, ResultMessage
-                            except ImportError:
-                                # Fallback - check type name strings
-                                SystemMessage = type(None)
-                                AssistantMessage = type(None)
-                                UserMessage = type(None)
-                                ResultMessage = type(None)
-                        
-                        # Handle SystemMessage for session_id extraction
-                        if (
-                            isinstance(message_obj, SystemMessage) or 
-                            'SystemMessage' in str(type(message_obj))
-                        ):
-                            # Extract session_id if available
-                            if hasattr(message_obj, 'session_id') and message_obj.session_id:
-                                claude_session_id = message_obj.session_id
-                                await self.set_session_id(project_id, claude_session_id)
-                            
-                            # Send init message (hidden from UI)
-                            init_message = Message(
-                                id=str(uuid.uuid4()),
-                                project_id=project_path,
-                                role="system",
-                                message_type="system",
-                                content=f"Claude Code SDK initialized (Model: {cli_model})",
-                                metadata_json={
-                                    "cli_type": self.cli_type.value,
-                                    "mode": "SDK",
-                                    "model": cli_model,
-                                    "session_id": getattr(message_obj, 'session_id', None),
-                                    "hidden_from_ui": True
-                                },
-                                session_id=session_id,
-                                created_at=datetime.utcnow()
-                            )
-                            yield init_message
-                        
-                        # Handle AssistantMessage (complete messages)
-                        elif (
-                            isinstance(message_obj, AssistantMessage) or 
-                            'AssistantMessage' in str(type(message_obj))
-                        ):
-                            
-                            content = ""
-                            
-                            # Process content - AssistantMessage has content: list[ContentBlock]
-                            if hasattr(message_obj, 'content') and isinstance(message_obj.content, list):
-                                for block in message_obj.content:
-                                    
-                                    # Import block types for comparison
-                                    from claude_code_sdk.types import TextBlock, ToolUseBlock, ToolResultBlock
-                                    
-                                    if isinstance(block, TextBlock):
-                                        # TextBlock has 'text' attribute
-                                        content += block.text
-                                    elif isinstance(block, ToolUseBlock):
-                                        # ToolUseBlock has 'id', 'name', 'input' attributes
-                                        tool_name = block.name
-                                        tool_input = block.input
-                                        tool_id = block.id
-                                        summary = self._create_tool_summary(tool_name, tool_input)
-                                            
-                                        # Yield tool use message immediately
-                                        tool_message = Message(
-                                            id=str(uuid.uuid4()),
-                                            project_id=project_path,
-                                            role="assistant",
-                                            message_type="tool_use",
-                                            content=summary,
-                                            metadata_json={
-                                                "cli_type": self.cli_type.value,
-                                                "mode": "SDK",
-                                                "tool_name": tool_name,
-                                                "tool_input": tool_input,
-                                                "tool_id": tool_id
-                                            },
-                                            session_id=session_id,
-                                            created_at=datetime.utcnow()
-                                        )
-                                        # Display clean tool usage like Claude Code
-                                        tool_display = self._get_clean_tool_display(tool_name, tool_input)
-                                        ui.info(tool_display, "")
-                                        yield tool_message
-                                    elif isinstance(block, ToolResultBlock):
-                                        # Handle tool result blocks if needed
-                                        pass
-                            
-                            # Yield complete assistant text message if there's text content
-                            if content and content.strip():
-                                text_message = Message(
-                                    id=str(uuid.uuid4()),
-                                    project_id=project_path,
-                                    role="assistant",
-                                    message_type="chat",
-                                    content=content.strip(),
-                                    metadata_json={
-                                        "cli_type": self.cli_type.value,
-                                        "mode": "SDK"
-                                    },
-                                    session_id=session_id,
-                                    created_at=datetime.utcnow()
-                                )
-                                yield text_message
-                        
-                        # Handle UserMessage (tool results, etc.)
-                        elif (
-                            isinstance(message_obj, UserMessage) or 
-                            'UserMessage' in str(type(message_obj))
-                        ):
-                            # UserMessage has content: str according to types.py
-                            # UserMessages are typically tool results - we don't need to show them
-                            pass
-                        
-                        # Handle ResultMessage (final session completion)
-                        elif (
-                            isinstance(message_obj, ResultMessage) or
-                            'ResultMessage' in str(type(message_obj)) or
-                            (hasattr(message_obj, 'type') and getattr(message_obj, 'type', None) == 'result')
-                        ):
-                            ui.success(f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms", "Claude SDK")
-                            
-                            # Create internal result message (hidden from UI)
-                            result_message = Message(
-                                id=str(uuid.uuid4()),
-                                project_id=project_path,
-                                role="system",
-                                message_type="result",
-                                content=f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms",
-                                metadata_json={
-                                    "cli_type": self.cli_type.value,
-                                    "mode": "SDK",
-                                    "duration_ms": getattr(message_obj, 'duration_ms', 0),
-                                    "duration_api_ms": getattr(message_obj, 'duration_api_ms', 0),
-                                    "total_cost_usd": getattr(message_obj, 'total_cost_usd', 0),
-                                    "num_turns": getattr(message_obj, 'num_turns', 0),
-                                    "is_error": getattr(message_obj, 'is_error', False),
-                                    "subtype": getattr(message_obj, 'subtype', None),
-                                    "session_id": getattr(message_obj, 'session_id', None),
-                                    "hidden_from_ui": True  # Don't show to user
-                                },
-                                session_id=session_id,
-                                created_at=datetime.utcnow()
-                            )
-                            yield result_message
-                            break
-                        
-                        # Handle unknown message types
-                        else:
+                        kind = self._dispatcher.classify(message_obj)
+                        if kind is None:
                             ui.debug(f"Unknown message type: {type(message_obj)}", "Claude SDK")
+                            continue
+
+                        for message in await self._dispatcher.handler(kind)(message_obj, context):
+                            yield message
+
+                        # ResultMessage marks the end of the turn
+                        if kind in ("ResultMessage", "result"):
+                            turn_completed = True
+                            break
+                except (asyncio.CancelledError, GeneratorExit):
+                    # Run was cancelled or hit its budget: stop the agent before the client disconnects
+                    await self._interrupt(client)
+                    raise
+                finally:
+                    # Only a client that finished its turn cleanly is kept warm for the next one
+                    await claude_clients.release(pooled, await self.get_session_id(project_id), reusable=turn_completed)
             
             finally:
                 # Restore original working directory
@@ -823,36 +758,175 @@ node_modules/
             if log_callback:
                 await log_callback(f"Claude SDK Exception: {str(e)}")
             raise
-    
+
+    async def _on_system_message(self, message_obj, context: Dict[str, Any]) -> List[Message]:
+        """SystemMessage: persist the Claude session id and emit a hidden init message"""
+        # SDK SystemMessages carry the raw init event in .data; older releases had .session_id
+        claude_session_id = getattr(message_obj, 'session_id', None) or (getattr(message_obj, 'data', None) or {}).get('session_id')
+        if claude_session_id:
+            await self.set_session_id(context["project_id"], claude_session_id)
+
+        return [Message(
+            id=str(uuid.uuid4()),
+            project_id=context["project_path"],
+            role="system",
+            message_type="system",
+            content=f"Claude Code SDK initialized (Model: {context['cli_model']})",
+            metadata_json={
+                "cli_type": self.cli_type.value,
+                "mode": "SDK",
+                "model": context["cli_model"],
+                "session_id": claude_session_id,
+                "hidden_from_ui": True
+            },
+            session_id=context["session_id"],
+            created_at=datetime.utcnow()
+        )]
+
+    async def _on_assistant_message(self, message_obj, context: Dict[str, Any]) -> List[Message]:
+        """AssistantMessage: one tool_use message per tool block, then the text as a single chat message"""
+        messages: List[Message] = []
+        text_parts: List[str] = []
+
+        content = getattr(message_obj, 'content', None)
+        if isinstance(content, list):
+            for block in content:
+                self._block_dispatcher.dispatch(block, context, text_parts, messages)
+
+        # Reuse the id the text was streamed under so the UI replaces its delta bubble
+        message_id = context.pop("stream_message_id", None) or str(uuid.uuid4())
+        self._partial_message_id, self._partial_content = None, ""
+
+        text = "".join(text_parts).strip()
+        if text:
+            messages.append(Message(
+                id=message_id,
+                project_id=context["project_path"],
+                role="assistant",
+                message_type="chat",
+                content=text,
+                metadata_json={
+                    "cli_type": self.cli_type.value,
+                    "mode": "SDK"
+                },
+                session_id=context["session_id"],
+                created_at=datetime.utcnow()
+            ))
+        return messages
+
+    async def _on_stream_event(self, message_obj, context: Dict[str, Any]) -> List[MessageDelta]:
+        """StreamEvent (partial messages): forward text deltas; the AssistantMessage that follows is persisted"""
+        event = getattr(message_obj, 'event', None) or {}
+        event_type = event.get("type")
+
+        if event_type == "message_start":
+            context["stream_message_id"] = str(uuid.uuid4())
+        elif event_type == "content_block_delta":
+            delta = event.get("delta") or {}
+            if delta.get("type") == "text_delta" and delta.get("text"):
+                message_id = context.setdefault("stream_message_id", str(uuid.uuid4()))
+                self._partial_message_id = message_id
+                self._partial_content += delta["text"]
+                return [MessageDelta(message_id, delta["text"])]
+        return []
+
+    async def _on_user_message(self, message_obj, context: Dict[str, Any]) -> List[Message]:
+        # UserMessages are typically tool results - we don't need to show them
+        return []
+
+    async def _on_result_message(self, message_obj, context: Dict[str, Any]) -> List[Message]:
+        """ResultMessage: hidden completion record with duration, cost and usage"""
+        duration_ms = getattr(message_obj, 'duration_ms', 0)
+        ui.success(f"Session completed in {duration_ms}ms", "Claude SDK")
+
+        return [Message(
+            id=str(uuid.uuid4()),
+            project_id=context["project_path"],
+            role="system",
+            message_type="result",
+            content=f"Session completed in {duration_ms}ms",
+            metadata_json={
+                "cli_type": self.cli_type.value,
+                "mode": "SDK",
+                "duration_ms": duration_ms,
+                "duration_api_ms": getattr(message_obj, 'duration_api_ms', 0),
+                "total_cost_usd": getattr(message_obj, 'total_cost_usd', 0),
+                "num_turns": getattr(message_obj, 'num_turns', 0),
+                "is_error": getattr(message_obj, 'is_error', False),
+                "subtype": getattr(message_obj, 'subtype', None),
+                "session_id": getattr(message_obj, 'session_id', None),
+                "usage": getattr(message_obj, 'usage', None),
+                "hidden_from_ui": True  # Don't show to user
+            },
+            session_id=context["session_id"],
+            created_at=datetime.utcnow()
+        )]
+
+    def _on_text_block(self, block, context: Dict[str, Any], text_parts: List[str], messages: List[Message]) -> None:
+        text_parts.append(block.text)
+
+    def _on_tool_use_block(self, block, context: Dict[str, Any], text_parts: List[str], messages: List[Message]) -> None:
+        summary = self._create_tool_summary(block.name, block.input)
+        # Display clean tool usage like Claude Code
+        ui.info(self._get_clean_tool_display(block.name, block.input), "")
+        messages.append(Message(
+            id=str(uuid.uuid4()),
+            project_id=context["project_path"],
+            role="assistant",
+            message_type="tool_use",
+            content=summary,
+            metadata_json={
+                "cli_type": self.cli_type.value,
+                "mode": "SDK",
+                "tool_name": block.name,
+                "tool_input": block.input,
+                "tool_id": block.id
+            },
+            session_id=context["session_id"],
+            created_at=datetime.utcnow()
+        ))
+
+    async def _interrupt(self, client: ClaudeSDKClient) -> None:
+        """Ask the SDK to stop the current turn; disconnecting afterwards tears down the CLI process"""
+        try:
+            await asyncio.wait_for(client.interrupt(), timeout=5.0)
+            ui.warning("Claude SDK run interrupted", "Claude SDK")
+        except Exception as e:
+            ui.debug(f"Interrupt failed (client will still be disconnected): {e}", "Claude SDK")
     
     async def get_session_id(self, project_id: str) -> Optional[str]:
-        """Get current session ID for project from database"""
+        """Get current session ID for project (process-wide cache, loaded from the project row once)"""
         try:
-            # Try to get from database if available (we'll need to pass db session)
-            return self.session_mapping.get(project_id)
+            return project_sessions.get_session_id(project_id, self.cli_type.value)
         except Exception as e:
-            ui.warning(f"Failed to get session ID from DB: {e}", "Claude SDK")
-            return self.session_mapping.get(project_id)
+            ui.warning(f"Failed to get session ID: {e}", "Claude SDK")
+            return None
     
     async def set_session_id(self, project_id: str, session_id: str) -> None:
-        """Set session ID for project in database and memory"""
+        """Set session ID for project in the cache and the project row"""
         try:
-            # Store in memory as fallback
-            self.session_mapping[project_id] = session_id
+            project_sessions.set_session_id(project_id, self.cli_type.value, session_id)
             ui.debug(f"Session ID stored for project {project_id}", "Claude SDK")
         except Exception as e:
             ui.warning(f"Failed to save session ID: {e}", "Claude SDK")
-            # Fallback to memory storage
-            self.session_mapping[project_id] = session_id
 
 
 class CursorAgentCLI(BaseCLI):
     """Cursor Agent CLI implementation with stream-json support and session continuity"""
     
+    # AGENT.md path -> ((mtime_ns, size), prompt) last written, verified or left alone, shared by all instances
+    _agent_md_state: Dict[str, Tuple[Tuple[int, int], str]] = {}
+    
     def __init__(self, db_session=None):
         super().__init__(CLIType.CURSOR)
         self.db_session = db_session
-        self._session_store = {}  # Fallback for when db_session is not available
+
+        self._dispatcher = MessageDispatcher()
+        self._dispatcher.register("system", self._on_system_event)
+        self._dispatcher.register("user", self._on_user_event)
+        self._dispatcher.register("assistant", self._on_assistant_event)
+        self._dispatcher.register("tool_call", self._on_tool_call_event)
+        self._dispatcher.register("result", self._on_result_event)
     
     async def check_availability(self) -> Dict[str, Any]:
         """Check if Cursor Agent CLI is available"""
@@ -896,177 +970,218 @@ class CursorAgentCLI(BaseCLI):
     
     def _handle_cursor_stream_json(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
         """Handle Cursor stream-json format (NDJSON events) to be compatible with Claude Code CLI output"""
-        event_type = event.get("type")
+        return self._dispatcher.dispatch(event, project_path, session_id)
 
-        if event_type == "system":
-            # System initialization event
+    def _on_system_event(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
+        # System initialization event
+        return Message(
+            id=str(uuid.uuid4()),
+            project_id=project_path,
+            role="system",
+            message_type="system",
+            content=f"🔧 Cursor Agent initialized (Model: {event.get('model', 'unknown')})",
+            metadata_json={
+                "cli_type": self.cli_type.value,
+                "event_type": "system",
+                "cwd": event.get("cwd"),
+                "api_key_source": event.get("apiKeySource"),
+                "original_event": event,
+                "hidden_from_ui": True  # Hide system init messages
+            },
+            session_id=session_id,
+            created_at=datetime.utcnow()
+        )
+
+    def _on_user_event(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
+        # Cursor echoes back the user's prompt. Suppress it to avoid duplicates.
+        return None
+
+    def _on_assistant_event(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
+        # Assistant response event (text delta)
+        message_content = event.get("message", {}).get("content", [])
+        content = ""
+
+        if message_content and isinstance(message_content, list):
+            for part in message_content:
+                if part.get("type") == "text":
+                    content += part.get("text", "")
+
+        if content:
             return Message(
                 id=str(uuid.uuid4()),
                 project_id=project_path,
-                role="system",
-                message_type="system",
-                content=f"🔧 Cursor Agent initialized (Model: {event.get('model', 'unknown')})",
+                role="assistant",
+                message_type="chat",
+                content=content,
                 metadata_json={
                     "cli_type": self.cli_type.value,
-                    "event_type": "system",
-                    "cwd": event.get("cwd"),
-                    "api_key_source": event.get("apiKeySource"),
-                    "original_event": event,
-                    "hidden_from_ui": True  # Hide system init messages
+                    "event_type": "assistant",
+                    "original_event": event
                 },
                 session_id=session_id,
                 created_at=datetime.utcnow()
             )
+        return None
 
-        elif event_type == "user":
-            # Cursor echoes back the user's prompt. Suppress it to avoid duplicates.
+    def _on_tool_call_event(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
+        subtype = event.get("subtype")
+        tool_call_data = event.get("tool_call", {})
+        if not tool_call_data:
             return None
 
-        elif event_type == "assistant":
-            # Assistant response event (text delta)
-            message_content = event.get("message", {}).get("content", [])
-            content = ""
-
-            if message_content and isinstance(message_content, list):
-                for part in message_content:
-                    if part.get("type") == "text":
-                        content += part.get("text", "")
-
-            if content:
-                return Message(
-                    id=str(uuid.uuid4()),
-                    project_id=project_path,
-                    role="assistant",
-                    message_type="chat",
-                    content=content,
-                    metadata_json={
-                        "cli_type": self.cli_type.value,
-                        "event_type": "assistant",
-                        "original_event": event
-                    },
-                    session_id=session_id,
-                    created_at=datetime.utcnow()
-                )
-
-        elif event_type == "tool_call":
-            subtype = event.get("subtype")
-            tool_call_data = event.get("tool_call", {})
-            if not tool_call_data:
-                return None
-
-            tool_name_raw = next(iter(tool_call_data), None)
-            if not tool_name_raw:
-                return None
+        tool_name_raw = next(iter(tool_call_data), None)
+        if not tool_name_raw:
+            return None
 
-            # Normalize tool name: lsToolCall -> ls
-            tool_name = tool_name_raw.replace("ToolCall", "")
+        # Normalize tool name: lsToolCall -> ls
+        tool_name = tool_name_raw.replace("ToolCall", "")
 
-            if subtype == "started":
-                tool_input = tool_call_data[tool_name_raw].get("args", {})
-                summary = self._create_tool_summary(tool_name, tool_input)
+        if subtype == "started":
+            tool_input = tool_call_data[tool_name_raw].get("args", {})
+            summary = self._create_tool_summary(tool_name, tool_input)
 
-                return Message(
-                    id=str(uuid.uuid4()),
-                    project_id=project_path,
-                    role="assistant",
-                    message_type="chat",
-                    content=summary,
-                    metadata_json={
-                        "cli_type": self.cli_type.value,
-                        "event_type": "tool_call_started",
-                        "tool_name": tool_name,
-                        "tool_input": tool_input,
-                        "original_event": event
-                    },
-                    session_id=session_id,
-                    created_at=datetime.utcnow()
-                )
-
-            elif subtype == "completed":
-                result = tool_call_data[tool_name_raw].get("result", {})
-                content = ""
-                if "success" in result:
-                    content = json.dumps(result["success"])
-                elif "error" in result:
-                    content = json.dumps(result["error"])
+            return Message(
+                id=str(uuid.uuid4()),
+                project_id=project_path,
+                role="assistant",
+                message_type="chat",
+                content=summary,
+                metadata_json={
+                    "cli_type": self.cli_type.value,
+                    "event_type": "tool_call_started",
+                    "tool_name": tool_name,
+                    "tool_input": tool_input,
+                    "original_event": event
+                },
+                session_id=session_id,
+                created_at=datetime.utcnow()
+            )
 
-                return Message(
-                    id=str(uuid.uuid4()),
-                    project_id=project_path,
-                    role="system",
-                    message_type="tool_result",
-                    content=content,
-                    metadata_json={
-                        "cli_type": self.cli_type.value,
-                        "original_format": event,
-                        "tool_name": tool_name,
-                        "hidden_from_ui": True
-                    },
-                    session_id=session_id,
-                    created_at=datetime.utcnow()
-                )
+        elif subtype == "completed":
+            result = tool_call_data[tool_name_raw].get("result", {})
+            content = ""
+            if "success" in result:
+                content = json.dumps(result["success"])
+            elif "error" in result:
+                content = json.dumps(result["error"])
 
-        elif event_type == "result":
-            # Final result event
-            duration = event.get("duration_ms", 0)
-            result_text = event.get("result", "")
+            return Message(
+                id=str(uuid.uuid4()),
+                project_id=project_path,
+                role="system",
+                message_type="tool_result",
+                content=content,
+                metadata_json={
+                    "cli_type": self.cli_type.value,
+                    "original_event": event,
+                    "tool_name": tool_name,
+                    "hidden_from_ui": True
+                },
+                session_id=session_id,
+                created_at=datetime.utcnow()
+            )
+        return None
 
-            if result_text:
-                return Message(
-                    id=str(uuid.uuid4()),
-                    project_id=project_path,
-                    role="system",
-                    message_type="system",
-                    content=f"Execution completed in {duration}ms. Final result: {result_text}",
-                    metadata_json={
-                        "cli_type": self.cli_type.value,
-                        "event_type": "result",
-                        "duration_ms": duration,
-                        "original_event": event,
-                        "hidden_from_ui": True
-                    },
-                    session_id=session_id,
-                    created_at=datetime.utcnow()
-                )
+    def _on_result_event(self, event: Dict[str, Any], project_path: str, session_id: str) -> Optional[Message]:
+        # Final result event
+        duration = event.get("duration_ms", 0)
+        result_text = event.get("result", "")
 
+        if result_text:
+            return Message(
+                id=str(uuid.uuid4()),
+                project_id=project_path,
+                role="system",
+                message_type="system",
+                content=f"Execution completed in {duration}ms. Final result: {result_text}",
+                metadata_json={
+                    "cli_type": self.cli_type.value,
+                    "event_type": "result",
+                    "duration_ms": duration,
+                    "original_event": event,
+                    "hidden_from_ui": True
+                },
+                session_id=session_id,
+                created_at=datetime.utcnow()
+            )
         return None
     
-    async def _ensure_agent_md(self, project_path: str) -> None:
-        """Ensure AGENT.md exists in project repo with system prompt"""
+    @staticmethod
+    def _agent_md_digest_path(agent_md_path: str) -> Optional[str]:
+        """Where the digest of the AGENT.md we last wrote is kept: next to repo/, outside the git tree"""
+        repo_path = os.path.dirname(agent_md_path)
+        if os.path.basename(repo_path) != "repo":
+            return None
+        return os.path.join(os.path.dirname(repo_path), ".agent_md.sha256")
+
+    def _written_agent_md_digest(self, agent_md_path: str) -> Optional[str]:
+        digest_path = self._agent_md_digest_path(agent_md_path)
+        if digest_path is None:
+            return None
+        try:
+            with open(digest_path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _write_agent_md(self, agent_md_path: str, content: str) -> None:
+        with open(agent_md_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        stat = os.stat(agent_md_path)
+        self._agent_md_state[agent_md_path] = ((stat.st_mtime_ns, stat.st_size), content)
+        digest_path = self._agent_md_digest_path(agent_md_path)
+        if digest_path is not None:
+            with open(digest_path, 'w', encoding='utf-8') as f:
+                f.write(hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    async def _ensure_agent_md(self, project_path: str, project_id: str) -> None:
+        """Ensure AGENT.md in the project repo holds the project's system prompt
+
+        The file is created when missing and kept in sync with the prompt only while it still holds
+        what this code last wrote (or the default prompt, as written by earlier versions); once a user
+        or agent edits it, it is left alone.
+        """
         # Determine the repo path
         project_repo_path = os.path.join(project_path, "repo")
         if not os.path.exists(project_repo_path):
             project_repo_path = project_path
         
         agent_md_path = os.path.join(project_repo_path, "AGENT.md")
+        system_prompt_content = prompt_store.final(project_id, self.cli_type.value)
         
-        # Check if AGENT.md already exists
-        if os.path.exists(agent_md_path):
-            print(f"📝 [Cursor] AGENT.md already exists at: {agent_md_path}")
+        # Skip the read when the file is unchanged since it was last written/verified with this prompt
+        try:
+            stat = os.stat(agent_md_path)
+            file_key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            file_key = None
+        if file_key is not None and self._agent_md_state.get(agent_md_path) == (file_key, system_prompt_content):
             return
         
         try:
-            # Read system prompt from the source file using relative path
-            current_file_dir = os.path.dirname(os.path.abspath(__file__))
-            # unified_manager.py is in: app/services/cli/
-            # Navigate: cli -> services -> app
-            app_dir = os.path.join(current_file_dir, "..", "..")
-            app_dir = os.path.abspath(app_dir)
-            system_prompt_path = os.path.join(app_dir, "prompt", "system-prompt.md")
-            
-            if os.path.exists(system_prompt_path):
-                with open(system_prompt_path, 'r', encoding='utf-8') as f:
-                    system_prompt_content = f.read()
-                
-                # Write to AGENT.md in the project repo
-                with open(agent_md_path, 'w', encoding='utf-8') as f:
-                    f.write(system_prompt_content)
-                
+            if file_key is None:
+                self._write_agent_md(agent_md_path, system_prompt_content)
                 print(f"📝 [Cursor] Created AGENT.md at: {agent_md_path}")
-            else:
-                print(f"⚠️ [Cursor] System prompt file not found at: {system_prompt_path}")
+                return
+
+            with open(agent_md_path, 'r', encoding='utf-8') as f:
+                current = f.read()
+            if current == system_prompt_content:
+                self._agent_md_state[agent_md_path] = (file_key, system_prompt_content)
+                return
+
+            # Only replace a file that still holds the prompt we wrote; keep user edits. Files created
+            # before the digest was recorded hold the default prompt file verbatim: migrate those once
+            written = hashlib.sha256(current.encode('utf-8')).hexdigest() == self._written_agent_md_digest(agent_md_path)
+            if not written and current != prompt_store.default():
+                self._agent_md_state[agent_md_path] = (file_key, system_prompt_content)
+                ui.debug(f"AGENT.md at {agent_md_path} was modified, not updating it", "Cursor")
+                return
+
+            self._write_agent_md(agent_md_path, system_prompt_content)
+            print(f"📝 [Cursor] Updated AGENT.md at: {agent_md_path}")
         except Exception as e:
-            print(f"❌ [Cursor] Failed to create AGENT.md: {e}")
+            print(f"❌ [Cursor] Failed to write AGENT.md: {e}")
 
     async def execute_with_streaming(
         self,
@@ -1080,21 +1195,11 @@ class CursorAgentCLI(BaseCLI):
         unified_cli_manager: 'UnifiedCLIManager' = None
     ) -> AsyncGenerator[Message, None]:
         """Execute Cursor Agent CLI with stream-json format and session continuity"""
-        # Ensure AGENT.md exists for system prompt
-        await self._ensure_agent_md(project_path)
-        
-        # Extract project ID from path (format: .../projects/{project_id}/repo)
         # We need the project_id, not "repo"
-        path_parts = project_path.split("/")
-        if "repo" in path_parts and len(path_parts) >= 2:
-            # Get the folder before "repo"
-            repo_index = path_parts.index("repo")
-            if repo_index > 0:
-                project_id = path_parts[repo_index - 1]
-            else:
-                project_id = path_parts[-1] if path_parts else project_path
-        else:
-            project_id = path_parts[-1] if path_parts else project_path
+        project_id = project_id_from_path(project_path)
+        
+        # Ensure AGENT.md holds the system prompt
+        await self._ensure_agent_md(project_path, project_id)
         
         stored_session_id = await self.get_session_id(project_id)
         
@@ -1125,6 +1230,8 @@ class CursorAgentCLI(BaseCLI):
         if not os.path.exists(project_repo_path):
             project_repo_path = project_path # Fallback to project_path if repo subdir doesn't exist
 
+        process = None
+        self._partial_message_id, self._partial_content = None, ""
         try:
             command_str = ' '.join(cmd)
             if platform.system() == "Windows":
@@ -1139,15 +1246,20 @@ class CursorAgentCLI(BaseCLI):
                     *cmd,
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
-                    cwd=project_repo_path
+                    cwd=project_repo_path,
+                    **process_group_kwargs()
                 )
             
             cursor_session_id = None
             assistant_message_buffer = ""
+            assistant_message_id = None  # Shared by the message_delta frames and the flushed Message
             result_received = False  # Track if we received result event
             
-            async for line in process.stdout:
-                line_str = line.decode().strip()
+            async for line in iter_lines(process.stdout):
+                if isinstance(line, TruncatedLine):
+                    print(f"⚠️ [Cursor] Skipping oversized event ({line.original_size} bytes)")
+                    continue
+                line_str = line.strip()
                 if not line_str:
                     continue
                     
@@ -1200,7 +1312,7 @@ class CursorAgentCLI(BaseCLI):
                     # If we receive a non-assistant message, flush the buffer first
                     if event.get("type") != "assistant" and assistant_message_buffer:
                         yield Message(
-                            id=str(uuid.uuid4()),
+                            id=assistant_message_id,
                             project_id=project_path,
                             role="assistant",
                             message_type="chat",
@@ -1210,13 +1322,20 @@ class CursorAgentCLI(BaseCLI):
                             created_at=datetime.utcnow()
                         )
                         assistant_message_buffer = ""
+                        assistant_message_id = None
+                        self._partial_message_id, self._partial_content = None, ""
 
                     # Process the event
                     message = self._handle_cursor_stream_json(event, project_path, session_id)
                     
                     if message:
                         if message.role == "assistant" and message.message_type == "chat":
+                            if assistant_message_id is None:
+                                assistant_message_id = str(uuid.uuid4())
                             assistant_message_buffer += message.content
+                            self._partial_message_id = assistant_message_id
+                            self._partial_content = assistant_message_buffer
+                            yield MessageDelta(assistant_message_id, message.content)
                         else:
                             if log_callback:
                                 await log_callback(f"📝 [Cursor] {message.content}")
@@ -1252,8 +1371,9 @@ class CursorAgentCLI(BaseCLI):
             
             # Flush any remaining content in the buffer
             if assistant_message_buffer:
+                self._partial_message_id, self._partial_content = None, ""
                 yield Message(
-                    id=str(uuid.uuid4()),
+                    id=assistant_message_id,
                     project_id=project_path,
                     role="assistant",
                     message_type="chat",
@@ -1293,46 +1413,27 @@ class CursorAgentCLI(BaseCLI):
                 session_id=session_id,
                 created_at=datetime.utcnow()
             )
+        finally:
+            # Cancellation, budget aborts and early exits must not leave cursor-agent running
+            await terminate_process_tree(process)
     
     async def get_session_id(self, project_id: str) -> Optional[str]:
         """Get stored session ID for project to enable session continuity"""
-        if self.db_session:
-            try:
-                from app.models.projects import Project
-                project = self.db_session.query(Project).filter(Project.id == project_id).first()
-                if project and project.active_cursor_session_id:
-                    print(f"💾 [Cursor] Retrieved session ID from DB: {project.active_cursor_session_id}")
-                    return project.active_cursor_session_id
-            except Exception as e:
-                print(f"⚠️ [Cursor] Failed to get session ID from DB: {e}")
-        
-        # Fallback to in-memory storage
-        return self._session_store.get(project_id)
+        try:
+            return project_sessions.get_session_id(project_id, self.cli_type.value)
+        except Exception as e:
+            print(f"⚠️ [Cursor] Failed to get session ID: {e}")
+            return None
     
     async def set_session_id(self, project_id: str, session_id: str) -> None:
         """Store session ID for project to enable session continuity"""
-        # Store in database if available
-        if self.db_session:
-            try:
-                from app.models.projects import Project
-                project = self.db_session.query(Project).filter(Project.id == project_id).first()
-                if project:
-                    project.active_cursor_session_id = session_id
-                    self.db_session.commit()
-                    print(f"💾 [Cursor] Session ID saved to DB for project {project_id}: {session_id}")
-                    return
-                else:
-                    print(f"⚠️ [Cursor] Project {project_id} not found in DB")
-            except Exception as e:
-                print(f"⚠️ [Cursor] Failed to save session ID to DB: {e}")
-                import traceback
-                traceback.print_exc()
-        else:
-            print(f"⚠️ [Cursor] No DB session available")
-        
-        # Fallback to in-memory storage
-        self._session_store[project_id] = session_id
-        print(f"💾 [Cursor] Session ID stored in memory for project {project_id}: {session_id}")
+        try:
+            if project_sessions.set_session_id(project_id, self.cli_type.value, session_id):
+                print(f"💾 [Cursor] Session ID saved for project {project_id}: {session_id}")
+            else:
+                print(f"💾 [Cursor] Project {project_id} not in DB, session ID kept in memory: {session_id}")
+        except Exception as e:
+            print(f"⚠️ [Cursor] Failed to save session ID: {e}")
 
 
 import socket
@@ -1345,6 +1446,9 @@ class GeminiCLI(BaseCLI):
         super().__init__(CLIType.GEMINI)
         self._session_store: Dict[str, str] = {}
 
+        # Text-mode Gemini output has no typed events yet, so JSON lines take the default route
+        self._dispatcher = MessageDispatcher(default=self._on_json_line)
+
     def _find_free_port(self):
         """Finds a free port on localhost."""
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -1404,6 +1508,7 @@ class GeminiCLI(BaseCLI):
         from app.core.terminal_ui import ui
         
         mcp_server_process = None
+        process = None
         settings_file = None
         try:
             # 1. Start MCP Server on a free port
@@ -1431,7 +1536,8 @@ class GeminiCLI(BaseCLI):
                 *mcp_server_command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                cwd=api_root
+                cwd=api_root,
+                **process_group_kwargs()
             )
 
             # 2. Wait for server to be ready with proper health checks
@@ -1524,7 +1630,8 @@ class GeminiCLI(BaseCLI):
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
                     cwd=project_repo_path,
-                    env=env
+                    env=env,
+                    **process_group_kwargs()
                 )
 
             # 6. Process output
@@ -1553,6 +1660,7 @@ class GeminiCLI(BaseCLI):
                 created_at=datetime.utcnow()
             )
         finally:
+            await terminate_process_tree(process)
             await self._cleanup_mcp_server(mcp_server_process)
             if settings_file and os.path.exists(settings_file):
                 try:
@@ -1619,25 +1727,12 @@ class GeminiCLI(BaseCLI):
 
     async def _read_stream(self, stream, stream_name: str, session_id: str, project_path: str):
         """Read from a stream and yield messages"""
-        buffer = ""
-        async for line in stream:
-            line_str = line.decode()
-            buffer += line_str
-            
-            # Process complete lines
-            while '\n' in buffer:
-                line_to_process, buffer = buffer.split('\n', 1)
-                line_to_process = line_to_process.strip()
-                if line_to_process:
-                    yield self._create_message_from_line(
-                        line_to_process, stream_name, session_id, project_path
-                    )
-        
-        # Process remaining buffer
-        if buffer.strip():
-            yield self._create_message_from_line(
-                buffer.strip(), stream_name, session_id, project_path
-            )
+        async for line in iter_lines(stream):
+            line_to_process = line.strip()
+            if line_to_process:
+                yield self._create_message_from_line(
+                    line_to_process, stream_name, session_id, project_path
+                )
 
     def _create_message_from_line(self, line: str, stream_name: str, session_id: str, project_path: str) -> Message:
         """Create a Message object from a line of output, with robust JSON parsing."""
@@ -1648,10 +1743,7 @@ class GeminiCLI(BaseCLI):
         if stripped_line.startswith('{') and stripped_line.endswith('}'):
             try:
                 data = json.loads(stripped_line)
-                # If successful, treat as structured tool data
-                message_type = "tool_use" 
-                content = json.dumps(data, indent=2)
-                metadata = {"cli_type": self.cli_type.value, "parsed_json": True, "data": data, "stream": stream_name}
+                return self._dispatcher.dispatch(data, stream_name, session_id, project_path, stripped_line)
             except json.JSONDecodeError:
                 # It looked like JSON but wasn't valid, treat as plain text
                 content = line
@@ -1672,6 +1764,19 @@ class GeminiCLI(BaseCLI):
             created_at=datetime.utcnow()
         )
 
+    def _on_json_line(self, data: Dict[str, Any], stream_name: str, session_id: str, project_path: str, raw_line: str) -> Message:
+        """Structured JSON output is treated as tool data (kept as emitted, not re-serialized)"""
+        return Message(
+            id=str(uuid.uuid4()),
+            project_id=project_path,
+            role="assistant",
+            message_type="tool_use",
+            content=raw_line,
+            metadata_json={"cli_type": self.cli_type.value, "parsed_json": True, "data": data, "stream": stream_name},
+            session_id=session_id,
+            created_at=datetime.utcnow()
+        )
+
     async def _merge_streams(self, *stream_tasks):
         """Merge multiple async iterators into a single stream"""
         import asyncio
@@ -1710,17 +1815,9 @@ class GeminiCLI(BaseCLI):
         
         try:
             ui.info("Shutting down MCP server...", "GeminiCLI")
-            mcp_server_process.terminate()
-            
-            # Wait for graceful shutdown
-            try:
-                await asyncio.wait_for(mcp_server_process.wait(), timeout=5.0)
-                ui.info("MCP server shut down gracefully", "GeminiCLI")
-            except asyncio.TimeoutError:
-                ui.warning("MCP server didn't shut down gracefully, forcing kill", "GeminiCLI")
-                mcp_server_process.kill()
-                await mcp_server_process.wait()
-                ui.info("MCP server killed", "GeminiCLI")
+            # SIGTERM the server's process group, SIGKILL after the grace period
+            await terminate_process_tree(mcp_server_process, grace_period=5.0)
+            ui.info("MCP server shut down", "GeminiCLI")
                 
         except ProcessLookupError:
             ui.debug("MCP server process already terminated", "GeminiCLI")
@@ -1737,6 +1834,69 @@ class GeminiCLI(BaseCLI):
         self._session_store[project_id] = session_id
 
 
+class RunAborted(Exception):
+    """Raised inside the streaming loop when a run exceeds one of its budgets"""
+    def __init__(self, reason: str, message: str):
+        self.reason = reason
+        self.message = message
+        super().__init__(self.message)
+
+
+class _StreamTrace:
+    """Derives trace spans from the message stream (time to first output, per-tool-call spans)
+
+    Tool calls run inside the CLI process, so a tool span covers the gap between its tool_use
+    message and the next message the CLI emits.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.first_message = False
+        self.first_text = False
+        self._tool: Optional[Tuple[str, float]] = None
+
+    def observe(self, message: Message) -> None:
+        now = time.time()
+        self._close_tool(now)
+        if not self.first_message:
+            self.first_message = True
+            tracer.record(None, "cli.first_message", self.started, now)
+
+        metadata = message.metadata_json or {}
+        if message.message_type == "tool_use" or metadata.get("event_type") == "tool_call_started":
+            self._tool = (metadata.get("tool_name") or "unknown", now)
+        elif not self.first_text and message.role == "assistant" and message.message_type == "chat":
+            self.first_text = True
+            tracer.record(None, "cli.first_text", self.started, now)
+
+    def close(self) -> None:
+        self._close_tool(time.time())
+
+    def _close_tool(self, now: float) -> None:
+        if self._tool is not None:
+            name, started = self._tool
+            self._tool = None
+            tracer.record(None, f"tool.{name}", started, now, approximate=True)
+
+
+class _StreamStats:
+    """Running totals for a streamed run, kept instead of the persisted Message objects"""
+    __slots__ = ("count", "by_type", "content_chars", "has_changes")
+
+    def __init__(self):
+        self.count = 0
+        self.by_type: Dict[str, int] = {}
+        self.content_chars = 0
+        self.has_changes = False
+
+    def add(self, message: Message) -> None:
+        self.count += 1
+        message_type = message.message_type or "unknown"
+        self.by_type[message_type] = self.by_type.get(message_type, 0) + 1
+        self.content_chars += len(message.content or "")
+        if message.metadata_json and "changes_made" in message.metadata_json:
+            self.has_changes = True
+
+
 class UnifiedCLIManager:
     """Unified manager for all CLI implementations"""
     
@@ -1747,12 +1907,22 @@ class UnifiedCLIManager:
         session_id: str,
         conversation_id: str,
         db: Any,  # SQLAlchemy Session
+        timeout_seconds: Optional[int] = None,
+        token_budget: Optional[int] = None,
     ):
         self.project_id = project_id
         self.project_path = project_path
         self.session_id = session_id
         self.conversation_id = conversation_id
         self.db = db
+
+        # Per-run budgets (0 = unlimited)
+        self.timeout_seconds = settings.run_timeout_seconds if timeout_seconds is None else timeout_seconds
+        self.token_budget = settings.run_token_budget if token_budget is None else token_budget
+        self.tokens_used = 0
+        self._abort_reason: Optional[str] = None
+        self._active_stream: Optional[AsyncGenerator[Message, None]] = None
+        self._deltas = DeltaThrottler(project_id, session_id, conversation_id, settings.message_delta_fps)
         
         # Initialize CLI adapters with database session
         self.cli_adapters = {
@@ -1777,12 +1947,21 @@ class UnifiedCLIManager:
             cli = self.cli_adapters[cli_type]
             
             # Check if CLI is available
-            status = await cli.check_availability()
+            with tracer.span("cli.check_availability", cli=cli_type.value):
+                status = await cli.check_availability()
             if status.get("available") and status.get("configured"):
                 try:
-                    return await self._execute_with_cli(
-                        cli, instruction, images, model, is_initial_prompt
-                    )
+                    with tracer.span("cli.execute", cli=cli_type.value, model=model) as span:
+                        result = await self._execute_with_cli(
+                            cli, instruction, images, model, is_initial_prompt
+                        )
+                        if span is not None:
+                            span.set(
+                                success=bool(result.get("success")),
+                                tokens_used=self.tokens_used,
+                                cancel_reason=result.get("cancel_reason")
+                            )
+                    return result
                 except Exception as e:
                     ui.error(f"CLI {cli_type.value} failed: {e}", "CLI")
                     return {
@@ -1811,14 +1990,209 @@ class UnifiedCLIManager:
         model: Optional[str] = None,
         is_initial_prompt: bool = False
     ) -> Dict[str, Any]:
-        """Execute instruction with a specific CLI"""
+        """Execute instruction with a specific CLI, enforcing the run's wall-clock and token budgets"""
+        self.tokens_used = 0
+        self._abort_reason = None
+        started = time.perf_counter()
+        status = "error"
+
+        timer = None
+        if self.timeout_seconds:
+            timer = asyncio.get_running_loop().call_later(
+                self.timeout_seconds, self._abort, asyncio.current_task(), "timeout"
+            )
+
+        try:
+            result = await self._stream_with_cli(cli, instruction, images, model, is_initial_prompt)
+            status = "success" if result.get("success") else "failure"
+            return result
+        except asyncio.CancelledError:
+            reason = self._abort_reason
+            status = reason or "cancelled"
+            await self._close_active_stream()
+            await self._flush_partial(cli, reason or "cancelled")
+            if reason is None:
+                # Cancelled from outside (user/scheduler): the caller marks the rows
+                raise
+            # Our own timeout: swallow the cancellation and report it as a result
+            task = asyncio.current_task()
+            if task is not None and hasattr(task, "uncancel"):
+                task.uncancel()
+            return self._aborted_result(cli, reason, self._abort_message(reason))
+        except RunAborted as e:
+            status = e.reason
+            await self._close_active_stream()
+            await self._flush_partial(cli, e.reason)
+            return self._aborted_result(cli, e.reason, e.message)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self._active_stream = None
+            self._deltas.close()
+            self._record_token_usage()
+            CLI_RUNS.inc(cli=cli.cli_type.value, status=status)
+            CLI_RUN_DURATION.observe(time.perf_counter() - started, cli=cli.cli_type.value)
+
+    def _abort(self, task: Optional[asyncio.Task], reason: str) -> None:
+        """Cancel the running execution task, remembering why"""
+        if task is None or task.done():
+            return
+        ui.warning(f"Aborting {self.project_id} run: {self._abort_message(reason)}", "CLI")
+        self._abort_reason = reason
+        task.cancel()
+
+    def _abort_message(self, reason: str) -> str:
+        if reason == "timeout":
+            return f"Run exceeded its time limit of {self.timeout_seconds}s"
+        if reason == "token_budget":
+            return f"Run exceeded its token budget of {self.token_budget}"
+        return "Cancelled by user"
+
+    def _aborted_result(self, cli, reason: str, message: str) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "cancelled": True,
+            "cancel_reason": reason,
+            "cli_used": cli.cli_type.value,
+            "has_changes": False,
+            "message": f"Stopped {cli.cli_type.value} execution: {message}",
+            "error": message,
+            "tokens_used": self.tokens_used
+        }
+
+    def _charge_tokens(self, message: Message) -> None:
+        """Add a message to the run's token count and raise RunAborted once over budget"""
+        usage = (message.metadata_json or {}).get("usage")
+        if isinstance(usage, dict) and ("input_tokens" in usage or "output_tokens" in usage):
+            # Reported usage is authoritative and replaces the running estimate
+            reported = int(usage.get("input_tokens") or 0) + int(usage.get("output_tokens") or 0)
+            self.tokens_used = max(self.tokens_used, reported)
+        else:
+            # Rough estimate (~4 characters per token) for CLIs that do not stream usage
+            self.tokens_used += len(message.content or "") // 4
+
+        if self.token_budget and self.tokens_used > self.token_budget:
+            raise RunAborted("token_budget", self._abort_message("token_budget"))
+
+    async def _close_active_stream(self) -> None:
+        """Close the adapter generator so its cleanup (interrupt / process-group kill) runs now"""
+        stream, self._active_stream = self._active_stream, None
+        if stream is None:
+            return
+        try:
+            await stream.aclose()
+        except Exception as e:
+            ui.warning(f"Error while closing CLI stream: {e}", "CLI")
+
+    async def _flush_partial(self, cli, reason: str) -> None:
+        """Persist assistant text the adapter had buffered when the run was stopped"""
+        message_id, content = cli.take_partial_content()
+        if not content or not content.strip():
+            return
+
+        message = Message(
+            id=message_id or str(uuid.uuid4()),
+            project_id=self.project_id,
+            role="assistant",
+            message_type="chat",
+            content=content,
+            metadata_json={
+                "cli_type": cli.cli_type.value,
+                "partial": True,
+                "abort_reason": reason
+            },
+            session_id=self.session_id,
+            conversation_id=self.conversation_id,
+            created_at=datetime.utcnow()
+        )
+        try:
+            self.db.add(message)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            ui.error(f"Failed to save partial message: {e}", "CLI")
+            return
+        await self._broadcast_message(message)
+
+    def _record_token_usage(self) -> None:
+        if not self.tokens_used:
+            return
+        try:
+            session = self.db.get(Session, self.session_id)
+            if session:
+                session.total_tokens = (session.total_tokens or 0) + self.tokens_used
+                self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            ui.warning(f"Failed to record token usage: {e}", "CLI")
+
+    async def _broadcast_message(self, message: Message) -> None:
+        """Send a persisted message to the project's WebSocket clients"""
+        # The final message supersedes any delta frames still pending for its id
+        self._deltas.complete(message.id)
+        ws_message = {
+            "type": "message",
+            "data": {
+                "id": message.id,
+                "role": message.role,
+                "message_type": message.message_type,
+                "content": message.content,
+                "metadata": message.metadata_json,
+                "parent_message_id": getattr(message, 'parent_message_id', None),
+                "session_id": message.session_id,
+                "conversation_id": self.conversation_id,
+                "created_at": message.created_at.isoformat()
+            },
+            "timestamp": message.created_at.isoformat()
+        }
+        try:
+            await ws_manager.send_message(self.project_id, ws_message)
+        except Exception as e:
+            ui.error(f"WebSocket send failed: {e}", "Message")
+
+    async def _persist_streamed_message(self, message: Message) -> None:
+        """Save, forward and charge one streamed message, then detach it from the session
+
+        Expunging keeps a long run from accumulating every message (and its metadata) in the
+        session's identity map; nothing reads the object after this point. The raw CLI event and
+        long tool inputs are moved out of the metadata first (see message_metadata).
+        """
+        message.project_id = self.project_id
+        message.conversation_id = self.conversation_id
+        raw_event = compact_message(message)
+        self.db.add(message)
+        if raw_event is not None:
+            # MessageEvent has no relationship() to Message, so the unit of work does not order the
+            # two inserts: write the message first to satisfy the foreign key
+            self.db.flush()
+            self.db.add(raw_event)
+        self.db.commit()
+        try:
+            # Send message via WebSocket only if not hidden
+            should_hide = message.metadata_json and message.metadata_json.get("hidden_from_ui", False)
+            if not should_hide:
+                await self._broadcast_message(message)
+            self._charge_tokens(message)
+        finally:
+            self.db.expunge(message)
+            if raw_event is not None:
+                self.db.expunge(raw_event)
+
+    async def _stream_with_cli(
+        self,
+        cli,
+        instruction: str,
+        images: Optional[List[Dict[str, Any]]],
+        model: Optional[str] = None,
+        is_initial_prompt: bool = False
+    ) -> Dict[str, Any]:
+        """Stream an instruction through a CLI, persisting and forwarding every message"""
         
         ui.info(f"Starting {cli.cli_type.value} execution", "CLI")
         if model:
             ui.debug(f"Using model: {model}", "CLI")
         
-        messages_collected = []
-        has_changes = False
+        stats = _StreamStats()
         has_error = False  # Track if any error occurred
         result_success = None  # Track result event success status
         
@@ -1827,10 +2201,10 @@ class UnifiedCLIManager:
             # CLI output logs are now only printed to console, not sent to UI
             pass
         
-        message_count = 0
         saw_tool_use = False
+        stream_trace = _StreamTrace() if tracer.current_trace_id() else None
         
-        async for message in cli.execute_with_streaming(
+        self._active_stream = cli.execute_with_streaming(
             instruction=instruction,
             project_path=self.project_path,
             session_id=self.session_id,
@@ -1839,8 +2213,14 @@ class UnifiedCLIManager:
             model=model,
             is_initial_prompt=is_initial_prompt,
             unified_cli_manager=self
-        ):
-            message_count += 1
+        )
+        async for message in self._active_stream:
+            if isinstance(message, MessageDelta):
+                await self._deltas.push(message)
+                continue
+
+            if stream_trace is not None:
+                stream_trace.observe(message)
             if message.message_type == "tool_use":
                 saw_tool_use = True
             
@@ -1860,13 +2240,14 @@ class UnifiedCLIManager:
                     subtype = original_event.get("subtype", "")
                     
                     # ★ DEBUG: Log the complete result event structure
-                    ui.info(f"🔍 [Cursor] Result event received:", "DEBUG")
-                    ui.info(f"   Full event: {original_event}", "DEBUG")
-                    ui.info(f"   is_error: {is_error}", "DEBUG")
-                    ui.info(f"   subtype: '{subtype}'", "DEBUG")
-                    ui.info(f"   has event.result: {{'result' in original_event}}", "DEBUG")
-                    ui.info(f"   has event.status: {{'status' in original_event}}", "DEBUG")
-                    ui.info(f"   has event.success: {{'success' in original_event}}", "DEBUG")
+                    if ui.debug_enabled:
+                        ui.debug(f"🔍 [Cursor] Result event received:", "Cursor")
+                        ui.debug(f"   Full event: {original_event}", "Cursor")
+                        ui.debug(f"   is_error: {is_error}", "Cursor")
+                        ui.debug(f"   subtype: '{subtype}'", "Cursor")
+                        ui.debug(f"   has event.result: {'result' in original_event}", "Cursor")
+                        ui.debug(f"   has event.status: {'status' in original_event}", "Cursor")
+                        ui.debug(f"   has event.success: {'success' in original_event}", "Cursor")
                     
                     if is_error or subtype == "error":
                         has_error = True
@@ -1883,42 +2264,9 @@ class UnifiedCLIManager:
                             result_success = True
                             ui.success(f"Cursor result: assuming success (no error detected)", "CLI")
             
-            # Save message to database
-            message.project_id = self.project_id
-            message.conversation_id = self.conversation_id
-            self.db.add(message)
-            self.db.commit()
-            
-            messages_collected.append(message)
-            
-            # Check if message should be hidden from UI
-            should_hide = message.metadata_json and message.metadata_json.get("hidden_from_ui", False)
-            
-            # Send message via WebSocket only if not hidden
-            if not should_hide:
-                ws_message = {
-                    "type": "message",
-                    "data": {
-                        "id": message.id,
-                        "role": message.role,
-                        "message_type": message.message_type,
-                        "content": message.content,
-                        "metadata": message.metadata_json,
-                        "parent_message_id": getattr(message, 'parent_message_id', None),
-                        "session_id": message.session_id,
-                        "conversation_id": self.conversation_id,
-                        "created_at": message.created_at.isoformat()
-                    },
-                    "timestamp": message.created_at.isoformat()
-                }
-                try:
-                    await ws_manager.send_message(self.project_id, ws_message)
-                except Exception as e:
-                    ui.error(f"WebSocket send failed: {e}", "Message")
-            
-            # Check if changes were made
-            if message.metadata_json and "changes_made" in message.metadata_json:
-                has_changes = True
+            # Save message to database and forward it
+            stats.add(message)
+            await self._persist_streamed_message(message)
         
         # ACT mode auto-continue fallback: if no tools were used, send a follow-up prompt to begin executing
         if cli.cli_type == CLIType.GEMINI and not saw_tool_use:
@@ -1931,7 +2279,7 @@ class UnifiedCLIManager:
                 "then glob '**/*.{ts,tsx,js,jsx,json}' to gather context, and proceed to write_file to create the needed app files."
             )
 
-            async for message in cli.execute_with_streaming(
+            self._active_stream = cli.execute_with_streaming(
                 instruction=act_followup,
                 project_path=self.project_path,
                 session_id=self.session_id,
@@ -1940,37 +2288,21 @@ class UnifiedCLIManager:
                 model=model,
                 is_initial_prompt=False,
                 unified_cli_manager=self
-            ):
-                message_count += 1
+            )
+            async for message in self._active_stream:
+                if isinstance(message, MessageDelta):
+                    await self._deltas.push(message)
+                    continue
+                if stream_trace is not None:
+                    stream_trace.observe(message)
                 if message.message_type == "tool_use":
                     saw_tool_use = True
                 # Save and forward
-                message.project_id = self.project_id
-                message.conversation_id = self.conversation_id
-                self.db.add(message)
-                self.db.commit()
-                should_hide = message.metadata_json and message.metadata_json.get("hidden_from_ui", False)
-                if not should_hide:
-                    ws_message = {
-                        "type": "message",
-                        "data": {
-                            "id": message.id,
-                            "role": message.role,
-                            "message_type": message.message_type,
-                            "content": message.content,
-                            "metadata": message.metadata_json,
-                            "parent_message_id": getattr(message, 'parent_message_id', None),
-                            "session_id": message.session_id,
-                            "conversation_id": self.conversation_id,
-                            "created_at": message.created_at.isoformat()
-                        },
-                        "timestamp": message.created_at.isoformat()
-                    }
-                    try:
-                        await ws_manager.send_message(self.project_id, ws_message)
-                    except Exception as e:
-                        ui.error(f"WebSocket send failed: {e}", "Message")
-                messages_collected.append(message)
+                stats.add(message)
+                await self._persist_streamed_message(message)
+
+        if stream_trace is not None:
+            stream_trace.close()
 
         # Determine final success status
         # For Cursor: check result_success if available, otherwise check has_error
@@ -1982,7 +2314,7 @@ class UnifiedCLIManager:
             ui.info(f"Using Cursor result_success: {result_success}", "CLI")
         else:
             # If there are no messages and no errors, it's a failure
-            if len(messages_collected) == 0 and not has_error:
+            if stats.count == 0 and not has_error:
                 success = False
                 ui.error("Streaming completed with no messages and no explicit error.", "CLI")
             else:
@@ -1990,17 +2322,19 @@ class UnifiedCLIManager:
                 ui.info(f"Using has_error logic: not {has_error} = {success}", "CLI")
         
         if success:
-            ui.success(f"Streaming completed successfully. Total messages: {len(messages_collected)}", "CLI")
+            ui.success(f"Streaming completed successfully. Total messages: {stats.count} {stats.by_type}", "CLI")
         else:
-            ui.error(f"Streaming completed with errors. Total messages: {len(messages_collected)}", "CLI")
+            ui.error(f"Streaming completed with errors. Total messages: {stats.count} {stats.by_type}", "CLI")
         
         return {
             "success": success,
             "cli_used": cli.cli_type.value,
-            "has_changes": has_changes,
+            "has_changes": stats.has_changes,
             "message": f"{('Successfully' if success else 'Failed to')} execute with {cli.cli_type.value}",
             "error": "Execution failed" if not success else None,
-            "messages_count": len(messages_collected)
+            "messages_count": stats.count,
+            "message_types": stats.by_type,
+            "tokens_used": self.tokens_used
         }
     
     async def check_cli_status(self, cli_type: CLIType, selected_model: Optional[str] = None) -> Dict[str, Any]:
@@ -2026,93 +2360,11 @@ class UnifiedCLIManager:
         }
 
     async def execute_tool_with_retry(self, function_call: dict, max_retries: int = 2):
-        for attempt in range(max_retries + 1):
-            result = await self._execute_tool(function_call)
-            if result["success"] or attempt == max_retries:
-                return result
-            await asyncio.sleep(1.5 ** attempt)
-
-    async def _execute_tool(self, function_call: dict) -> Dict[str, Any]:
-        tool_name = function_call.get("name")
-        tool_args = function_call.get("args", {})
-
-        try:
-            if tool_name == "run_shell_command":
-                return await self._run_shell_command(**tool_args)
-            elif tool_name == "write_file":
-                return await self._write_file(**tool_args)
-            elif tool_name == "read_file":
-                return await self._read_file(**tool_args)
-            elif tool_name == "list_directory":
-                return await self._list_directory(**tool_args)
-            elif tool_name == "glob":
-                return await self._glob(**tool_args)
-            elif tool_name == "search_file_content":
-                return await self._search_file_content(**tool_args)
-            elif tool_name == "replace":
-                return await self._replace(**tool_args)
-            else:
-                return {
-                    "success": False,
-                    "error": {
-                        "type": "ToolNotFound",
-                        "message": f"Tool '{tool_name}' is not a valid tool."
-                    }
-                }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": {
-                    "type": e.__class__.__name__,
-                    "message": str(e)
-                }
-            }
-
-    
-
-
-    async def execute_tool_with_retry(self, function_call: dict, max_retries: int = 2):
-        for attempt in range(max_retries + 1):
-            result = await self._execute_tool(function_call)
-            if result["success"] or attempt == max_retries:
-                return result
-            await asyncio.sleep(1.5 ** attempt)
+        """Run a tool call ({"name", "args"}); transient failures of idempotent tools are retried"""
+        return await tool_registry.execute(self, function_call.get("name"), function_call.get("args"), max_retries)
 
     async def _execute_tool(self, function_call: dict) -> Dict[str, Any]:
-        tool_name = function_call.get("name")
-        tool_args = function_call.get("args", {})
-
-        try:
-            if tool_name == "run_shell_command":
-                return await self._run_shell_command(**tool_args)
-            elif tool_name == "write_file":
-                return await self._write_file(**tool_args)
-            elif tool_name == "read_file":
-                return await self._read_file(**tool_args)
-            elif tool_name == "list_directory":
-                return await self._list_directory(**tool_args)
-            elif tool_name == "glob":
-                return await self._glob(**tool_args)
-            elif tool_name == "search_file_content":
-                return await self._search_file_content(**tool_args)
-            elif tool_name == "replace":
-                return await self._replace(**tool_args)
-            else:
-                return {
-                    "success": False,
-                    "error": {
-                        "type": "ToolNotFound",
-                        "message": f"Tool '{tool_name}' is not a valid tool."
-                    }
-                }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": {
-                    "type": e.__class__.__name__,
-                    "message": str(e)
-                }
-            }
+        return await tool_registry.execute(self, function_call.get("name"), function_call.get("args"), max_retries=0)
 
     def _get_safe_path(self, path: str) -> str:
         repo_path = os.path.abspath(os.path.join(self.project_path, "repo"))
@@ -2139,25 +2391,18 @@ class UnifiedCLIManager:
                     raise ValueError(f"Dangerous command pattern detected: '{command}'")
 
     @monitor_tool_execution("run_shell_command")
-    async def _run_shell_command(self, command: str) -> Dict[str, Any]:
+    async def _run_shell_command(self, command: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         self._analyze_shell_command(command)
         
         repo_path = os.path.join(self.project_path, "repo")
         if not os.path.exists(repo_path):
             repo_path = self.project_path
 
-        process = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=repo_path
-        )
-        stdout, stderr = await process.communicate()
+        # Agents may ask for a shorter limit, never a longer one
+        if timeout and settings.shell_timeout_seconds:
+            timeout = min(timeout, settings.shell_timeout_seconds)
 
-        if process.returncode == 0:
-            return {"success": True, "stdout": stdout.decode()}
-        else:
-            return {"success": False, "stderr": stderr.decode(), "exit_code": process.returncode}
+        return await run_shell_command(command, cwd=repo_path, project_id=self.project_id, timeout=timeout)
 
     @monitor_tool_execution("write_file")
     async def _write_file(self, file_path: str, content: str) -> Dict[str, Any]:
@@ -2173,8 +2418,7 @@ class UnifiedCLIManager:
             
         safe_path = self._get_safe_path(file_path)
         try:
-            with open(safe_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            await atomic_write_text(safe_path, content)
             return {"success": True, "path": file_path}
         except Exception as e:
             return {
@@ -2186,12 +2430,14 @@ class UnifiedCLIManager:
             }
 
     @monitor_tool_execution("read_file")
-    async def _read_file(self, file_path: str) -> Dict[str, Any]:
+    async def _read_file(self, file_path: str, offset: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Read a file, or only `limit` lines starting at line `offset` (0-based) to page through large files"""
         safe_path = self._get_safe_path(file_path)
         try:
-            with open(safe_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            return {"success": True, "content": content}
+            if offset is None and limit is None:
+                return {"success": True, "content": await read_text(safe_path)}
+            window = await read_text_window(safe_path, offset or 0, limit)
+            return {"success": True, **window}
         except Exception as e:
             return {
                 "success": False,
@@ -2238,13 +2484,16 @@ class UnifiedCLIManager:
             }
 
     @monitor_tool_execution("search_file_content")
-    async def _search_file_content(self, pattern: str, path: Optional[str] = None) -> Dict[str, Any]:
+    async def _search_file_content(self, pattern: str, path: Optional[str] = None, include: Optional[str] = None) -> Dict[str, Any]:
         search_path = self._get_safe_path(path) if path else self._get_safe_path('.')
         
         try:
+            import fnmatch
             results = []
             for root, _, files in os.walk(search_path):
                 for file in files:
+                    if include and not fnmatch.fnmatch(file, include):
+                        continue
                     file_path = os.path.join(root, file)
                     try:
                         with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -2268,18 +2517,60 @@ class UnifiedCLIManager:
             }
 
     @monitor_tool_execution("replace")
-    async def _replace(self, file_path: str, old_string: str, new_string: str) -> Dict[str, Any]:
-        safe_path = self._get_safe_path(file_path)
+    async def _replace(self, file_path: str, old_string: str, new_string: str,
+                       expected_replacements: Optional[int] = None) -> Dict[str, Any]:
+        result = await self._apply_edits([{
+            "file_path": file_path,
+            "old_string": old_string,
+            "new_string": new_string,
+            "expected_replacements": expected_replacements
+        }])
+        if not result["success"]:
+            return result
+        return {"success": True, **result["files"][0]}
+
+    @monitor_tool_execution("multi_edit")
+    async def _multi_edit(self, edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self._apply_edits(edits)
+
+    async def _apply_edits(self, edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply edits with one read and at most one write per file; nothing is written unless every edit matches"""
         try:
-            with open(safe_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            new_content = content.replace(old_string, new_string)
-            
-            with open(safe_path, "w", encoding="utf-8") as f:
-                f.write(new_content)
-            
-            return {"success": True, "path": file_path}
+            planned = []
+            for safe_path, (file_path, file_edits) in normalize_edits(edits, self._get_safe_path).items():
+                try:
+                    before = await read_text(safe_path)
+                except FileNotFoundError:
+                    before = None
+                try:
+                    after, replacements = apply_edits(before, file_edits)
+                except EditError as e:
+                    e.message = f"{file_path}: {e.message}"
+                    raise
+                planned.append((file_path, safe_path, before, after, replacements))
+
+            files = []
+            for file_path, safe_path, before, after, replacements in planned:
+                changed = before is None or after != before
+                if changed:
+                    await atomic_write_text(safe_path, after)
+                files.append({
+                    "path": file_path,
+                    "replacements": replacements,
+                    "changed": changed,
+                    "diff": compact_diff(file_path, before or "", after) if changed else ""
+                })
+            return {"success": True, "files": files}
+        except EditError as e:
+            return {
+                "success": False,
+                "error": {
+                    "type": "EditError",
+                    "message": e.message,
+                    "edit_index": e.index,
+                    "found": e.found
+                }
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -4,85 +4,42 @@ Handles session persistence and continuity across different CLI agents
 """
 from typing import Dict, Optional, Any
 from sqlalchemy.orm import Session
-from app.models.projects import Project
 from app.services.cli.unified_manager import CLIType
+from app.services.cli.session_cache import SESSION_COLUMNS, project_sessions
 
 
 class CLISessionManager:
-    """Manages CLI sessions across different AI agents"""
+    """Manages CLI sessions across different AI agents
+
+    Session ids and preferences live in the process-wide project_sessions cache, which writes
+    through to the project row; this class only adds the per-request DB queries (stats, migration).
+    """
     
     def __init__(self, db: Session):
         self.db = db
-        self._session_cache: Dict[str, Dict[CLIType, str]] = {}
     
     def get_session_id(self, project_id: str, cli_type: CLIType) -> Optional[str]:
         """Get existing session ID for a project and CLI type"""
-        # Check cache first
-        if project_id in self._session_cache:
-            cached_session = self._session_cache[project_id].get(cli_type)
-            if cached_session:
-                return cached_session
-        
-        # Get from database
-        project = self.db.get(Project, project_id)
-        if not project:
-            return None
-        
-        session_mapping = {
-            CLIType.CLAUDE: project.active_claude_session_id,
-            CLIType.CURSOR: project.active_cursor_session_id
-        }
-        
-        session_id = session_mapping.get(cli_type)
-        
-        # Update cache
-        if project_id not in self._session_cache:
-            self._session_cache[project_id] = {}
-        self._session_cache[project_id][cli_type] = session_id
-        
-        return session_id
+        return project_sessions.get_session_id(project_id, cli_type.value)
     
     def set_session_id(self, project_id: str, cli_type: CLIType, session_id: str) -> bool:
         """Set session ID for a project and CLI type"""
-        project = self.db.get(Project, project_id)
-        if not project:
+        if cli_type.value not in SESSION_COLUMNS:
             return False
-        
-        # Update database
-        update_mapping = {
-            CLIType.CLAUDE: {"active_claude_session_id": session_id},
-            CLIType.CURSOR: {"active_cursor_session_id": session_id}
-        }
-        
-        update_data = update_mapping.get(cli_type)
-        if not update_data:
+        if not project_sessions.set_session_id(project_id, cli_type.value, session_id):
             return False
         
-        # Update project record
-        for field, value in update_data.items():
-            setattr(project, field, value)
-        
-        self.db.commit()
-        
-        # Update cache
-        if project_id not in self._session_cache:
-            self._session_cache[project_id] = {}
-        self._session_cache[project_id][cli_type] = session_id
-        
         from app.core.terminal_ui import ui
         ui.success(f"Set {cli_type.value} session ID for project {project_id}: {session_id}", "Session")
         return True
     
     def get_all_sessions(self, project_id: str) -> Dict[str, Optional[str]]:
         """Get all CLI session IDs for a project"""
-        project = self.db.get(Project, project_id)
-        if not project:
+        state = project_sessions.get(project_id)
+        if not state.persisted:
             return {}
         
-        return {
-            "claude": project.active_claude_session_id,
-            "cursor": project.active_cursor_session_id
-        }
+        return dict(state.sessions)
     
     def clear_session_id(self, project_id: str, cli_type: CLIType) -> bool:
         """Clear session ID for a project and CLI type"""
@@ -90,19 +47,9 @@ class CLISessionManager:
     
     def clear_all_sessions(self, project_id: str) -> bool:
         """Clear all CLI session IDs for a project"""
-        project = self.db.get(Project, project_id)
-        if not project:
+        if not project_sessions.clear_sessions(project_id):
             return False
         
-        project.active_claude_session_id = None
-        project.active_cursor_session_id = None
-        
-        self.db.commit()
-        
-        # Clear cache
-        if project_id in self._session_cache:
-            del self._session_cache[project_id]
-        
         from app.core.terminal_ui import ui
         ui.info(f"Cleared all CLI sessions for project {project_id}", "Session")
         return True
@@ -137,35 +84,27 @@ class CLISessionManager:
     
     def get_preferred_cli(self, project_id: str) -> Optional[CLIType]:
         """Get preferred CLI for a project"""
-        project = self.db.get(Project, project_id)
-        if not project:
+        state = project_sessions.get(project_id)
+        if not state.persisted:
             return None
         
         try:
-            return CLIType(project.preferred_cli)
+            return CLIType(state.preferred_cli)
         except ValueError:
             return CLIType.CLAUDE  # Default fallback
     
     def set_preferred_cli(self, project_id: str, cli_type: CLIType, fallback_enabled: bool = True) -> bool:
         """Set preferred CLI for a project"""
-        project = self.db.get(Project, project_id)
-        if not project:
+        if not project_sessions.set_preferences(project_id, preferred_cli=cli_type.value,
+                                                fallback_enabled=fallback_enabled):
             return False
         
-        project.preferred_cli = cli_type.value
-        project.fallback_enabled = fallback_enabled
-        self.db.commit()
-        
         print(f"✅ [Session] Set preferred CLI for project {project_id}: {cli_type.value} (fallback: {fallback_enabled})")
         return True
     
     def is_fallback_enabled(self, project_id: str) -> bool:
         """Check if fallback is enabled for a project"""
-        project = self.db.get(Project, project_id)
-        if not project:
-            return True  # Default to enabled
-        
-        return project.fallback_enabled
+        return project_sessions.get(project_id).fallback_enabled
     
     def migrate_legacy_sessions(self, project_id: str) -> Dict[str, int]:
         """Migrate legacy Claude-only sessions to new CLI system"""
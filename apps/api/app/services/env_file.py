@@ -0,0 +1,239 @@
+"""
+.env file sync engine
+
+Reads are cached per path and re-parsed only when the file changed: a stat (mtime, size) match
+returns the cached parse, and a content hash match after a re-read does too (e.g. a touch or an
+editor saving identical content).
+
+Writes merge the new values into the existing file instead of regenerating it: comments, blank
+lines and key order are kept, changed keys are rewritten in place, removed keys are dropped and
+new keys are appended. Nothing is written when the merged content equals the current content,
+so the Next.js dev server does not reload for a no-op sync; otherwise the file is replaced
+atomically (temp file in the same directory, then rename).
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+HEADER = (
+    "# Environment Variables\n"
+    "# This file is automatically synchronized with Project Settings\n\n"
+)
+
+_LINE = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$')
+
+# Values that need quoting to survive a round trip through dotenv
+_QUOTE_CHARS = (' ', '#', '$', '`', '"', "'")
+
+# Next.js reloads .env while the dev server runs, but these are only read when it starts
+STARTUP_KEYS = frozenset({"NODE_OPTIONS", "HOSTNAME"})
+STARTUP_PREFIXES = ("NEXT_",)
+RELOADED_PREFIXES = ("NEXT_PUBLIC_",)
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
+def format_value(value: str) -> str:
+    if any(c in value for c in _QUOTE_CHARS):
+        return f'"{value}"'
+    return value
+
+
+class EnvDocument:
+    """Parsed .env file: its lines (kept verbatim) and the key each assignment line sets"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.splitlines(keepends=True)
+        self.keys: List[Optional[str]] = []
+        self.values: Dict[str, str] = {}
+        for line in self.lines:
+            match = _LINE.match(line)
+            if match is None:
+                # Comments, blank lines and anything else dotenv would not read as an assignment
+                self.keys.append(None)
+                continue
+            key, value = match.groups()
+            self.keys.append(key)
+            self.values[key] = _unquote(value)
+
+    def merge(self, env_vars: Dict[str, str]) -> str:
+        """Content of this file with its assignments replaced by env_vars"""
+        out: List[str] = []
+        written = set()
+        for line, key in zip(self.lines, self.keys):
+            if key is None:
+                out.append(line)
+            elif key in env_vars and key not in written:
+                written.add(key)
+                if _unquote(_LINE.match(line).group(2)) == env_vars[key]:
+                    out.append(line)
+                else:
+                    ending = line[len(line.rstrip("\r\n")):] or "\n"
+                    out.append(f"{key}={format_value(env_vars[key])}{ending}")
+            # Keys no longer set, and repeated assignments of a key, are dropped
+
+        added = sorted(key for key in env_vars if key not in written)
+        if added:
+            if out and not out[-1].endswith("\n"):
+                out[-1] += "\n"
+            out.extend(f"{key}={format_value(env_vars[key])}\n" for key in added)
+        return "".join(out)
+
+
+class EnvFileChange:
+    """Outcome of writing a .env file"""
+
+    def __init__(self, path: Path, written: bool, added: List[str], changed: List[str], removed: List[str]):
+        self.path = path
+        self.written = written
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+
+    @property
+    def keys(self) -> List[str]:
+        return self.added + self.changed + self.removed
+
+    @property
+    def restart_required(self) -> bool:
+        """Whether a running dev server has to restart to see this change
+
+        Next.js reloads .env on change, but removed keys may linger in process.env, and
+        NODE_OPTIONS / NEXT_* build settings are only read at startup.
+        """
+        if not self.written:
+            return False
+        if self.removed:
+            return True
+        return any(
+            key in STARTUP_KEYS or (key.startswith(STARTUP_PREFIXES) and not key.startswith(RELOADED_PREFIXES))
+            for key in self.added + self.changed
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "written": self.written,
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "restart_required": self.restart_required,
+        }
+
+
+class _Entry:
+    __slots__ = ("mtime_ns", "size", "digest", "document")
+
+    def __init__(self, mtime_ns: int, size: int, digest: str, document: EnvDocument):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.document = document
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path: Path, text: str) -> os.stat_result:
+    """Write text to a temp file next to path, then rename it over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # Keep the permissions of the file being replaced; new files stay owner-only
+            os.chmod(tmp_path, path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path.stat()
+
+
+class EnvFileSync:
+    """Process-wide .env read cache and merge writer"""
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._changes: Dict[str, EnvFileChange] = {}
+        self._lock = threading.Lock()
+        self.parses = 0
+
+    def read(self, env_path: Path) -> EnvDocument:
+        """Parsed contents of env_path, re-parsed only when the file changed"""
+        key = str(env_path)
+        try:
+            stat = env_path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return EnvDocument("")
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            return entry.document
+
+        data = env_path.read_bytes()
+        digest = _digest(data)
+        if entry is not None and entry.digest == digest:
+            document = entry.document
+        else:
+            document = EnvDocument(data.decode("utf-8"))
+            self.parses += 1
+        with self._lock:
+            self._entries[key] = _Entry(stat.st_mtime_ns, stat.st_size, digest, document)
+        return document
+
+    def write(self, env_path: Path, env_vars: Dict[str, str]) -> EnvFileChange:
+        """Merge env_vars into env_path, writing only if the content changes"""
+        current = self.read(env_path)
+        exists = env_path.exists()
+        text = current.merge(env_vars) if exists else HEADER + EnvDocument("").merge(env_vars)
+
+        previous = current.values
+        added = sorted(key for key in env_vars if key not in previous)
+        changed = sorted(key for key in env_vars if key in previous and previous[key] != env_vars[key])
+        removed = sorted(key for key in previous if key not in env_vars)
+
+        if exists and text == current.text:
+            change = EnvFileChange(env_path, False, added, changed, removed)
+        else:
+            env_path.parent.mkdir(parents=True, exist_ok=True)
+            stat = _atomic_write(env_path, text)
+            entry = _Entry(stat.st_mtime_ns, stat.st_size, _digest(text.encode("utf-8")), EnvDocument(text))
+            with self._lock:
+                self._entries[str(env_path)] = entry
+            change = EnvFileChange(env_path, True, added, changed, removed)
+        with self._lock:
+            self._changes[str(env_path)] = change
+        return change
+
+    def last_change(self, env_path: Path) -> Optional[EnvFileChange]:
+        with self._lock:
+            return self._changes.get(str(env_path))
+
+    def forget(self, env_path: Path) -> None:
+        with self._lock:
+            self._entries.pop(str(env_path), None)
+            self._changes.pop(str(env_path), None)
+
+
+env_files = EnvFileSync()
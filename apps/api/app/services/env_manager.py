@@ -2,16 +2,111 @@
 Environment Variables Manager
 
 Handles synchronization between database and .env files in Next.js projects.
+
+Decrypted values are served from a per-project snapshot cache. A snapshot is rebuilt when a
+write through this module invalidates it or when the project's rows changed underneath it
+(row count / last update differ); rebuilding only decrypts rows whose ciphertext changed.
+Each value carries a keyed content hash, so syncs detect changes without decrypting.
 """
 
 import os
-import re
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.env_vars import EnvVar
 from app.core.crypto import secret_box
 from app.core.config import settings
+from app.services.env_file import EnvFileChange, env_files
+
+
+class EnvValue:
+    """One decrypted env var row"""
+    __slots__ = ("id", "key", "value", "digest", "ciphertext", "scope", "var_type", "is_secret", "description")
+
+    def __init__(self, row: Any, value: str, digest: str):
+        self.id = row.id
+        self.key = row.key
+        self.value = value
+        self.digest = digest
+        self.ciphertext = row.value_encrypted
+        self.scope = row.scope
+        self.var_type = row.var_type
+        self.is_secret = row.is_secret
+        self.description = row.description
+
+
+class EnvSnapshot:
+    """Decrypted env vars of a project at one version"""
+
+    def __init__(self, version: int, fingerprint: Tuple[int, Optional[datetime]], rows: List[EnvValue]):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.rows = rows
+        self.by_id = {row.id: row for row in rows}
+        self.stale = False
+
+    def values(self) -> Dict[str, str]:
+        return {row.key: row.value for row in self.rows}
+
+
+class EnvSnapshotCache:
+    """Process-wide project_id -> EnvSnapshot cache"""
+
+    def __init__(self):
+        self._snapshots: Dict[str, EnvSnapshot] = {}
+        self._lock = threading.Lock()
+        self.decryptions = 0
+
+    def get(self, db: Session, project_id: str) -> EnvSnapshot:
+        fingerprint = _fingerprint(db, project_id)
+        with self._lock:
+            snapshot = self._snapshots.get(project_id)
+        if snapshot is not None and not snapshot.stale and snapshot.fingerprint == fingerprint:
+            return snapshot
+
+        rows = []
+        for env_var in db.query(EnvVar).filter(EnvVar.project_id == project_id).all():
+            previous = snapshot.by_id.get(env_var.id) if snapshot is not None else None
+            if previous is not None and previous.ciphertext == env_var.value_encrypted:
+                rows.append(EnvValue(env_var, previous.value, previous.digest))
+                continue
+            try:
+                value = secret_box.decrypt(env_var.value_encrypted)
+                self.decryptions += 1
+            except Exception as e:
+                print(f"⚠️  Failed to decrypt env var {env_var.key}: {e}")
+                continue
+            rows.append(EnvValue(env_var, value, secret_box.digest(value)))
+
+        version = snapshot.version + 1 if snapshot is not None else 1
+        fresh = EnvSnapshot(version, fingerprint, rows)
+        with self._lock:
+            self._snapshots[project_id] = fresh
+        return fresh
+
+    def invalidate(self, project_id: str) -> None:
+        """Mark a project's snapshot stale; it is kept so the rebuild can reuse unchanged values"""
+        with self._lock:
+            snapshot = self._snapshots.get(project_id)
+            if snapshot is not None:
+                snapshot.stale = True
+
+    def discard(self, project_id: str) -> None:
+        with self._lock:
+            self._snapshots.pop(project_id, None)
+
+
+def _fingerprint(db: Session, project_id: str) -> Tuple[int, Optional[datetime]]:
+    count, last_update = db.query(func.count(EnvVar.id), func.max(EnvVar.updated_at)).filter(
+        EnvVar.project_id == project_id
+    ).one()
+    return count, last_update
+
+
+env_snapshots = EnvSnapshotCache()
 
 
 def get_project_env_path(project_id: str) -> Path:
@@ -21,63 +116,29 @@ def get_project_env_path(project_id: str) -> Path:
 
 def parse_env_file(env_path: Path) -> Dict[str, str]:
     """Parse .env file and return key-value pairs"""
-    env_vars = {}
-    
-    if not env_path.exists():
-        return env_vars
-    
     try:
-        with open(env_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                
-                # Skip empty lines and comments
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Match KEY=VALUE pattern
-                match = re.match(r'^([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*)$', line)
-                if match:
-                    key, value = match.groups()
-                    
-                    # Handle quoted values
-                    if value.startswith('"') and value.endswith('"'):
-                        value = value[1:-1]
-                    elif value.startswith("'") and value.endswith("'"):
-                        value = value[1:-1]
-                    
-                    env_vars[key] = value
-                
+        # Cached per file; only re-parsed when the file's mtime/size and content changed
+        return dict(env_files.read(env_path).values)
     except Exception as e:
         print(f"Error parsing .env file {env_path}: {e}")
-    
-    return env_vars
+        return {}
+
 
+def write_env_file(env_path: Path, env_vars: Dict[str, str]) -> EnvFileChange:
+    """Write environment variables to .env file
 
-def write_env_file(env_path: Path, env_vars: Dict[str, str]) -> None:
-    """Write environment variables to .env file"""
+    Merges into the existing file (comments and order kept) and leaves it untouched when
+    nothing changed.
+    """
+    from app.core.terminal_ui import ui
     try:
-        # Ensure directory exists
-        env_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Write .env file
-        with open(env_path, 'w', encoding='utf-8') as f:
-            f.write("# Environment Variables\n")
-            f.write("# This file is automatically synchronized with Project Settings\n\n")
-            
-            # Sort keys for consistent output
-            for key in sorted(env_vars.keys()):
-                value = env_vars[key]
-                
-                # Quote values that contain spaces or special characters
-                if ' ' in value or any(c in value for c in ['#', '$', '`', '"', "'"]):
-                    value = f'"{value}"'
-                
-                f.write(f"{key}={value}\n")
-                
-        from app.core.terminal_ui import ui
-        ui.success(f"Updated .env file: {env_path}", "EnvManager")
-        
+        change = env_files.write(env_path, env_vars)
+        if change.written:
+            ui.success(f"Updated .env file: {env_path} ({len(change.keys)} keys changed)", "EnvManager")
+        else:
+            ui.debug(f".env file already up to date: {env_path}", "EnvManager")
+        return change
+
     except Exception as e:
         ui.error(f"Error writing .env file {env_path}: {e}", "EnvManager")
         raise
@@ -85,26 +146,12 @@ def write_env_file(env_path: Path, env_vars: Dict[str, str]) -> None:
 
 def load_env_vars_from_db(db: Session, project_id: str) -> Dict[str, str]:
     """Load environment variables from database for a project"""
-    env_vars = {}
-    
     try:
-        db_env_vars = db.query(EnvVar).filter(
-            EnvVar.project_id == project_id
-        ).all()
-        
-        for env_var in db_env_vars:
-            try:
-                # Decrypt the value
-                decrypted_value = secret_box.decrypt(env_var.value_encrypted)
-                env_vars[env_var.key] = decrypted_value
-            except Exception as e:
-                print(f"⚠️  Failed to decrypt env var {env_var.key}: {e}")
-                
+        return env_snapshots.get(db, project_id).values()
     except Exception as e:
         from app.core.terminal_ui import ui
         ui.error(f"Error loading env vars from DB for project {project_id}: {e}", "EnvManager")
-    
-    return env_vars
+        return {}
 
 
 def sync_env_file_to_db(db: Session, project_id: str) -> int:
@@ -118,6 +165,8 @@ def sync_env_file_to_db(db: Session, project_id: str) -> int:
     synced_count = 0
     
     try:
+        snapshot = env_snapshots.get(db, project_id)
+        
         # Get existing env vars from DB
         existing_vars = {
             env_var.key: env_var 
@@ -127,16 +176,10 @@ def sync_env_file_to_db(db: Session, project_id: str) -> int:
         # Update or create env vars from file
         for key, value in file_env_vars.items():
             if key in existing_vars:
-                # Update existing
+                # Update existing, re-encrypting only values whose content hash changed
                 existing_var = existing_vars[key]
-                try:
-                    # Only update if value changed
-                    current_value = secret_box.decrypt(existing_var.value_encrypted)
-                    if current_value != value:
-                        existing_var.value_encrypted = secret_box.encrypt(value)
-                        synced_count += 1
-                except Exception as e:
-                    print(f"⚠️  Failed to decrypt existing value for {key}: {e}")
+                cached = snapshot.by_id.get(existing_var.id)
+                if cached is None or cached.digest != secret_box.digest(value):
                     existing_var.value_encrypted = secret_box.encrypt(value)
                     synced_count += 1
             else:
@@ -162,12 +205,16 @@ def sync_env_file_to_db(db: Session, project_id: str) -> int:
                 synced_count += 1
         
         db.commit()
+        if synced_count:
+            env_snapshots.invalidate(project_id)
         from app.core.terminal_ui import ui
         ui.success(f"Synced {synced_count} env vars from file to DB", "EnvManager")
         
     except Exception as e:
+        from app.core.terminal_ui import ui
         ui.error(f"Error syncing env file to DB: {e}", "EnvManager")
         db.rollback()
+        env_snapshots.invalidate(project_id)
         raise
     
     return synced_count
@@ -182,7 +229,7 @@ def sync_db_to_env_file(db: Session, project_id: str) -> int:
         # Load from database
         env_vars = load_env_vars_from_db(db, project_id)
         
-        # Write to file
+        # Write to file (only the lines that changed, and only if anything did)
         env_path = get_project_env_path(project_id)
         write_env_file(env_path, env_vars)
         
@@ -194,6 +241,11 @@ def sync_db_to_env_file(db: Session, project_id: str) -> int:
         raise
 
 
+def get_env_file_change(project_id: str) -> Optional[EnvFileChange]:
+    """What the last DB -> file sync of this project changed on disk"""
+    return env_files.last_change(get_project_env_path(project_id))
+
+
 def get_env_var_conflicts(db: Session, project_id: str) -> List[Dict]:
     """
     Check for conflicts between DB and .env file
@@ -251,6 +303,7 @@ def create_env_var(db: Session, project_id: str, key: str, value: str,
     
     db.add(env_var)
     db.commit()
+    env_snapshots.invalidate(project_id)
     
     # Sync to file
     sync_db_to_env_file(db, project_id)
@@ -271,6 +324,7 @@ def update_env_var(db: Session, project_id: str, key: str, value: str) -> bool:
     # Update in database
     env_var.value_encrypted = secret_box.encrypt(value)
     db.commit()
+    env_snapshots.invalidate(project_id)
     
     # Sync to file
     sync_db_to_env_file(db, project_id)
@@ -291,6 +345,7 @@ def delete_env_var(db: Session, project_id: str, key: str) -> bool:
     # Delete from database
     db.delete(env_var)
     db.commit()
+    env_snapshots.invalidate(project_id)
     
     # Sync to file
     sync_db_to_env_file(db, project_id)
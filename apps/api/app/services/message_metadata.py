@@ -0,0 +1,171 @@
+"""
+Compact message metadata
+
+CLI adapters attach the raw event a message was built from (metadata "original_event" /
+"original_format", or "data" for parsed JSON lines) and full tool inputs, which for Write-style
+tools include entire file contents. Before a message is stored, compact_message() moves the raw
+event into the message_events side table (zlib-compressed, capped per event; dropped when the
+side store is disabled) and replaces tool input strings longer than the inline limit with a
+head, their length and a content hash.
+
+compact_existing_messages() applies the same schema to rows written before it existed.
+"""
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Text, cast, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.message_events import MessageEvent
+from app.models.messages import Message
+
+
+# Metadata keys holding a raw CLI event
+RAW_EVENT_KEYS = ("original_event", "original_format")
+# Characters of a truncated string kept inline
+HEAD_CHARS = 200
+
+
+def compact_value(value: Any, max_chars: int) -> Any:
+    """value with every string longer than max_chars replaced by a head + length + hash summary"""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return {
+            "truncated": True,
+            "chars": len(value),
+            "sha256": hashlib.sha256(value.encode("utf-8", "surrogatepass")).hexdigest(),
+            "head": value[:min(HEAD_CHARS, max_chars)]
+        }
+    if isinstance(value, dict):
+        return {key: compact_value(item, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact_value(item, max_chars) for item in value]
+    return value
+
+
+def compact_metadata(metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """(compacted metadata, raw event it carried or None)"""
+    if not metadata:
+        return metadata, None
+
+    compacted = dict(metadata)
+    raw_event = None
+    for key in RAW_EVENT_KEYS:
+        if key in compacted:
+            value = compacted.pop(key)
+            if raw_event is None:
+                raw_event = value
+    if compacted.get("parsed_json") and "data" in compacted:
+        # The JSON line itself is the message content; its parsed form is the raw event
+        data = compacted.pop("data")
+        if raw_event is None:
+            raw_event = data
+    if "tool_input" in compacted:
+        compacted["tool_input"] = compact_value(compacted["tool_input"], settings.message_tool_input_max_chars)
+    return compacted, raw_event
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def encode_raw_event(message_id: str, raw_event: Any) -> Optional[MessageEvent]:
+    """Side-store row for a raw event, or None when disabled or too large even after truncation"""
+    if raw_event is None or not settings.message_raw_events:
+        return None
+    limit = settings.message_raw_event_max_bytes
+
+    data = _encode(raw_event)
+    payload = zlib.compress(data, 6)
+    truncated = False
+    if len(payload) > limit:
+        data = _encode(compact_value(raw_event, settings.message_tool_input_max_chars))
+        payload = zlib.compress(data, 6)
+        truncated = True
+        if len(payload) > limit:
+            return None
+    return MessageEvent(message_id=message_id, encoding="zlib", payload=payload,
+                        raw_size=len(data), truncated=truncated)
+
+
+def compact_message(message: Message) -> Optional[MessageEvent]:
+    """Compact message.metadata_json in place; returns the side-store row to add with it, if any"""
+    metadata, raw_event = compact_metadata(message.metadata_json)
+    message.metadata_json = metadata
+    return encode_raw_event(message.id, raw_event)
+
+
+def load_raw_event(db: Session, message_id: str) -> Optional[Dict[str, Any]]:
+    """The raw event stored for a message: {"event", "truncated", "raw_size"}"""
+    row = db.get(MessageEvent, message_id)
+    if row is None:
+        return None
+    return {
+        "event": json.loads(zlib.decompress(row.payload).decode("utf-8")),
+        "truncated": row.truncated,
+        "raw_size": row.raw_size
+    }
+
+
+def _needs_compaction(metadata: Optional[Dict[str, Any]]) -> bool:
+    if not metadata:
+        return False
+    if any(key in metadata for key in RAW_EVENT_KEYS) or (metadata.get("parsed_json") and "data" in metadata):
+        return True
+    return "tool_input" in metadata and compact_value(metadata["tool_input"], settings.message_tool_input_max_chars) != metadata["tool_input"]
+
+
+def compact_existing_messages(db: Session, batch_size: int = 500) -> Dict[str, int]:
+    """Rewrite stored rows into the compact schema, in batches; returns counts"""
+    # Cheap pre-filter on the JSON text; _needs_compaction decides per row
+    text = cast(Message.metadata_json, Text)
+    candidates = or_(*(text.like(f'%"{key}"%') for key in RAW_EVENT_KEYS + ("tool_input", "parsed_json")))
+    stats = {"scanned": 0, "compacted": 0, "raw_events_stored": 0}
+    last_id = ""
+    while True:
+        rows = (
+            db.query(Message)
+            .filter(Message.id > last_id, candidates)
+            .order_by(Message.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        existing = {
+            message_id for (message_id,) in
+            db.query(MessageEvent.message_id).filter(MessageEvent.message_id.in_([row.id for row in rows]))
+        }
+        for message in rows:
+            stats["scanned"] += 1
+            if not _needs_compaction(message.metadata_json):
+                continue
+            event = compact_message(message)
+            stats["compacted"] += 1
+            if event is not None and message.id not in existing:
+                db.add(event)
+                stats["raw_events_stored"] += 1
+        db.commit()
+        db.expunge_all()
+    return stats
+
+
+def metadata_size_report(db: Session) -> Dict[str, int]:
+    """Stored bytes of message metadata and of the raw event side store"""
+    messages, metadata_bytes = db.query(
+        func.count(Message.id), func.coalesce(func.sum(func.length(Message.metadata_json)), 0)
+    ).one()
+    events, event_bytes = db.query(
+        func.count(MessageEvent.message_id), func.coalesce(func.sum(func.length(MessageEvent.payload)), 0)
+    ).one()
+    return {
+        "messages": messages,
+        "metadata_bytes": int(metadata_bytes),
+        "raw_events": events,
+        "raw_event_bytes": int(event_bytes)
+    }
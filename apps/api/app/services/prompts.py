@@ -0,0 +1,235 @@
+"""
+System prompt store
+
+The default prompt is app/prompt/system-prompt.md, re-read only when its mtime or size
+changes (checked at most once per CHECK_INTERVAL seconds). A project can replace it with its
+own prompt, persisted in the project_prompts table and cached here after the first lookup.
+The final prompt handed to each CLI is assembled once per (project, CLI) and reused until the
+default file or the project's override changes, so adapters never re-read or re-assemble it.
+
+Like the CLI session cache, the store opens its own short-lived DB sessions.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.terminal_ui import ui
+from app.models.project_prompts import ProjectPrompt
+
+
+# Seconds between stat() calls on the default prompt file
+CHECK_INTERVAL = 1.0
+
+FALLBACK_PROMPT = (
+    "You are Claude Code, an advanced AI coding assistant specialized in building modern fullstack web applications.\n"
+    "You assist users by chatting with them and making changes to their code in real-time.\n\n"
+    "Constraints:\n"
+    "- Do not delete files entirely; prefer edits.\n"
+    "- Keep changes minimal and focused.\n"
+    "- Use UTF-8 encoding.\n"
+    "- Follow modern development best practices.\n"
+)
+
+_UNSET = object()
+
+
+def find_prompt_file() -> Path:
+    """
+    Find the system-prompt.md file in app/prompt/ directory.
+    """
+    current_path = Path(__file__).resolve()
+
+    # Get the app directory (current file is in app/services/)
+    app_dir = current_path.parent.parent  # app/
+    prompt_file = app_dir / 'prompt' / 'system-prompt.md'
+
+    if prompt_file.exists():
+        return prompt_file
+
+    # Fallback: look for system-prompt.md in various locations
+    fallback_locations = [
+        current_path.parent.parent.parent.parent / 'docs' / 'system-prompt.md',  # project-root/docs/
+        current_path.parent.parent.parent.parent / 'system-prompt.md',  # project-root/
+    ]
+
+    for location in fallback_locations:
+        if location.exists():
+            return location
+
+    # Return expected location even if it doesn't exist
+    return prompt_file
+
+
+def assemble_prompt(cli: str, prompt: str) -> str:
+    """Final prompt text for a CLI: passed as the system prompt (Claude) or written to AGENT.md (Cursor)"""
+    if cli == "cursor":
+        return prompt + "\n"
+    return prompt
+
+
+def _default_session_factory() -> Session:
+    from app.db.session import SessionLocal
+    return SessionLocal()
+
+
+class PromptStore:
+    """Default prompt file cache, per-project overrides and precomputed per-CLI prompts"""
+
+    def __init__(self, session_factory: Callable[[], Session] = _default_session_factory,
+                 prompt_file: Optional[Path] = None, check_interval: float = CHECK_INTERVAL):
+        self.session_factory = session_factory
+        self.prompt_file = prompt_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # Default prompt: (mtime_ns, size) of the file it was read from, None when the fallback is used
+        self._default: Optional[str] = None
+        self._default_key: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._default_version = 0
+        # project_id -> override text, or None for "no override"
+        self._overrides: Dict[str, Optional[str]] = {}
+        self._generations: Dict[str, int] = {}
+        # (project_id, cli) -> assembled prompt
+        self._final: Dict[Tuple[Optional[str], str], str] = {}
+        self.file_reads = 0
+        self.override_loads = 0
+
+    # Default prompt
+
+    def default(self, force_reload: bool = False) -> str:
+        """The default prompt, re-read only when the file changed"""
+        now = time.monotonic()
+        if not force_reload and self._default is not None and now - self._checked_at < self.check_interval:
+            return self._default
+
+        prompt_file = self.prompt_file or find_prompt_file()
+        try:
+            stat = os.stat(prompt_file)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+
+        with self._lock:
+            self._checked_at = now
+            if not force_reload and self._default is not None and key == self._default_key:
+                return self._default
+
+        content = None
+        if key is not None:
+            try:
+                with open(prompt_file, 'r', encoding='utf-8') as f:
+                    content = f.read().strip()
+                self.file_reads += 1
+                ui.info(f"Loaded system prompt from: {prompt_file} ({len(content)} chars)", "Prompt")
+            except Exception as e:
+                ui.error(f"Error loading system prompt: {e}", "Prompt")
+                key = None
+        if content is None:
+            ui.warning(f"System prompt file not found at: {prompt_file}; using fallback prompt", "Prompt")
+            content = FALLBACK_PROMPT
+
+        with self._lock:
+            if content != self._default:
+                # Assembled prompts of projects without an override were built from the old text
+                self._final = {
+                    (project_id, cli): prompt for (project_id, cli), prompt in self._final.items()
+                    if project_id is not None and self._overrides.get(project_id) is not None
+                }
+                self._default_version += 1
+            self._default = content
+            self._default_key = key
+        return content
+
+    # Per-project overrides
+
+    def override(self, project_id: str) -> Optional[str]:
+        """The project's custom prompt, or None when it uses the default"""
+        with self._lock:
+            cached = self._overrides.get(project_id, _UNSET)
+            generation = self._generations.get(project_id, 0)
+        if cached is not _UNSET:
+            return cached
+
+        db = self.session_factory()
+        try:
+            row = db.get(ProjectPrompt, project_id)
+            value = row.system_prompt if row is not None else None
+        finally:
+            db.close()
+        self.override_loads += 1
+
+        with self._lock:
+            if self._generations.get(project_id, 0) == generation:
+                self._overrides.setdefault(project_id, value)
+            return self._overrides.get(project_id, value)
+
+    def get(self, project_id: Optional[str] = None) -> str:
+        """The prompt in effect for a project (the default when project_id is None)"""
+        if project_id is not None:
+            custom = self.override(project_id)
+            if custom is not None:
+                return custom
+        return self.default()
+
+    def set_override(self, project_id: str, system_prompt: Optional[str]) -> None:
+        """Persist a project's custom prompt (None removes it) and drop its assembled prompts"""
+        db = self.session_factory()
+        try:
+            row = db.get(ProjectPrompt, project_id)
+            if system_prompt is None:
+                if row is not None:
+                    db.delete(row)
+            elif row is None:
+                db.add(ProjectPrompt(project_id=project_id, system_prompt=system_prompt))
+            else:
+                row.system_prompt = system_prompt
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.invalidate(project_id)
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._overrides[project_id] = system_prompt
+            self._drop_final(project_id)
+
+    def invalidate(self, project_id: str) -> None:
+        """Forget a project's cached override and assembled prompts (e.g. after deleting it)"""
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._overrides.pop(project_id, None)
+            self._drop_final(project_id)
+
+    def _drop_final(self, project_id: str) -> None:
+        for key in [key for key in self._final if key[0] == project_id]:
+            del self._final[key]
+
+    # Assembled prompts
+
+    def final(self, project_id: Optional[str], cli: str) -> str:
+        """The prompt a CLI gets for a project, assembled once and reused until it changes"""
+        # Keeps the default fresh; a changed file drops the entries built from it
+        default = self.default()
+        with self._lock:
+            prompt = self._final.get((project_id, cli))
+            versions = (self._generations.get(project_id, 0), self._default_version)
+        if prompt is not None:
+            return prompt
+
+        custom = self.override(project_id) if project_id is not None else None
+        prompt = assemble_prompt(cli, custom if custom is not None else default)
+        with self._lock:
+            # Not cached if the override or the default changed while assembling
+            if (self._generations.get(project_id, 0), self._default_version) == versions:
+                self._final[(project_id, cli)] = prompt
+        return prompt
+
+
+prompt_store = PromptStore()
@@ -0,0 +1,291 @@
+"""
+Execution Scheduler
+Queues ACT/chat runs per project and limits concurrent CLI executions per CLI type
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+from app.core.tracing import tracer
+from app.core.websocket.manager import manager as ws_manager
+from app.models.user_requests import UserRequest
+
+
+class SchedulerError(Exception):
+    """Raised when a run cannot be admitted to the queue"""
+    def __init__(self, message: str, status_code: int = 409):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+_sequence = itertools.count()
+
+
+class ScheduledRun:
+    """A single ACT/chat run waiting for (or holding) an execution slot"""
+
+    def __init__(
+        self,
+        request_id: str,
+        project_id: str,
+        cli_type: str,
+        runner: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        request_type: str = "act"
+    ):
+        self.request_id = request_id
+        self.project_id = project_id
+        self.cli_type = cli_type
+        self.runner = runner
+        self.priority = priority
+        self.request_type = request_type
+        self.sequence = next(_sequence)
+        self.enqueued_at = datetime.utcnow()
+        self.enqueued_ts = time.time()
+        self.started_at: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        self.executing = False  # The task has taken its first step (the runner owns the run's rows)
+
+    @property
+    def heap_entry(self) -> tuple:
+        # Higher priority first, FIFO within the same priority
+        return (-self.priority, self.sequence, self)
+
+
+class ExecutionScheduler:
+    """
+    Per-project priority/FIFO queues with a global worker limit per CLI type.
+
+    A project runs at most one instruction at a time. Projects with pending work are
+    visited round-robin so a long queue on one project cannot starve the others.
+    """
+
+    def __init__(self, default_limit: Optional[int] = None, max_queued_per_project: Optional[int] = None):
+        self.default_limit = default_limit or settings.max_concurrent_runs
+        self.max_queued_per_project = max_queued_per_project or settings.max_queued_runs_per_project
+        self._queues: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self._running: Dict[str, ScheduledRun] = {}  # project_id -> run
+        self._runs: Dict[str, ScheduledRun] = {}  # request_id -> run (queued or running)
+        self._active_per_cli: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        self._broadcasts: Set["asyncio.Future"] = set()  # queue updates sent from done callbacks
+
+    def limit_for(self, cli_type: str) -> int:
+        """Concurrent run limit for a CLI type (MAX_CONCURRENT_RUNS_<CLI> overrides the default)"""
+        if cli_type not in self._limits:
+            override = os.getenv(f"MAX_CONCURRENT_RUNS_{cli_type.upper()}")
+            self._limits[cli_type] = max(1, int(override)) if override else max(1, self.default_limit)
+        return self._limits[cli_type]
+
+    def is_busy(self, project_id: str) -> bool:
+        """Whether the project has a running or queued run"""
+        return project_id in self._running or bool(self._queues.get(project_id))
+
+    def check_admission(self, project_id: str, reject_if_busy: bool = False) -> None:
+        """Raise SchedulerError if a new run for the project would be rejected"""
+        if reject_if_busy and self.is_busy(project_id):
+            raise SchedulerError("Project already has a run in progress", 409)
+        if len(self._queues.get(project_id, [])) >= self.max_queued_per_project:
+            raise SchedulerError(
+                f"Too many queued runs for this project (limit {self.max_queued_per_project})", 429
+            )
+
+    async def submit(self, run: ScheduledRun, reject_if_busy: bool = False) -> int:
+        """Queue a run and start it as soon as a slot is free. Returns its queue position."""
+        self.check_admission(run.project_id, reject_if_busy)
+
+        queue = self._queues.setdefault(run.project_id, [])
+        heapq.heappush(queue, run.heap_entry)
+        self._runs[run.request_id] = run
+
+        started = self._pump()
+        position = self.queue_position(run.request_id)
+        ui.info(
+            f"Request {run.request_id[:8]}... scheduled ({run.cli_type}, priority {run.priority}, position {position})",
+            "Scheduler"
+        )
+        await self._broadcast_queues({run.project_id, *started})
+        return position
+
+    async def cancel(self, request_id: str) -> Optional[str]:
+        """
+        Cancel a queued or running run.
+        Returns "queued" or "running" depending on where the run was, or None if unknown.
+        """
+        run = self._runs.get(request_id)
+        if not run:
+            return None
+
+        if run.task is not None:
+            run.task.cancel()
+            if run.executing:
+                return "running"
+            # Cancelled before its first step: the runner never runs (nor finalizes the request),
+            # so report it as queued; the task's done callback frees its slots
+            return "queued"
+
+        queue = self._queues.get(run.project_id, [])
+        queue[:] = [entry for entry in queue if entry[2] is not run]
+        heapq.heapify(queue)
+        if not queue:
+            self._queues.pop(run.project_id, None)
+        self._runs.pop(request_id, None)
+
+        await self._broadcast_queues({run.project_id})
+        return "queued"
+
+    def queue_position(self, request_id: str) -> Optional[int]:
+        """0 when running, 1-based position when queued, None when unknown"""
+        run = self._runs.get(request_id)
+        if not run:
+            return None
+        if run.task is not None:
+            return 0
+        ordered = sorted(self._queues.get(run.project_id, []))
+        for index, entry in enumerate(ordered):
+            if entry[2] is run:
+                return index + 1
+        return None
+
+    def snapshot(self, project_id: str) -> Dict[str, Any]:
+        """Serializable view of a project's queue"""
+        running = self._running.get(project_id)
+        queued = [entry[2] for entry in sorted(self._queues.get(project_id, []))]
+        return {
+            "project_id": project_id,
+            "running": {
+                "request_id": running.request_id,
+                "request_type": running.request_type,
+                "cli_type": running.cli_type,
+                "started_at": running.started_at.isoformat() if running.started_at else None
+            } if running else None,
+            "queued": [
+                {
+                    "request_id": run.request_id,
+                    "request_type": run.request_type,
+                    "cli_type": run.cli_type,
+                    "priority": run.priority,
+                    "position": index + 1,
+                    "enqueued_at": run.enqueued_at.isoformat()
+                }
+                for index, run in enumerate(queued)
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Global scheduler state (active runs per CLI and queue depth)"""
+        return {
+            "active_per_cli": dict(self._active_per_cli),
+            "limits": {cli: self.limit_for(cli) for cli in self._active_per_cli},
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "running": len(self._running)
+        }
+
+    def _pump(self) -> List[str]:
+        """Start every run that has a free project and CLI slot. Returns project ids started."""
+        started = []
+        for project_id in list(self._queues.keys()):
+            if project_id in self._running:
+                continue
+            queue = self._queues[project_id]
+            if not queue:
+                self._queues.pop(project_id, None)
+                continue
+
+            run = queue[0][2]
+            if self._active_per_cli.get(run.cli_type, 0) >= self.limit_for(run.cli_type):
+                continue
+
+            heapq.heappop(queue)
+            if queue:
+                # Round-robin: a project that just got a slot goes to the back
+                self._queues.move_to_end(project_id)
+            else:
+                self._queues.pop(project_id, None)
+
+            self._start(run)
+            started.append(project_id)
+        return started
+
+    def _start(self, run: ScheduledRun) -> None:
+        run.started_at = datetime.utcnow()
+        tracer.record(
+            run.request_id, "scheduler.queue", run.enqueued_ts, time.time(),
+            cli=run.cli_type, priority=run.priority
+        )
+        self._running[run.project_id] = run
+        self._active_per_cli[run.cli_type] = self._active_per_cli.get(run.cli_type, 0) + 1
+        run.task = asyncio.create_task(self._execute(run))
+        # A done callback rather than a finally in _execute: a task cancelled before it first runs
+        # never enters its coroutine, and its slots would otherwise stay taken
+        run.task.add_done_callback(lambda _: self._finish(run))
+
+    async def _execute(self, run: ScheduledRun) -> None:
+        run.executing = True
+        try:
+            await run.runner()
+        except asyncio.CancelledError:
+            ui.warning(f"Request {run.request_id[:8]}... cancelled", "Scheduler")
+        except Exception as e:
+            ui.error(f"Request {run.request_id[:8]}... failed in scheduler: {e}", "Scheduler")
+
+    def _finish(self, run: ScheduledRun) -> None:
+        """Release a finished (or cancelled) run's slots and start what was waiting for them"""
+        if run.task is not None and run.task.cancelled():
+            ui.warning(f"Request {run.request_id[:8]}... cancelled before it started", "Scheduler")
+        if self._running.get(run.project_id) is run:
+            self._running.pop(run.project_id, None)
+        self._runs.pop(run.request_id, None)
+        self._active_per_cli[run.cli_type] = max(0, self._active_per_cli.get(run.cli_type, 1) - 1)
+
+        # Let projects that have been waiting go before this project's next run
+        if run.project_id in self._queues:
+            self._queues.move_to_end(run.project_id)
+        started = self._pump()
+        broadcast = asyncio.ensure_future(self._broadcast_queues({run.project_id, *started}))
+        self._broadcasts.add(broadcast)
+        broadcast.add_done_callback(self._broadcast_done)
+
+    def _broadcast_done(self, task: "asyncio.Future") -> None:
+        self._broadcasts.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            ui.warning(f"Queue broadcast failed: {task.exception()}", "Scheduler")
+
+    async def _broadcast_queues(self, project_ids) -> None:
+        for project_id in project_ids:
+            await ws_manager.broadcast_to_project(project_id, {
+                "type": "queue_update",
+                "data": self.snapshot(project_id),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+
+def recover_interrupted_requests(db: Session) -> int:
+    """
+    Mark UserRequest rows left pending/running by a previous process as failed.
+    The in-memory queue does not survive a restart, so these runs can never complete.
+    """
+    interrupted = db.query(UserRequest).filter(UserRequest.is_completed == False).all()
+    for user_request in interrupted:
+        user_request.is_completed = True
+        user_request.is_successful = False
+        user_request.completed_at = datetime.utcnow()
+        user_request.error_message = "Interrupted by server restart"
+    if interrupted:
+        db.commit()
+        ui.warning(f"Marked {len(interrupted)} interrupted request(s) as failed", "Scheduler")
+    return len(interrupted)
+
+
+# Global scheduler instance
+scheduler = ExecutionScheduler()
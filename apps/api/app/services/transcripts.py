@@ -0,0 +1,323 @@
+"""
+Transcript archival
+
+Messages of sessions that finished (completed, failed or cancelled) more than
+MESSAGE_ARCHIVE_AFTER_DAYS ago are moved out of the messages table into one gzip-compressed
+JSONL file per session, referenced by Session.transcript_path, so the hot table (and the
+SQLite working set) only holds recent history. User instruction messages stay in the table:
+they carry no session id and user_requests rows point at them.
+
+Archived history stays readable: recent_messages() returns the newest archived records of a
+project in the same shape as stored rows, and GET /messages merges them with the hot rows.
+Parsed transcripts are cached by path and mtime.
+"""
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.terminal_ui import ui
+from app.models.message_events import MessageEvent
+from app.models.messages import Message
+from app.models.sessions import Session as ChatSession
+from app.models.user_requests import UserRequest
+
+
+TRANSCRIPT_FORMAT = "jsonl.gz"
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Ids per IN (...) clause, below SQLite's bound-parameter limit
+ID_CHUNK = 500
+
+
+def _chunks(ids: List[str]):
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+
+def message_record(message: Message) -> Dict[str, Any]:
+    """JSON-serializable form of a message row (the transcript line format)"""
+    return {
+        "id": message.id,
+        "project_id": message.project_id,
+        "role": message.role,
+        "message_type": message.message_type,
+        "content": message.content,
+        "metadata_json": message.metadata_json,
+        "parent_message_id": message.parent_message_id,
+        "session_id": message.session_id,
+        "conversation_id": message.conversation_id,
+        "duration_ms": message.duration_ms,
+        "token_count": message.token_count,
+        "cost_usd": float(message.cost_usd) if message.cost_usd is not None else None,
+        "commit_sha": message.commit_sha,
+        "cli_source": message.cli_source,
+        "created_at": message.created_at.isoformat()
+    }
+
+
+def _write_transcript(path: Path, records: List[Dict[str, Any]]) -> None:
+    """Write records as gzip JSONL to a temp file next to path, then rename it over path"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+                f.write(b"\n")
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class TranscriptArchiver:
+    """Moves old session messages into transcript files and reads them back"""
+
+    def __init__(self, root: str, max_age_days: float, interval_seconds: float, cache_size: int = 32):
+        self.root = Path(root)
+        self.max_age_days = max_age_days
+        self.interval_seconds = interval_seconds
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.archived_sessions = 0
+        self.archived_messages = 0
+
+    def path_for(self, project_id: str, session_id: str) -> Path:
+        return self.root / project_id / f"{session_id}.{TRANSCRIPT_FORMAT}"
+
+    # Reading
+
+    def read(self, path: str) -> List[Dict[str, Any]]:
+        """Records of a transcript file, oldest first"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(path)
+                return cached[1]
+
+        with gzip.open(path, "rb") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        with self._lock:
+            self._cache[path] = (mtime, records)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return records
+
+    async def recent_messages(self, db: Session, project_id: str, limit: int,
+                              conversation_id: Optional[str] = None,
+                              cli_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Up to the newest `limit` archived records of a project, oldest first
+
+        Transcript files are read (and decompressed on a cache miss) in a worker thread.
+        """
+        paths = [
+            path for (path,) in
+            db.query(ChatSession.transcript_path)
+            .filter(ChatSession.project_id == project_id, ChatSession.transcript_path.isnot(None))
+            .order_by(func.coalesce(ChatSession.completed_at, ChatSession.started_at).desc())
+        ]
+        if not paths:
+            return []
+        return await asyncio.to_thread(self._recent_records, paths, limit, conversation_id, cli_filter)
+
+    def _recent_records(self, paths: List[str], limit: int, conversation_id: Optional[str],
+                        cli_filter: Optional[str]) -> List[Dict[str, Any]]:
+        collected: List[Dict[str, Any]] = []
+        for path in paths:
+            records = [
+                record for record in self.read(path)
+                if (conversation_id is None or record.get("conversation_id") == conversation_id)
+                and (cli_filter is None or record.get("cli_source") == cli_filter)
+            ]
+            collected.extend(records)
+            if len(collected) >= limit:
+                break
+        collected.sort(key=lambda record: record["created_at"])
+        return collected[-limit:] if limit else []
+
+    def may_hold_newer(self, created_at: datetime) -> bool:
+        """Whether archived records can be newer than a message created at created_at
+
+        Only sessions finished more than max_age_days ago are archived, so a newer message is
+        newer than anything archived.
+        """
+        if self.max_age_days <= 0:
+            return True
+        return created_at < datetime.utcnow() - timedelta(days=self.max_age_days)
+
+    # Archiving
+
+    def archive_session(self, db: Session, session: ChatSession) -> int:
+        """Move a session's messages to its transcript file; returns the number moved"""
+        requested = db.query(UserRequest.user_message_id).filter(UserRequest.session_id == session.id)
+        messages = (
+            db.query(Message)
+            .filter(Message.session_id == session.id, Message.id.notin_(requested))
+            .order_by(Message.created_at)
+            .all()
+        )
+        if not messages:
+            return 0
+
+        ids = [message.id for message in messages]
+        events = {
+            event.message_id: event
+            for chunk in _chunks(ids)
+            for event in db.query(MessageEvent).filter(MessageEvent.message_id.in_(chunk))
+        }
+        records = []
+        for message in messages:
+            record = message_record(message)
+            event = events.get(message.id)
+            if event is not None:
+                record["raw_event"] = json.loads(zlib.decompress(event.payload).decode("utf-8"))
+            records.append(record)
+
+        path = self.path_for(session.project_id, session.id)
+        if session.transcript_path and os.path.exists(session.transcript_path):
+            # Messages added after an earlier archival pass join the existing transcript
+            seen = set(ids)
+            previous = [record for record in self.read(session.transcript_path) if record["id"] not in seen]
+            records = sorted(previous + records, key=lambda record: record["created_at"])
+            path = Path(session.transcript_path)
+        _write_transcript(path, records)
+
+        # The file is durable before anything is deleted from the table
+        try:
+            for chunk in _chunks(ids):
+                db.query(Message).filter(Message.id.in_(chunk)).delete(synchronize_session=False)
+            session.transcript_path = str(path)
+            session.transcript_format = TRANSCRIPT_FORMAT
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        for message in messages:
+            db.expunge(message)
+        return len(ids)
+
+    def archive_old_sessions(self, db: Session, max_sessions: int = 100) -> Dict[str, int]:
+        """Archive finished sessions older than max_age_days that still have messages in the table"""
+        if self.max_age_days <= 0:
+            return {"sessions": 0, "messages": 0}
+        cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+        has_messages = db.query(Message.session_id).filter(Message.session_id.isnot(None)).distinct()
+        candidates = (
+            db.query(ChatSession)
+            .filter(
+                ChatSession.status.in_(FINISHED_STATUSES),
+                func.coalesce(ChatSession.completed_at, ChatSession.started_at) < cutoff,
+                ChatSession.id.in_(has_messages)
+            )
+            .limit(max_sessions)
+            .all()
+        )
+        stats = {"sessions": 0, "messages": 0}
+        for session in candidates:
+            try:
+                moved = self.archive_session(db, session)
+            except Exception as e:
+                ui.error(f"Failed to archive session {session.id}: {e}", "Transcripts")
+                continue
+            if moved:
+                stats["sessions"] += 1
+                stats["messages"] += moved
+        self.archived_sessions += stats["sessions"]
+        self.archived_messages += stats["messages"]
+        if stats["sessions"]:
+            ui.info(f"Archived {stats['messages']} messages from {stats['sessions']} sessions", "Transcripts")
+        return stats
+
+    # Deletion
+
+    def delete_messages(self, db: Session, project_id: str, conversation_id: Optional[str] = None) -> int:
+        """Remove archived messages of a project (or of one conversation); returns how many"""
+        deleted = 0
+        sessions = db.query(ChatSession).filter(
+            ChatSession.project_id == project_id, ChatSession.transcript_path.isnot(None)
+        ).all()
+        for session in sessions:
+            records = self.read(session.transcript_path)
+            kept = [] if conversation_id is None else [
+                record for record in records if record.get("conversation_id") != conversation_id
+            ]
+            if len(kept) == len(records):
+                continue
+            deleted += len(records) - len(kept)
+            if kept:
+                _write_transcript(Path(session.transcript_path), kept)
+            else:
+                try:
+                    os.unlink(session.transcript_path)
+                except FileNotFoundError:
+                    pass
+                session.transcript_path = None
+        db.commit()
+        return deleted
+
+    def delete_project(self, project_id: str) -> None:
+        shutil.rmtree(self.root / project_id, ignore_errors=True)
+        prefix = str(self.root / project_id) + os.sep
+        with self._lock:
+            for path in [path for path in self._cache if path.startswith(prefix)]:
+                del self._cache[path]
+
+    # Background job
+
+    def start(self) -> None:
+        if self.max_age_days > 0 and self.interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        from app.db.session import SessionLocal
+
+        def archive_pass() -> Dict[str, int]:
+            db = SessionLocal()
+            try:
+                return self.archive_old_sessions(db)
+            finally:
+                db.close()
+
+        while True:
+            try:
+                await asyncio.to_thread(archive_pass)
+            except Exception as e:
+                ui.error(f"Transcript archival failed: {e}", "Transcripts")
+            await asyncio.sleep(self.interval_seconds)
+
+
+transcripts = TranscriptArchiver(
+    root=settings.transcripts_root,
+    max_age_days=settings.message_archive_after_days,
+    interval_seconds=settings.message_archive_interval_seconds
+)
@@ -1,25 +1,56 @@
 """
 Vercel integration service for creating projects and deployments
 """
-import aiohttp
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+import httpx
+
+from app.core.config import settings
+from app.core.http_clients import http_clients
+from app.core.websocket.manager import manager as ws_manager
+
 logger = logging.getLogger(__name__)
 
-VERCEL_API_BASE = "https://api.vercel.com"
+VERCEL_API_BASE = settings.vercel_api_url.rstrip("/")
 
 
 class VercelAPIError(Exception):
     """Custom exception for Vercel API errors"""
-    def __init__(self, message: str, status_code: Optional[int] = None):
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 rate_limit: Optional[Dict[str, Any]] = None):
         self.message = message
         self.status_code = status_code
+        self.rate_limit = rate_limit
         super().__init__(self.message)
 
 
+def _rate_limit(response: httpx.Response) -> Dict[str, Any]:
+    """Vercel's rate-limit headers: calls left in the window, window reset (epoch seconds), Retry-After"""
+    def number(name: str, cast):
+        try:
+            value = response.headers.get(name)
+            return cast(value) if value is not None else None
+        except ValueError:
+            return None
+    return {
+        "remaining": number("x-ratelimit-remaining", int),
+        "reset": number("x-ratelimit-reset", float),
+        "retry_after": number("retry-after", float),
+    }
+
+
+def _error_message(response: httpx.Response) -> str:
+    """Vercel's error.message from a failed response, or the raw body"""
+    try:
+        return response.json().get("error", {}).get("message", "Unknown error")
+    except ValueError:
+        return response.text
+
+
 class VercelService:
     """Service class for Vercel API integration"""
     
@@ -33,25 +64,23 @@ class VercelService:
     async def check_token_validity(self) -> Dict[str, Any]:
         """Check if the Vercel token is valid and get user info"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{VERCEL_API_BASE}/v2/user",
-                    headers=self.headers
-                ) as response:
-                    if response.status == 200:
-                        user_data = await response.json()
-                        return {
-                            "valid": True,
-                            "user_id": user_data.get("id"),
-                            "username": user_data.get("username"),
-                            "name": user_data.get("name"),
-                            "email": user_data.get("email")
-                        }
-                    elif response.status == 401:
-                        return {"valid": False, "error": "Invalid Vercel token"}
-                    else:
-                        error_text = await response.text()
-                        return {"valid": False, "error": f"API error: {error_text}"}
+            response = await http_clients.get(
+                f"{VERCEL_API_BASE}/v2/user",
+                headers=self.headers
+            )
+            if response.status_code == 200:
+                user_data = response.json()
+                return {
+                    "valid": True,
+                    "user_id": user_data.get("id"),
+                    "username": user_data.get("username"),
+                    "name": user_data.get("name"),
+                    "email": user_data.get("email")
+                }
+            elif response.status_code == 401:
+                return {"valid": False, "error": "Invalid Vercel token"}
+            else:
+                return {"valid": False, "error": f"API error: {response.text}"}
         except Exception as e:
             logger.error(f"Error checking Vercel token validity: {e}")
             return {"valid": False, "error": str(e)}
@@ -81,32 +110,31 @@ class VercelService:
             if team_id:
                 url += f"?teamId={team_id}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_data = await response.json()
-                    
-                    if response.status == 200 or response.status == 201:
-                        project = response_data
-                        return {
-                            "success": True,
-                            "project_id": project.get("id"),
-                            "project_name": project.get("name"),
-                            "framework": project.get("framework"),
-                            "git_repository": project.get("link", {}).get("repo"),
-                            "created_at": project.get("createdAt"),
-                            "project_url": f"https://vercel.com/{project.get('accountId')}/{project.get('name')}",
-                            "raw_response": project
-                        }
-                    else:
-                        error_msg = response_data.get("error", {}).get("message", "Unknown error")
-                        logger.error(f"Failed to create Vercel project: {error_msg}")
-                        raise VercelAPIError(f"Failed to create project: {error_msg}", response.status)
-                        
-        except aiohttp.ClientError as e:
+            response = await http_clients.post(
+                url,
+                headers=self.headers,
+                json=payload
+            )
+            response_data = response.json()
+            
+            if response.status_code == 200 or response.status_code == 201:
+                project = response_data
+                return {
+                    "success": True,
+                    "project_id": project.get("id"),
+                    "project_name": project.get("name"),
+                    "framework": project.get("framework"),
+                    "git_repository": project.get("link", {}).get("repo"),
+                    "created_at": project.get("createdAt"),
+                    "project_url": f"https://vercel.com/{project.get('accountId')}/{project.get('name')}",
+                    "raw_response": project
+                }
+            else:
+                error_msg = response_data.get("error", {}).get("message", "Unknown error")
+                logger.error(f"Failed to create Vercel project: {error_msg}")
+                raise VercelAPIError(f"Failed to create project: {error_msg}", response.status_code)
+                
+        except httpx.HTTPError as e:
             logger.error(f"Network error while creating Vercel project: {e}")
             raise VercelAPIError(f"Network error: {str(e)}")
         except Exception as e:
@@ -116,20 +144,14 @@ class VercelService:
     async def get_project(self, project_id: str) -> Dict[str, Any]:
         """Get project information by ID"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{VERCEL_API_BASE}/v9/projects/{project_id}",
-                    headers=self.headers
-                ) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        try:
-                            error_data = await response.json()
-                            error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                        except:
-                            error_msg = await response.text()
-                        raise VercelAPIError(f"Failed to get project: {error_msg}", response.status)
+            response = await http_clients.get(
+                f"{VERCEL_API_BASE}/v9/projects/{project_id}",
+                headers=self.headers
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                raise VercelAPIError(f"Failed to get project: {_error_message(response)}", response.status_code)
         except VercelAPIError:
             raise
         except Exception as e:
@@ -159,42 +181,41 @@ class VercelService:
             }
             
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{VERCEL_API_BASE}/v13/deployments",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response_data = await response.json()
-                    
-                    if response.status != 200 and response.status != 201:
-                        logger.error(f"Vercel API error: {response_data}")
-                    
-                    if response.status == 200 or response.status == 201:
-                        deployment = response_data
-                        
-                        # Extract best public URL
-                        deployment_url = deployment.get("url")
-                        # Try to get public alias if available
-                        aliases = deployment.get("automaticAliases", [])
-                        if aliases:
-                            # Use the first automatic alias which is usually more public
-                            deployment_url = aliases[0]
-                        
-                        return {
-                            "success": True,
-                            "deployment_id": deployment.get("id"),
-                            "deployment_url": deployment_url,
-                            "status": deployment.get("readyState"),  # QUEUED, BUILDING, READY, ERROR
-                            "ready": deployment.get("readyState") == "READY",
-                            "created_at": deployment.get("createdAt"),
-                            "raw_response": deployment
-                        }
-                    else:
-                        error_msg = response_data.get("error", {}).get("message", "Unknown error")
-                        logger.error(f"Failed to create Vercel deployment: {error_msg}")
-                        logger.error(f"Full error response: {response_data}")
-                        raise VercelAPIError(f"Failed to create deployment: {error_msg}", response.status)
+            response = await http_clients.post(
+                f"{VERCEL_API_BASE}/v13/deployments",
+                headers=self.headers,
+                json=payload
+            )
+            response_data = response.json()
+            
+            if response.status_code != 200 and response.status_code != 201:
+                logger.error(f"Vercel API error: {response_data}")
+            
+            if response.status_code == 200 or response.status_code == 201:
+                deployment = response_data
+                
+                # Extract best public URL
+                deployment_url = deployment.get("url")
+                # Try to get public alias if available
+                aliases = deployment.get("automaticAliases", [])
+                if aliases:
+                    # Use the first automatic alias which is usually more public
+                    deployment_url = aliases[0]
+                
+                return {
+                    "success": True,
+                    "deployment_id": deployment.get("id"),
+                    "deployment_url": deployment_url,
+                    "status": deployment.get("readyState"),  # QUEUED, BUILDING, READY, ERROR
+                    "ready": deployment.get("readyState") == "READY",
+                    "created_at": deployment.get("createdAt"),
+                    "raw_response": deployment
+                }
+            else:
+                error_msg = response_data.get("error", {}).get("message", "Unknown error")
+                logger.error(f"Failed to create Vercel deployment: {error_msg}")
+                logger.error(f"Full error response: {response_data}")
+                raise VercelAPIError(f"Failed to create deployment: {error_msg}", response.status_code)
                         
         except Exception as e:
             logger.error(f"Error creating Vercel deployment: {e}")
@@ -203,34 +224,34 @@ class VercelService:
     async def get_deployment_status(self, deployment_id: str) -> Dict[str, Any]:
         """Get deployment status by ID"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{VERCEL_API_BASE}/v13/deployments/{deployment_id}",
-                    headers=self.headers
-                ) as response:
-                    if response.status == 200:
-                        deployment = await response.json()
-                        
-                        # Use aliasFinal, fallback to alias[0], then url
-                        final_url = (deployment.get("aliasFinal") or 
-                                   (deployment.get("alias")[0] if deployment.get("alias") else None) or 
-                                   deployment.get("url"))
-                        
-                        return {
-                            "id": deployment.get("id"),
-                            "url": final_url,  # Use aliasFinal instead of url
-                            "status": deployment.get("readyState"),
-                            "created_at": deployment.get("createdAt"),
-                            "ready": deployment.get("ready"),
-                            "raw_response": deployment
-                        }
-                    else:
-                        try:
-                            error_data = await response.json()
-                            error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                        except:
-                            error_msg = await response.text()
-                        raise VercelAPIError(f"Failed to get deployment: {error_msg}", response.status)
+            response = await http_clients.get(
+                f"{VERCEL_API_BASE}/v13/deployments/{deployment_id}",
+                headers=self.headers
+            )
+            if response.status_code == 200:
+                deployment = response.json()
+                
+                # Use aliasFinal, fallback to alias[0], then url
+                final_url = (deployment.get("aliasFinal") or 
+                           (deployment.get("alias")[0] if deployment.get("alias") else None) or 
+                           deployment.get("url"))
+                
+                return {
+                    "id": deployment.get("id"),
+                    "url": final_url,  # Use aliasFinal instead of url
+                    "status": deployment.get("readyState"),
+                    "created_at": deployment.get("createdAt"),
+                    "ready": deployment.get("ready"),
+                    "raw_response": deployment,
+                    "rate_limit": _rate_limit(response)
+                }
+            else:
+                raise VercelAPIError(
+                    f"Failed to get deployment: {_error_message(response)}", response.status_code,
+                    rate_limit=_rate_limit(response)
+                )
+        except VercelAPIError:
+            raise
         except Exception as e:
             logger.error(f"Error getting Vercel deployment: {e}")
             raise VercelAPIError(f"Error getting deployment: {str(e)}")
@@ -242,146 +263,233 @@ async def check_project_availability(access_token: str, project_name: str) -> Di
     
     try:
         # Get list of projects and check if name exists
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{VERCEL_API_BASE}/v10/projects",
-                headers=service.headers
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    projects = data.get("projects", [])
-                    
-                    # Check if project name already exists
-                    for project in projects:
-                        if project.get("name") == project_name:
-                            return {"available": False, "exists": True}
-                    
-                    # Name is available
-                    return {"available": True, "exists": False}
-                else:
-                    try:
-                        error_data = await response.json()
-                        error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                    except:
-                        error_msg = await response.text()
-                    
-                    if response.status == 401:
-                        return {"available": False, "error": "Invalid Vercel token"}
-                    else:
-                        return {"available": False, "error": f"API error: {error_msg}"}
-                        
+        response = await http_clients.get(
+            f"{VERCEL_API_BASE}/v10/projects",
+            headers=service.headers
+        )
+        if response.status_code == 200:
+            data = response.json()
+            projects = data.get("projects", [])
+            
+            # Check if project name already exists
+            for project in projects:
+                if project.get("name") == project_name:
+                    return {"available": False, "exists": True}
+            
+            # Name is available
+            return {"available": True, "exists": False}
+        elif response.status_code == 401:
+            return {"available": False, "error": "Invalid Vercel token"}
+        else:
+            return {"available": False, "error": f"API error: {_error_message(response)}"}
+                
     except Exception as e:
         logger.error(f"Error checking Vercel project availability: {e}")
         return {"available": False, "error": str(e)}
 
 
-# 활성 배포 모니터링 태스크들을 추적하는 딕셔너리
-active_monitoring_tasks: Dict[str, asyncio.Task] = {}
+# Poll interval per deployment phase: (first interval, longest interval) in seconds. A deployment
+# is polled quickly when it enters a phase and progressively less often while it stays there.
+PHASE_INTERVALS = {
+    "QUEUED": (5.0, 20.0),
+    "INITIALIZING": (3.0, 10.0),
+    "BUILDING": (3.0, 10.0),
+}
+DEFAULT_INTERVAL = (3.0, 10.0)
+BACKOFF_FACTOR = 1.5
+TERMINAL_STATES = frozenset({"READY", "ERROR", "CANCELED"})
+ERROR_RETRY_SECONDS = 10.0
+MAX_WATCH_SECONDS = 15 * 60
+# Calls of a token's rate-limit window left for user-initiated requests
+RATE_LIMIT_RESERVE = 2
 
 
-async def start_deployment_monitoring(
-    project_id: str, 
-    deployment_id: str, 
-    vercel_token: str,
-    db_session_factory
-) -> None:
-    """배포 모니터링 백그라운드 태스크 시작"""
-    
-    # 기존 모니터링이 있으면 취소
-    if project_id in active_monitoring_tasks:
-        active_monitoring_tasks[project_id].cancel()
-    
-    # 새 모니터링 태스크 시작
-    task = asyncio.create_task(
-        monitor_deployment_status(project_id, deployment_id, vercel_token, db_session_factory)
-    )
-    active_monitoring_tasks[project_id] = task
-    
-    logger.info(f"🚀 Started deployment monitoring for project {project_id}, deployment {deployment_id}")
+class _Watch:
+    """One deployment being followed"""
+
+    def __init__(self, project_id: str, deployment_id: str, token: str, db_session_factory):
+        self.project_id = project_id
+        self.deployment_id = deployment_id
+        self.token = token
+        self.db_session_factory = db_session_factory
+        self.status: Optional[str] = None
+        self.url: Optional[str] = None
+        self.interval = DEFAULT_INTERVAL[0]
+        self.started = time.monotonic()
+        self.next_poll = self.started
+        self.errors = 0
+        self.last_checked_at: Optional[str] = None
+
+
+class DeploymentWatcher:
+    """Follows every active Vercel deployment from a single task
+
+    Each deployment is polled on its own phase-dependent schedule; polls for a token whose
+    rate limit is nearly used up wait for the window to reset. The DB and the project's
+    WebSocket are only updated when a deployment's status or URL changes.
+    """
+
+    def __init__(self):
+        self._watches: Dict[str, _Watch] = {}
+        self._not_before: Dict[str, float] = {}  # token -> monotonic time its rate limit resets
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.api_calls = 0
+        self.db_writes = 0
+
+    def watch(self, project_id: str, deployment_id: str, token: str, db_session_factory) -> None:
+        """Follow a deployment, replacing any deployment already watched for the project"""
+        self._watches[project_id] = _Watch(project_id, deployment_id, token, db_session_factory)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def unwatch(self, project_id: str) -> bool:
+        removed = self._watches.pop(project_id, None) is not None
+        self._wakeup.set()
+        return removed
+
+    def projects(self) -> List[str]:
+        return list(self._watches)
+
+    def last_checked_at(self, project_id: str) -> Optional[str]:
+        watch = self._watches.get(project_id)
+        return watch.last_checked_at if watch else None
 
+    def stats(self) -> Dict[str, Any]:
+        return {"active": len(self._watches), "api_calls": self.api_calls, "db_writes": self.db_writes}
 
-async def monitor_deployment_status(
+    async def aclose(self) -> None:
+        self._watches.clear()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _due_at(self, watch: _Watch) -> float:
+        return max(watch.next_poll, self._not_before.get(watch.token, 0.0))
+
+    async def _run(self) -> None:
+        try:
+            while self._watches:
+                now = time.monotonic()
+                due = [watch for watch in self._watches.values() if self._due_at(watch) <= now]
+                if due:
+                    await asyncio.gather(*(self._poll(watch) for watch in due))
+                    continue
+                self._wakeup.clear()
+                wait = min(self._due_at(watch) for watch in self._watches.values()) - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logger.info("Deployment watcher cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in deployment watcher: {e}")
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    def _finish(self, watch: _Watch) -> None:
+        # The project may have started a newer deployment in the meantime
+        if self._watches.get(watch.project_id) is watch:
+            del self._watches[watch.project_id]
+
+    async def _poll(self, watch: _Watch) -> None:
+        if time.monotonic() - watch.started > MAX_WATCH_SECONDS:
+            logger.warning(f"⏰ Deployment {watch.deployment_id} monitoring timed out after {MAX_WATCH_SECONDS // 60} minutes")
+            self._finish(watch)
+            return
+
+        self.api_calls += 1
+        try:
+            status_data = await VercelService(watch.token).get_deployment_status(watch.deployment_id)
+        except VercelAPIError as e:
+            watch.errors += 1
+            self._apply_rate_limit(watch.token, e.rate_limit)
+            delay = min(ERROR_RETRY_SECONDS * watch.errors, 60.0)
+            logger.error(f"❌ Error monitoring deployment {watch.deployment_id}: {e.message} (retry in {delay:.0f}s)")
+            watch.next_poll = time.monotonic() + delay
+            return
+
+        watch.errors = 0
+        watch.last_checked_at = datetime.utcnow().isoformat() + "Z"
+        self._apply_rate_limit(watch.token, status_data.get("rate_limit"))
+
+        status, url = status_data["status"], status_data["url"]
+        if status != watch.status:
+            watch.interval = PHASE_INTERVALS.get(status, DEFAULT_INTERVAL)[0]
+        else:
+            watch.interval = min(watch.interval * BACKOFF_FACTOR, PHASE_INTERVALS.get(status, DEFAULT_INTERVAL)[1])
+
+        if (status, url) != (watch.status, watch.url):
+            logger.info(f"🔍 Deployment {watch.deployment_id} status: {watch.status} -> {status}")
+            watch.status, watch.url = status, url
+            await self._publish(watch, status_data)
+
+        if status in TERMINAL_STATES:
+            logger.info(f"✅ Deployment {watch.deployment_id} finished with status: {status}")
+            self._finish(watch)
+        else:
+            watch.next_poll = time.monotonic() + watch.interval
+
+    def _apply_rate_limit(self, token: str, rate_limit: Optional[Dict[str, Any]]) -> None:
+        if not rate_limit:
+            return
+        wait = rate_limit.get("retry_after")
+        remaining, reset = rate_limit.get("remaining"), rate_limit.get("reset")
+        if wait is None and remaining is not None and remaining <= RATE_LIMIT_RESERVE and reset:
+            wait = reset - time.time()
+        if wait and wait > 0:
+            logger.warning(f"Vercel rate limit nearly exhausted; pausing deployment polls for {wait:.0f}s")
+            self._not_before[token] = time.monotonic() + wait
+
+    async def _publish(self, watch: _Watch, status_data: Dict[str, Any]) -> None:
+        self.db_writes += 1
+        service_data = await update_deployment_status_in_db(watch.project_id, status_data, watch.db_session_factory)
+        try:
+            await ws_manager.send_message(watch.project_id, {
+                "type": "deployment_status",
+                "data": {
+                    "deployment_id": watch.deployment_id,
+                    "status": status_data["status"],
+                    "deployment_url": status_data["url"],
+                    "finished": status_data["status"] in TERMINAL_STATES,
+                    "last_deployment_url": (service_data or {}).get("deployment_url")
+                },
+                "timestamp": datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            logger.error(f"Deployment status broadcast failed: {e}")
+
+
+deployment_watcher = DeploymentWatcher()
+
+
+async def start_deployment_monitoring(
     project_id: str, 
     deployment_id: str, 
     vercel_token: str,
     db_session_factory
 ) -> None:
-    """3초마다 Vercel API 호출해서 배포 상태 모니터링"""
-    
-    vercel_service = VercelService(vercel_token)
-    start_time = datetime.utcnow()
-    max_duration_minutes = 15  # 15분 제한
-    
-    try:
-        while True:
-            try:
-                # 시간 제한 체크 (15분)
-                elapsed = (datetime.utcnow() - start_time).total_seconds() / 60
-                if elapsed > max_duration_minutes:
-                    logger.warning(f"⏰ Deployment {deployment_id} monitoring timed out after {max_duration_minutes} minutes")
-                    break
-                
-                # Vercel API에서 최신 상태 가져오기
-                status_data = await vercel_service.get_deployment_status(deployment_id)
-                
-                # 상태 변경 시에만 또는 READY/ERROR 시에만 로그
-                if status_data["status"] in ["READY", "ERROR"] or elapsed < 0.1:  # 처음 또는 완료 시에만
-                    logger.info(f"🔍 Checking deployment {deployment_id} status... (elapsed: {elapsed:.1f}min)")
-                    logger.info(f"🔍 Got status: {status_data['status']} for deployment {deployment_id}")
-                
-                # READY 상태일 때만 URL 정보 로그
-                if status_data["status"] == "READY":
-                    raw_response = status_data.get("raw_response", {})
-                    logger.info(f"🎉 READY response - aliasFinal: {raw_response.get('aliasFinal')}, alias: {raw_response.get('alias', [])[:2]}, url: {raw_response.get('url')}")
-                    logger.info(f"🎉 Final URL selected: {status_data['url']}")
-                
-                # DB 업데이트
-                await update_deployment_status_in_db(project_id, status_data, db_session_factory)
-                
-                # 완료 상태 체크 - ready 필드도 확인
-                is_ready = (status_data["status"] == "READY" or 
-                           status_data.get("ready") == True or
-                           status_data.get("readyState") == "READY")
-                is_error = status_data["status"] == "ERROR"
-                
-                if is_ready or is_error:
-                    logger.info(f"✅ Deployment {deployment_id} finished with status: {status_data['status']}")
-                    break
-                
-                # 3초 대기
-                await asyncio.sleep(3)
-                
-            except Exception as e:
-                logger.error(f"❌ Error monitoring deployment {deployment_id}: {e}")
-                import traceback
-                logger.error(f"❌ Full traceback: {traceback.format_exc()}")
-                # 에러 시 10초 대기 후 재시도
-                await asyncio.sleep(10)
-                
-    except asyncio.CancelledError:
-        logger.info(f"Deployment monitoring cancelled for project {project_id}")
-    except Exception as e:
-        logger.error(f"Unexpected error in deployment monitoring: {e}")
-    finally:
-        # 모니터링 완료 시 태스크 목록에서 제거
-        if project_id in active_monitoring_tasks:
-            del active_monitoring_tasks[project_id]
+    """배포 모니터링 시작 (공유 DeploymentWatcher에 등록)"""
+    deployment_watcher.watch(project_id, deployment_id, vercel_token, db_session_factory)
+    logger.info(f"🚀 Started deployment monitoring for project {project_id}, deployment {deployment_id}")
 
 
 async def update_deployment_status_in_db(
     project_id: str, 
     status_data: Dict[str, Any],
     db_session_factory
-) -> None:
-    """DB의 배포 상태 업데이트"""
+) -> Optional[Dict[str, Any]]:
+    """DB의 배포 상태 업데이트 (상태가 바뀐 경우에만 호출됨). Returns the saved service_data"""
     
     try:
-        # DB 세션 생성 (비동기 환경에서 새 세션 필요)
-        from sqlalchemy.orm import sessionmaker
         from app.models.project_services import ProjectServiceConnection
         
-        Session = db_session_factory
-        db = Session()
+        db = db_session_factory()
         
         try:
             # Vercel 연결 찾기
@@ -390,42 +498,36 @@ async def update_deployment_status_in_db(
                 ProjectServiceConnection.provider == "vercel"
             ).first()
             
-            if connection:
-                service_data = dict(connection.service_data) if connection.service_data else {}
-                
-                # current_deployment 정보 업데이트
-                service_data["current_deployment"] = {
-                    "deployment_id": status_data["id"],
-                    "status": status_data["status"],
-                    "deployment_url": status_data["url"],
-                    "last_checked_at": datetime.utcnow().isoformat() + "Z"
-                }
-                
-                # 배포 완료 시 deployment_url 메인에도 업데이트
-                if status_data["status"] == "READY":
-                    service_data["deployment_url"] = f"https://{status_data['url']}" if not str(status_data["url"]).startswith("http") else status_data["url"]
-                    service_data["last_deployment_at"] = datetime.utcnow().isoformat() + "Z"
-                    # 모니터링 완료 시 current_deployment 제거
-                    service_data["current_deployment"] = None
-                elif status_data["status"] == "ERROR":
-                    # 에러 시에도 current_deployment 제거
-                    service_data["current_deployment"] = None
-                
-                # 명시적으로 새 dict 할당
-                connection.service_data = service_data
-                db.commit()
-                db.refresh(connection)
-                
-                # 검증: 실제로 저장되었는지 확인
-                updated_data = connection.service_data or {}
-                if "current_deployment" in updated_data:
-                    if status_data["status"] == "READY":
-                        logger.info(f"✅ Successfully saved READY deployment to DB for project {project_id}")
-                        logger.info(f"📝 Final service_data keys: {list(updated_data.keys())}")
-                else:
-                    logger.error(f"❌ DB update verification failed for project {project_id}")
-            else:
+            if not connection:
                 logger.error(f"❌ No Vercel connection found for project {project_id}")
+                return None
+            
+            service_data = dict(connection.service_data) if connection.service_data else {}
+            
+            # current_deployment 정보 업데이트
+            service_data["current_deployment"] = {
+                "deployment_id": status_data["id"],
+                "status": status_data["status"],
+                "deployment_url": status_data["url"],
+                "last_checked_at": datetime.utcnow().isoformat() + "Z"
+            }
+            
+            # 배포 완료 시 deployment_url 메인에도 업데이트
+            if status_data["status"] == "READY":
+                service_data["deployment_url"] = f"https://{status_data['url']}" if not str(status_data["url"]).startswith("http") else status_data["url"]
+                service_data["last_deployment_at"] = datetime.utcnow().isoformat() + "Z"
+                # 모니터링 완료 시 current_deployment 제거
+                service_data["current_deployment"] = None
+            elif status_data["status"] in TERMINAL_STATES:
+                # 에러/취소 시에도 current_deployment 제거
+                service_data["current_deployment"] = None
+            
+            # 명시적으로 새 dict 할당
+            connection.service_data = service_data
+            db.commit()
+            if status_data["status"] == "READY":
+                logger.info(f"✅ Successfully saved READY deployment to DB for project {project_id}")
+            return service_data
                 
         finally:
             db.close()
@@ -434,16 +536,15 @@ async def update_deployment_status_in_db(
         logger.error(f"❌ Failed to update deployment status in DB: {e}")
         import traceback
         logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        return None
 
 
 def stop_deployment_monitoring(project_id: str) -> None:
     """특정 프로젝트의 배포 모니터링 중단"""
-    if project_id in active_monitoring_tasks:
-        active_monitoring_tasks[project_id].cancel()
-        del active_monitoring_tasks[project_id]
+    if deployment_watcher.unwatch(project_id):
         logger.info(f"Stopped deployment monitoring for project {project_id}")
 
 
 def get_active_monitoring_projects() -> list:
     """현재 모니터링 중인 프로젝트 목록 반환"""
-    return list(active_monitoring_tasks.keys())
\ No newline at end of file
+    return deployment_watcher.projects()
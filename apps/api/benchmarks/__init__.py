@@ -0,0 +1,4 @@
+"""
+Performance microbenchmarks for the API services
+Run from apps/api, e.g. `python -m benchmarks.sdk_dispatch`
+"""
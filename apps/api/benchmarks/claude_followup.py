@@ -0,0 +1,202 @@
+"""
+Claude follow-up latency benchmark
+
+Runs conversations of several turns through the unmodified ClaudeCodeCLI against
+benchmarks/fake_claude.py installed on PATH as `claude`, once with a fresh SDK client per
+instruction (pool disabled) and once with the warm client pool. Reports time to the first
+message and turn time for the first turn and for follow-ups, plus CLI processes started.
+
+The stand-in's startup/resume delays model the real CLI's process start and session resume;
+use --startup 0 --resume 0 to measure only the spawn and SDK handshake overhead.
+
+Also checks that a run cancelled while its client is still connecting leaves no client behind
+(exit status 1 otherwise).
+
+    python -m benchmarks.claude_followup [--conversations 5] [--turns 5] [--startup 1.0] [--resume 0.5]
+"""
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database and keep the console quiet
+WORK_DIR = tempfile.mkdtemp(prefix="claudable-followup-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'followup.db')}"
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+import argparse
+import asyncio
+import contextlib
+import io
+import shutil
+import stat
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+import app.models  # noqa: F401 registers all tables
+import app.services.cli.unified_manager as unified_manager
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.models.projects import Project
+from app.services.cli.client_pool import ClaudeClientPool
+from app.services.cli.session_cache import project_sessions
+from app.services.cli.unified_manager import ClaudeCodeCLI
+
+
+PROJECT_ID = "followup-project"
+
+
+def install_fake_claude(startup: float, resume: float, turn: float) -> None:
+    bin_dir = Path(WORK_DIR) / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    script = bin_dir / "claude"
+    fake_claude = Path(__file__).parent / "fake_claude.py"
+    script.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_claude}" "$@"\n')
+    script.chmod(script.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["FAKE_CLAUDE_STARTUP_SECONDS"] = str(startup)
+    os.environ["FAKE_CLAUDE_RESUME_SECONDS"] = str(resume)
+    os.environ["FAKE_CLAUDE_TURN_SECONDS"] = str(turn)
+
+
+def setup_database(project_path: str) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.get(Project, PROJECT_ID) is None:
+            db.add(Project(id=PROJECT_ID, name="Follow-up benchmark", repo_path=project_path))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def run_turn(cli: ClaudeCodeCLI, project_path: str, instruction: str) -> Dict[str, float]:
+    started = time.perf_counter()
+    first = None
+    async for _ in cli.execute_with_streaming(instruction, project_path, session_id="bench", model="sonnet-4"):
+        if first is None:
+            first = time.perf_counter() - started
+    return {"first": first or 0.0, "total": time.perf_counter() - started}
+
+
+async def run_case(pool: ClaudeClientPool, project_path: str, args) -> Dict[str, List[float]]:
+    unified_manager.claude_clients = pool
+    cli = ClaudeCodeCLI()
+    timings: Dict[str, List[float]] = {"first_turn": [], "first_turn_total": [], "followup": [], "followup_total": []}
+    for _ in range(args.conversations):
+        # A new conversation: no stored Claude session, no warm client
+        project_sessions.clear_sessions(PROJECT_ID)
+        await pool.discard(PROJECT_ID)
+        for turn in range(args.turns):
+            result = await run_turn(cli, project_path, f"Change number {turn}")
+            key = "first_turn" if turn == 0 else "followup"
+            timings[key].append(result["first"])
+            timings[f"{key}_total"].append(result["total"])
+    await pool.aclose()
+    return timings
+
+
+class SlowConnectClient:
+    """SDK client stand-in whose connect() takes a while; counts connected clients"""
+
+    connected = 0
+
+    def __init__(self, options):
+        self.options = options
+        self.is_connected = False
+
+    async def connect(self) -> None:
+        await asyncio.sleep(0.2)
+        self.is_connected = True
+        SlowConnectClient.connected += 1
+
+    async def disconnect(self) -> None:
+        if self.is_connected:
+            self.is_connected = False
+            SlowConnectClient.connected -= 1
+
+
+async def check_cancel_during_connect() -> bool:
+    """A lease cancelled mid-connect (run cancelled, budget hit) must not leave its client connected"""
+    pool = ClaudeClientPool(enabled=True, max_clients=4, idle_seconds=600, max_rss_mb=0,
+                            client_factory=SlowConnectClient)
+    lease = asyncio.create_task(pool.acquire(PROJECT_ID, None, SimpleNamespace()))
+    await asyncio.sleep(0.05)
+    lease.cancel()
+    await asyncio.gather(lease, return_exceptions=True)
+    await asyncio.sleep(0.3)  # past the end of connect()
+    leaked = SlowConnectClient.connected
+    await pool.aclose()
+    print(f"cancel during connect: {leaked} clients left connected "
+          f"({SlowConnectClient.connected} after pool shutdown)")
+    return leaked == 0 and SlowConnectClient.connected == 0
+
+
+def _ms(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    return f"p50 {statistics.median(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms"
+
+
+def report(name: str, pool: ClaudeClientPool, timings: Dict[str, List[float]]) -> None:
+    print(f"{name}: {pool.stats['cold']} CLI processes started, {pool.stats['warm']} warm turns")
+    print(f"  first turn, first message : {_ms(timings['first_turn'])}")
+    print(f"  first turn, complete      : {_ms(timings['first_turn_total'])}")
+    print(f"  follow-up, first message  : {_ms(timings['followup'])}")
+    print(f"  follow-up, complete       : {_ms(timings['followup_total'])}")
+
+
+async def amain(args) -> bool:
+    project_path = os.path.join(WORK_DIR, "projects", PROJECT_ID, "repo")
+    os.makedirs(project_path, exist_ok=True)
+    setup_database(project_path)
+    install_fake_claude(args.startup, args.resume, args.turn)
+
+    cases = [
+        ("per-instruction client", ClaudeClientPool(enabled=False, max_clients=0, idle_seconds=0, max_rss_mb=0)),
+        ("warm client pool", ClaudeClientPool(enabled=True, max_clients=4, idle_seconds=600, max_rss_mb=0)),
+    ]
+    results = {}
+    for name, pool in cases:
+        output = io.StringIO()
+        redirect = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(output)
+        with redirect:
+            timings = await run_case(pool, project_path, args)
+        report(name, pool, timings)
+        results[name] = timings
+
+    cold = statistics.median(results["per-instruction client"]["followup"] or [0.0])
+    warm = statistics.median(results["warm client pool"]["followup"] or [0.0])
+    if warm:
+        print(f"Follow-up time to first message: {cold * 1000:.1f} ms -> {warm * 1000:.1f} ms ({cold / warm:.1f}x faster)")
+
+    ok = await check_cancel_during_connect()
+    if not ok:
+        print("  FAILED: a client cancelled while connecting was left open")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=5, help="turns per conversation (the first one is always cold)")
+    parser.add_argument("--startup", type=float, default=1.0, help="simulated CLI startup seconds")
+    parser.add_argument("--resume", type=float, default=0.5, help="simulated session resume seconds")
+    parser.add_argument("--turn", type=float, default=0.0, help="simulated model seconds per turn")
+    parser.add_argument("--verbose", action="store_true", help="keep adapter print() output")
+    parser.add_argument("--keep", action="store_true", help=f"keep the scratch directory ({WORK_DIR})")
+    args = parser.parse_args()
+
+    try:
+        ok = asyncio.run(amain(args))
+    finally:
+        if not args.keep:
+            engine.dispose()
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
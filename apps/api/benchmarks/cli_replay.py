@@ -0,0 +1,314 @@
+"""
+CLI stream replay benchmark
+
+Drives UnifiedCLIManager.execute_instruction end to end without the real CLIs:
+
+  claude  recorded SDK messages (transcripts/claude_sdk_*.jsonl) fed through ClaudeCodeCLI's
+          message handlers by an adapter that stands in for ClaudeSDKClient
+  cursor  the unmodified CursorAgentCLI, spawning benchmarks/fake_cli.py installed on PATH as
+          `cursor-agent`, which replays transcripts/cursor_agent_session.jsonl on stdout
+
+Messages are persisted to a throwaway SQLite database and broadcast to in-memory WebSocket sinks.
+Per-item latency is the time the manager spends on each yielded message/delta before asking the
+adapter for the next one (DB write, broadcast, token accounting).
+
+Also a regression check: exits with status 1 when a run fails or yields no messages, or when
+a Cursor replay stores no message_events rows (the raw CLI events behind its messages).
+
+    python -m benchmarks.cli_replay [--cli claude cursor] [--runs 20] [--rate 0] [--sinks 1]
+"""
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database and keep the console quiet
+WORK_DIR = tempfile.mkdtemp(prefix="claudable-replay-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'replay.db')}"
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import stat
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import app.models  # noqa: F401 registers all tables
+from app.core.monitoring import DB_COMMITS, DB_FLUSHES
+from app.core.websocket.manager import manager as ws_manager
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.models.message_events import MessageEvent
+from app.models.projects import Project
+from app.models.sessions import Session
+from app.services.cli.deltas import MessageDelta
+from app.services.cli.unified_manager import CLIType, ClaudeCodeCLI, UnifiedCLIManager
+
+from benchmarks.sdk_dispatch import load_transcripts
+
+
+TRANSCRIPTS_DIR = Path(__file__).parent / "transcripts"
+PROJECT_ID = "replay-project"
+
+
+class ReplayClaudeCLI(ClaudeCodeCLI):
+    """ClaudeCodeCLI whose SDK client is replaced by a recorded message list"""
+
+    def __init__(self, messages: List[Any], rate: float = 0.0):
+        super().__init__()
+        self.messages = messages
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+
+    async def check_availability(self) -> Dict[str, Any]:
+        return {"available": True, "configured": True}
+
+    async def execute_with_streaming(self, instruction: str, project_path: str, session_id: Optional[str] = None,
+                                     log_callback=None, images=None, model: Optional[str] = None,
+                                     is_initial_prompt: bool = False, unified_cli_manager=None):
+        context = {
+            "project_id": PROJECT_ID,
+            "project_path": project_path,
+            "session_id": session_id,
+            "cli_model": model or "claude-sonnet-4-20250514"
+        }
+        # Same loop as ClaudeCodeCLI.execute_with_streaming over client.receive_messages()
+        for message_obj in self.messages:
+            await asyncio.sleep(self.interval)
+            kind = self._dispatcher.classify(message_obj)
+            if kind is None:
+                continue
+            for message in await self._dispatcher.handler(kind)(message_obj, context):
+                yield message
+            if kind in ("ResultMessage", "result"):
+                break
+
+
+class MemoryWebSocket:
+    """WebSocket stand-in that only counts what the manager sends"""
+
+    def __init__(self):
+        self.frames: Dict[str, int] = {}
+        self.bytes = 0
+
+    async def send_text(self, payload: str) -> None:
+        self.bytes += len(payload)
+        frame_type = json.loads(payload).get("type", "unknown")
+        self.frames[frame_type] = self.frames.get(frame_type, 0) + 1
+
+
+def probe_latency(cli, latencies: Dict[str, List[float]]) -> None:
+    """Wrap the adapter's stream to time how long the manager holds each yielded item"""
+    original = cli.execute_with_streaming
+
+    async def execute_with_streaming(*args, **kwargs):
+        stream = original(*args, **kwargs)
+        try:
+            async for item in stream:
+                kind = "delta" if isinstance(item, MessageDelta) else "message"
+                started = time.perf_counter()
+                yield item
+                latencies[kind].append(time.perf_counter() - started)
+        finally:
+            await stream.aclose()
+
+    cli.execute_with_streaming = execute_with_streaming
+
+
+def install_fake_binary(name: str, transcript: Path, rate: float) -> None:
+    bin_dir = Path(WORK_DIR) / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    script = bin_dir / name
+    fake_cli = Path(__file__).parent / "fake_cli.py"
+    script.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_cli}" "$@"\n')
+    script.chmod(script.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["REPLAY_NAME"] = name
+    os.environ["REPLAY_TRANSCRIPT"] = str(transcript)
+    os.environ["REPLAY_RATE"] = str(rate)
+
+
+def setup_database(project_path: str) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.get(Project, PROJECT_ID) is None:
+            db.add(Project(id=PROJECT_ID, name="Replay benchmark", repo_path=project_path))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def run_once(cli_type: CLIType, project_path: str, args, latencies: Dict[str, List[float]],
+                   claude_messages: List[Any]) -> Dict[str, Any]:
+    db = SessionLocal()
+    session_id = str(uuid.uuid4())
+    db.add(Session(id=session_id, project_id=PROJECT_ID, status="active", cli_type=cli_type.value))
+    db.commit()
+    try:
+        cli_manager = UnifiedCLIManager(
+            project_id=PROJECT_ID,
+            project_path=project_path,
+            session_id=session_id,
+            conversation_id=str(uuid.uuid4()),
+            db=db
+        )
+        if cli_type == CLIType.CLAUDE:
+            cli_manager.cli_adapters[CLIType.CLAUDE] = ReplayClaudeCLI(claude_messages, args.rate)
+        probe_latency(cli_manager.cli_adapters[cli_type], latencies)
+
+        output = io.StringIO()
+        redirect = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(output)
+        with redirect:
+            return await cli_manager.execute_instruction(instruction="Add a dark mode toggle", cli_type=cli_type)
+    finally:
+        db.close()
+
+
+async def run_case(cli_type: CLIType, project_path: str, args, claude_messages: List[Any]) -> Dict[str, Any]:
+    sinks = [MemoryWebSocket() for _ in range(args.sinks)]
+    ws_manager.active_connections[PROJECT_ID] = list(sinks)
+    latencies: Dict[str, List[float]] = {"message": [], "delta": []}
+
+    # Warm-up run (imports, SQLite file creation, statement caches)
+    await run_once(cli_type, project_path, args, {"message": [], "delta": []}, claude_messages)
+    for sink in sinks:
+        sink.frames.clear()
+        sink.bytes = 0
+
+    commits, flushes = DB_COMMITS.value(), DB_FLUSHES.value()
+    raw_events = count_raw_events()
+    blocks = sys.getallocatedblocks()
+    failures = 0
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        result = await run_once(cli_type, project_path, args, latencies, claude_messages)
+        failures += 0 if result.get("success") else 1
+    elapsed = time.perf_counter() - started
+    retained_blocks = sys.getallocatedblocks() - blocks
+
+    commits, flushes = DB_COMMITS.value() - commits, DB_FLUSHES.value() - flushes
+    raw_events = count_raw_events() - raw_events
+
+    # Separate pass under tracemalloc, which would otherwise skew the timings
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    await run_once(cli_type, project_path, args, {"message": [], "delta": []}, claude_messages)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ws_manager.active_connections.pop(PROJECT_ID, None)
+    messages = len(latencies["message"])
+    return {
+        "runs": args.runs,
+        "failures": failures,
+        "messages": messages,
+        "deltas": len(latencies["delta"]),
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "db_commits": commits,
+        "db_flushes": flushes,
+        "raw_events": raw_events,
+        "ws_frames": sinks[0].frames,
+        "ws_bytes": sinks[0].bytes,
+        "retained_blocks": retained_blocks,
+        "peak_kib": (peak - baseline) / 1024,
+        "retained_kib": (current - baseline) / 1024,
+    }
+
+
+def count_raw_events() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(MessageEvent).count()
+    finally:
+        db.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(cli_type: CLIType, stats: Dict[str, Any]) -> None:
+    messages, deltas = stats["messages"], stats["deltas"]
+    print(f"{cli_type.value}: {stats['runs']} runs, {messages} messages + {deltas} deltas "
+          f"in {stats['elapsed']:.2f}s ({stats['failures']} failed runs)")
+    print(f"  throughput      : {(messages + deltas) / stats['elapsed']:9.1f} items/s, "
+          f"{messages / stats['elapsed']:9.1f} messages/s")
+    for kind in ("message", "delta"):
+        values = stats["latencies"][kind]
+        if values:
+            print(f"  {kind + ' latency':<16}: p50 {statistics.median(values) * 1000:7.3f} ms   "
+                  f"p99 {_percentile(values, 0.99) * 1000:7.3f} ms   max {max(values) * 1000:7.3f} ms")
+    per_message = stats["db_commits"] / messages if messages else 0
+    print(f"  db              : {stats['db_commits']} commits ({per_message:.2f}/message), {stats['db_flushes']} flushes, "
+          f"{stats['raw_events']} raw events stored")
+    frames = ", ".join(f"{name}={count}" for name, count in sorted(stats["ws_frames"].items()))
+    print(f"  websocket       : {frames or 'none'} ({stats['ws_bytes'] / 1024:.1f} KiB per sink)")
+    print(f"  allocations     : peak {stats['peak_kib']:.1f} KiB, retained {stats['retained_kib']:.1f} KiB per run; "
+          f"{stats['retained_blocks']} blocks retained over all runs")
+
+
+def problems(cli_type: CLIType, stats: Dict[str, Any]) -> List[str]:
+    found = []
+    if stats["failures"]:
+        found.append(f"{stats['failures']} of {stats['runs']} runs failed")
+    if not stats["messages"]:
+        found.append("no messages were persisted")
+    # Cursor messages keep their stream-json event; none stored means the side-table insert failed
+    if cli_type == CLIType.CURSOR and stats["messages"] and not stats["raw_events"]:
+        found.append(f"no raw events stored for {stats['messages']} messages")
+    return found
+
+
+async def amain(args) -> bool:
+    project_path = os.path.join(WORK_DIR, "projects", PROJECT_ID, "repo")
+    os.makedirs(project_path, exist_ok=True)
+    setup_database(project_path)
+
+    claude_paths = sorted(TRANSCRIPTS_DIR.glob("claude_sdk_*.jsonl"))
+    claude_messages = load_transcripts(claude_paths)
+    install_fake_binary("cursor-agent", TRANSCRIPTS_DIR / "cursor_agent_session.jsonl", args.rate)
+
+    ok = True
+    for name in args.cli:
+        cli_type = CLIType(name)
+        stats = await run_case(cli_type, project_path, args, claude_messages)
+        report(cli_type, stats)
+        for problem in problems(cli_type, stats):
+            print(f"  FAILED          : {problem}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cli", nargs="+", default=["claude", "cursor"], choices=["claude", "cursor"])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0.0, help="transcript items per second (0 = unthrottled)")
+    parser.add_argument("--sinks", type=int, default=1, help="WebSocket connections on the project")
+    parser.add_argument("--verbose", action="store_true", help="keep adapter print() output")
+    parser.add_argument("--keep", action="store_true", help=f"keep the scratch directory ({WORK_DIR})")
+    args = parser.parse_args()
+
+    try:
+        ok = asyncio.run(amain(args))
+    finally:
+        if not args.keep:
+            engine.dispose()
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
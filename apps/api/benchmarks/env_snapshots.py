@@ -0,0 +1,133 @@
+"""
+Env var snapshot benchmark
+
+Creates a project with --vars encrypted env vars in a scratch database and compares the
+previous per-request decryption (load every row, decrypt every value; sync decrypting every
+existing value to compare) with the cached snapshot path in app.services.env_manager.
+
+    python -m benchmarks.env_snapshots [--vars 500] [--iterations 50] [--changed 10]
+"""
+import os
+import tempfile
+
+# Settings are read at import time: scratch database and projects root
+WORK_DIR = tempfile.mkdtemp(prefix="claudable-env-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'env.db')}"
+os.environ["PROJECTS_ROOT"] = os.path.join(WORK_DIR, "projects")
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+import argparse
+import shutil
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import app.models  # noqa: F401 registers all tables
+from app.core.crypto import secret_box
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.models.env_vars import EnvVar
+from app.models.projects import Project
+from app.services import env_manager
+from app.services.env_manager import env_snapshots
+
+
+PROJECT_ID = "env-benchmark"
+
+
+def legacy_load(db, project_id: str) -> Dict[str, str]:
+    """load_env_vars_from_db as it was: decrypt every row on every call"""
+    return {
+        env_var.key: secret_box.decrypt(env_var.value_encrypted)
+        for env_var in db.query(EnvVar).filter(EnvVar.project_id == project_id).all()
+    }
+
+
+def legacy_sync_compare(db, project_id: str, file_vars: Dict[str, str]) -> int:
+    """The comparison half of the previous sync_env_file_to_db (decrypt each existing value)"""
+    changed = 0
+    for env_var in db.query(EnvVar).filter(EnvVar.project_id == project_id).all():
+        if env_var.key in file_vars and secret_box.decrypt(env_var.value_encrypted) != file_vars[env_var.key]:
+            changed += 1
+    return changed
+
+
+def timed(fn: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def line(label: str, samples: List[float]) -> None:
+    print(f"  {label:<34}: median {statistics.median(samples) * 1000:8.3f} ms   max {max(samples) * 1000:8.3f} ms")
+
+
+def setup(count: int) -> Dict[str, str]:
+    Base.metadata.create_all(bind=engine)
+    values = {f"VAR_{index:04d}": f"value-{index}-{uuid.uuid4().hex}" for index in range(count)}
+    db = SessionLocal()
+    try:
+        db.add(Project(id=PROJECT_ID, name="Env benchmark"))
+        for key, value in values.items():
+            db.add(EnvVar(id=str(uuid.uuid4()), project_id=PROJECT_ID, key=key,
+                          value_encrypted=secret_box.encrypt(value)))
+        db.commit()
+    finally:
+        db.close()
+    return values
+
+
+def run(args) -> None:
+    values = setup(args.vars)
+    env_path = env_manager.get_project_env_path(PROJECT_ID)
+    db = SessionLocal()
+    try:
+        print(f"{args.vars} env vars, {args.iterations} iterations")
+
+        line("load (decrypt every row)", timed(lambda: legacy_load(db, PROJECT_ID), args.iterations))
+        env_snapshots.discard(PROJECT_ID)
+        line("load (snapshot, cold)", timed(lambda: env_manager.load_env_vars_from_db(db, PROJECT_ID), 1))
+        line("load (snapshot, warm)", timed(lambda: env_manager.load_env_vars_from_db(db, PROJECT_ID), args.iterations))
+
+        env_manager.write_env_file(env_path, values)
+        line("sync compare (decrypt every row)", timed(lambda: legacy_sync_compare(db, PROJECT_ID, values), args.iterations))
+        line("sync file->db, unchanged", timed(lambda: env_manager.sync_env_file_to_db(db, PROJECT_ID), args.iterations))
+
+        changed = dict(values)
+        for key in list(changed)[:args.changed]:
+            changed[key] += "-changed"
+        env_manager.write_env_file(env_path, changed)
+        decryptions = env_snapshots.decryptions
+        started = time.perf_counter()
+        synced = env_manager.sync_env_file_to_db(db, PROJECT_ID)
+        elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        env_manager.load_env_vars_from_db(db, PROJECT_ID)
+        rebuild = time.perf_counter() - started
+        print(f"  {f'sync file->db, {args.changed} changed':<34}: {elapsed * 1000:8.3f} ms, {synced} re-encrypted")
+        print(f"  {'snapshot rebuild after the sync':<34}: {rebuild * 1000:8.3f} ms, "
+              f"{env_snapshots.decryptions - decryptions} values decrypted")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vars", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--changed", type=int, default=10, help="values changed in the .env file for the last sync")
+    args = parser.parse_args()
+
+    try:
+        run(args)
+    finally:
+        engine.dispose()
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Stand-in for the Claude Code CLI in SDK streaming mode (--input-format stream-json)
+
+Installed on PATH as `claude` by benchmarks.claude_followup. Answers the SDK's control requests
+(initialize, interrupt) and replies to every user message on stdin with a system init, an
+assistant text message and a result, all in one session, like the real CLI keeping a
+conversation open. Process startup and session resume costs are simulated through:
+
+    FAKE_CLAUDE_STARTUP_SECONDS  delay before the first line is read
+    FAKE_CLAUDE_RESUME_SECONDS   extra delay when started with --continue / --resume
+    FAKE_CLAUDE_TURN_SECONDS     delay before each reply
+"""
+import json
+import os
+import sys
+import time
+import uuid
+
+
+def _write(record) -> None:
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if "-h" in args or "--help" in args:
+        sys.stdout.write("Usage: claude [options] (benchmark stand-in)\n")
+        return 0
+
+    delay = float(os.environ.get("FAKE_CLAUDE_STARTUP_SECONDS", "0") or 0)
+    session_id = str(uuid.uuid4())
+    if "--resume" in args:
+        session_id = args[args.index("--resume") + 1]
+    if "--resume" in args or "--continue" in args:
+        delay += float(os.environ.get("FAKE_CLAUDE_RESUME_SECONDS", "0") or 0)
+    model = args[args.index("--model") + 1] if "--model" in args else "claude-sonnet-4-20250514"
+    turn_delay = float(os.environ.get("FAKE_CLAUDE_TURN_SECONDS", "0") or 0)
+    time.sleep(delay)
+
+    turns = 0
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if message.get("type") == "control_request":
+            _write({
+                "type": "control_response",
+                "response": {"subtype": "success", "request_id": message["request_id"], "response": {}}
+            })
+            continue
+        if message.get("type") != "user":
+            continue
+
+        turns += 1
+        started = time.perf_counter()
+        time.sleep(turn_delay)
+        _write({"type": "system", "subtype": "init", "session_id": session_id, "model": model})
+        _write({
+            "type": "assistant",
+            "message": {"model": model, "content": [{"type": "text", "text": f"Done with turn {turns}."}]},
+            "parent_tool_use_id": None
+        })
+        _write({
+            "type": "result",
+            "subtype": "success",
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+            "duration_api_ms": 0,
+            "is_error": False,
+            "num_turns": turns,
+            "session_id": session_id,
+            "total_cost_usd": 0.0,
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+Stand-in for a CLI binary that replays a recorded NDJSON transcript on stdout
+
+Installed on PATH under the real binary name (e.g. cursor-agent) by benchmarks.cli_replay, so the
+adapter's own subprocess/framing/parsing path runs unchanged. Configured through the environment:
+
+    REPLAY_TRANSCRIPT  NDJSON file to replay
+    REPLAY_RATE        lines per second (0 = as fast as possible)
+    REPLAY_NAME        name printed for -h (availability checks look for it)
+"""
+import os
+import sys
+import time
+
+
+def main() -> int:
+    name = os.environ.get("REPLAY_NAME", "fake-cli")
+    if "-h" in sys.argv[1:] or "--help" in sys.argv[1:]:
+        sys.stdout.write(f"Usage: {name} [options] (transcript replay)\n")
+        return 0
+
+    rate = float(os.environ.get("REPLAY_RATE", "0") or 0)
+    interval = 1.0 / rate if rate > 0 else 0.0
+    out = sys.stdout.buffer
+    next_at = time.perf_counter()
+    with open(os.environ["REPLAY_TRANSCRIPT"], "rb") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            out.write(line if line.endswith(b"\n") else line + b"\n")
+            out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Event-loop lag benchmark for terminal logging
+
+Streams synthetic CLI messages on the event loop, logging one info and several debug lines per
+message (the pattern of the streaming loop and model lookups), while a ticker task measures how
+late its wake-ups are. The previous synchronous Rich console path is compared with the queued
+TerminalUI at level "info". The sink simulates a slow terminal/pipe by sleeping on every flush.
+
+    python -m benchmarks.logging_lag [--messages 5000] [--flush-latency-us 200]
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from rich.console import Console
+from rich.text import Text
+
+from app.core.terminal_ui import TerminalUI
+
+
+class SlowSink(io.TextIOBase):
+    """Discards output but blocks for a fixed time per flush, like a busy terminal"""
+
+    def __init__(self, flush_latency: float):
+        self.flush_latency = flush_latency
+        self.bytes_written = 0
+
+    def write(self, data: str) -> int:
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        if self.flush_latency:
+            time.sleep(self.flush_latency)
+
+    def isatty(self) -> bool:
+        return True
+
+
+class LegacyUI:
+    """The previous TerminalUI.log: format and print every level synchronously"""
+
+    def __init__(self, stream):
+        self.console = Console(file=stream, force_terminal=True)
+
+    def _log(self, prefix: str, style: str, message: str, component: Optional[str]):
+        formatted_message = f"{prefix} [{component}] {message}" if component else f"{prefix} {message}"
+        self.console.print(Text(formatted_message, style=style))
+
+    def info(self, message: str, component: Optional[str] = None):
+        self._log("[INFO]", "white", message, component)
+
+    def debug(self, message: str, component: Optional[str] = None):
+        self._log("[DEBUG]", "dim cyan", message, component)
+
+
+async def _ticker(interval: float, lags: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _stream(ui, messages: int, debug_lines: int):
+    for index in range(messages):
+        ui.info(f"Read apps/web/components/Component{index % 50}.tsx", "Claude SDK")
+        for line in range(debug_lines):
+            ui.debug(f"Input model: 'claude-sonnet-4' for CLI: claude ({index}/{line})", "Model")
+        if index % 10 == 0:
+            await asyncio.sleep(0)
+
+
+async def run_case(ui, messages: int, debug_lines: int, interval: float) -> Dict[str, float]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(interval, lags, stop))
+    await asyncio.sleep(interval * 2)
+
+    started = time.perf_counter()
+    await _stream(ui, messages, debug_lines)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    lags.sort()
+    return {
+        "elapsed_ms": elapsed * 1000,
+        "p50_ms": statistics.median(lags) * 1000 if lags else 0.0,
+        "p99_ms": lags[int(len(lags) * 0.99) - 1] * 1000 if lags else 0.0,
+        "max_ms": lags[-1] * 1000 if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--debug-lines", type=int, default=3)
+    parser.add_argument("--flush-latency-us", type=int, default=200)
+    parser.add_argument("--tick-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    latency = args.flush_latency_us / 1e6
+    interval = args.tick_ms / 1000
+
+    legacy = asyncio.run(run_case(LegacyUI(SlowSink(latency)), args.messages, args.debug_lines, interval))
+
+    queued_ui = TerminalUI(level="info", output_format="rich", stream=SlowSink(latency))
+    queued = asyncio.run(run_case(queued_ui, args.messages, args.debug_lines, interval))
+    drain_started = time.perf_counter()
+    queued_ui.close(timeout=None)
+    drain = time.perf_counter() - drain_started
+
+    print(f"{args.messages} messages, {args.debug_lines} debug lines each, {args.flush_latency_us} us per flush")
+    print(f"{'':24} {'loop time':>10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for name, result in (("synchronous Rich", legacy), ("queued TerminalUI", queued)):
+        print(
+            f"{name:24} {result['elapsed_ms']:8.1f}ms {result['p50_ms']:7.2f}ms "
+            f"{result['p99_ms']:7.2f}ms {result['max_ms']:7.2f}ms"
+        )
+    print(f"queued writer drained the backlog {drain * 1000:.1f} ms after the stream ended "
+          f"({queued_ui.dropped} messages dropped)")
+
+
+if __name__ == "__main__":
+    main()
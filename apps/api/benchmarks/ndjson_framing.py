@@ -0,0 +1,88 @@
+"""
+CLI output framing benchmark
+
+Feeds multi-megabyte stdout captures in 64 KiB chunks through the previous str-buffer splitter
+(`buffer += chunk; buffer.split('\\n', 1)`) and through NDJSONFramer.
+
+    python -m benchmarks.ndjson_framing [--megabytes 8]
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from app.services.cli.ndjson import READ_CHUNK_SIZE, NDJSONFramer
+
+
+def legacy_frame(chunks: List[bytes]) -> List[str]:
+    lines = []
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk.decode(errors="replace")
+        while '\n' in buffer:
+            line, buffer = buffer.split('\n', 1)
+            lines.append(line)
+    if buffer:
+        lines.append(buffer)
+    return lines
+
+
+def framer_frame(chunks: List[bytes]) -> List[str]:
+    framer = NDJSONFramer(max_line_bytes=1 << 30)
+    lines = []
+    for chunk in chunks:
+        lines.extend(framer.feed(chunk))
+    lines.extend(framer.close())
+    return lines
+
+
+def _chunks(data: bytes) -> List[bytes]:
+    return [data[i:i + READ_CHUNK_SIZE] for i in range(0, len(data), READ_CHUNK_SIZE)]
+
+
+def build_cases(megabytes: int) -> Dict[str, bytes]:
+    size = megabytes * 1024 * 1024
+    event = json.dumps({
+        "type": "tool_call",
+        "subtype": "completed",
+        "tool_call": {"readToolCall": {"result": {"success": {"content": "x" * 120}}}}
+    }).encode() + b"\n"
+    return {
+        "single long JSON line": json.dumps({"type": "assistant", "text": "a" * size}).encode() + b"\n",
+        "short NDJSON events": event * (size // len(event)),
+        # Multi-byte characters straddle chunk boundaries
+        "multi-byte text lines": ("안녕하세요 🌏 " * 40 + "\n").encode() * (size // 1200),
+    }
+
+
+def _time(fn: Callable[[], List[str]]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, default=8)
+    args = parser.parse_args()
+
+    for name, data in build_cases(args.megabytes).items():
+        chunks = _chunks(data)
+        expected = data.decode().split("\n")
+        if expected and expected[-1] == "":
+            expected.pop()
+
+        framed = framer_frame(chunks)
+        if framed != expected:
+            raise SystemExit(f"{name}: framer output differs from the reference split")
+        legacy_exact = legacy_frame(chunks) == expected
+
+        legacy = _time(lambda: legacy_frame(chunks))
+        framer = _time(lambda: framer_frame(chunks))
+        print(f"{name} ({len(data) / 1048576:.1f} MiB, {len(expected)} lines)")
+        print(f"  legacy str buffer : {legacy * 1000:9.1f} ms{'' if legacy_exact else '  (corrupted multi-byte text)'}")
+        print(f"  NDJSONFramer      : {framer * 1000:9.1f} ms  ({legacy / framer:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
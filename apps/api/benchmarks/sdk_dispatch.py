@@ -0,0 +1,157 @@
+"""
+SDK message dispatch benchmark
+
+Replays recorded Claude SDK transcripts through the legacy per-message classification
+(re-importing SDK types and matching on str(type(...))) and through MessageDispatcher.
+
+    python -m benchmarks.sdk_dispatch [--iterations 2000] [transcript.jsonl ...]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.services.cli.dispatch import CLAUDE_SDK_TYPE_NAMES, MessageDispatcher, load_claude_sdk_types
+
+
+TRANSCRIPTS_DIR = Path(__file__).parent / "transcripts"
+
+
+def _build_classes() -> Dict[str, type]:
+    """Real SDK classes when installed, otherwise same-named stand-ins"""
+    classes = load_claude_sdk_types()
+    for name in CLAUDE_SDK_TYPE_NAMES:
+        if name not in classes:
+            classes[name] = type(name, (), {"__init__": lambda self, **fields: self.__dict__.update(fields)})
+    return classes
+
+
+def _materialize(record: Dict[str, Any], classes: Dict[str, type]) -> Any:
+    fields = dict(record.get("fields", {}))
+    if isinstance(fields.get("content"), list):
+        fields["content"] = [_materialize({"type": block.pop("type"), "fields": block}, classes)
+                             for block in (dict(item) for item in fields["content"])]
+    cls = classes[record["type"]]
+    try:
+        return cls(**fields)
+    except TypeError:
+        # SDK dataclass signatures drift between releases; fall back to attribute assignment
+        obj = cls.__new__(cls)
+        obj.__dict__.update(fields)
+        return obj
+
+
+def load_transcripts(paths: List[Path]) -> List[Any]:
+    classes = _build_classes()
+    messages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as fh:
+            messages.extend(_materialize(json.loads(line), classes) for line in fh if line.strip())
+    return messages
+
+
+def legacy_classify(messages: List[Any]) -> int:
+    """Per-message classification as previously done in ClaudeCodeCLI.execute_with_streaming"""
+    handled = 0
+    for message_obj in messages:
+        try:
+            from anthropic.claude_code.types import SystemMessage, AssistantMessage, UserMessage, ResultMessage
+        except ImportError:
+            try:
+                from claude_code_sdk.types import SystemMessage, AssistantMessage, UserMessage, ResultMessage
+            except ImportError:
+                SystemMessage = type(None)
+                AssistantMessage = type(None)
+                UserMessage = type(None)
+                ResultMessage = type(None)
+
+        if isinstance(message_obj, SystemMessage) or 'SystemMessage' in str(type(message_obj)):
+            handled += 1
+        elif isinstance(message_obj, AssistantMessage) or 'AssistantMessage' in str(type(message_obj)):
+            for block in getattr(message_obj, "content", []):
+                try:
+                    from claude_code_sdk.types import TextBlock, ToolUseBlock, ToolResultBlock
+                except ImportError:
+                    TextBlock = ToolUseBlock = ToolResultBlock = type(None)
+                if isinstance(block, TextBlock) or 'TextBlock' in str(type(block)):
+                    handled += 1
+                elif isinstance(block, ToolUseBlock) or 'ToolUseBlock' in str(type(block)):
+                    handled += 1
+            handled += 1
+        elif isinstance(message_obj, UserMessage) or 'UserMessage' in str(type(message_obj)):
+            handled += 1
+        elif (
+            isinstance(message_obj, ResultMessage) or
+            'ResultMessage' in str(type(message_obj)) or
+            getattr(message_obj, 'type', None) == 'result'
+        ):
+            handled += 1
+    return handled
+
+
+def build_dispatcher() -> MessageDispatcher:
+    count = lambda obj, *args: 1
+    blocks = MessageDispatcher()
+    for name in ("TextBlock", "ToolUseBlock", "ToolResultBlock"):
+        blocks.register(name, count)
+    blocks.bind_types(load_claude_sdk_types().values())
+
+    def assistant(obj, *args):
+        handled = 1
+        for block in getattr(obj, "content", []):
+            if blocks.classify(block) in ("TextBlock", "ToolUseBlock"):
+                handled += 1
+        return handled
+
+    dispatcher = MessageDispatcher()
+    dispatcher.register("SystemMessage", count)
+    dispatcher.register("AssistantMessage", assistant)
+    dispatcher.register("UserMessage", count)
+    dispatcher.register("ResultMessage", count)
+    dispatcher.register("result", count)
+    dispatcher.bind_types(load_claude_sdk_types().values())
+    return dispatcher
+
+
+def table_classify(dispatcher: MessageDispatcher, messages: List[Any]) -> int:
+    handled = 0
+    for message_obj in messages:
+        handled += dispatcher.dispatch(message_obj) or 0
+    return handled
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("transcripts", nargs="*", type=Path)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    paths = args.transcripts or sorted(TRANSCRIPTS_DIR.glob("claude_sdk_*.jsonl"))
+    messages = load_transcripts(paths)
+    dispatcher = build_dispatcher()
+
+    legacy_count = legacy_classify(messages)
+    table_count = table_classify(dispatcher, messages)
+    if legacy_count != table_count:
+        raise SystemExit(f"Classification mismatch: legacy={legacy_count} table={table_count}")
+
+    total = len(messages) * args.iterations
+    legacy = _time(lambda: legacy_classify(messages), args.iterations)
+    table = _time(lambda: table_classify(dispatcher, messages), args.iterations)
+
+    print(f"Replayed {len(messages)} messages from {len(paths)} transcript(s) x {args.iterations}")
+    print(f"  legacy imports + str(type) : {legacy / total * 1e6:8.2f} us/msg")
+    print(f"  MessageDispatcher          : {table / total * 1e6:8.2f} us/msg")
+    print(f"  speedup                    : {legacy / table:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
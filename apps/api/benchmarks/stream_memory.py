@@ -0,0 +1,158 @@
+"""
+Streaming memory benchmark
+
+Replays the recorded Claude SDK session through UnifiedCLIManager.execute_instruction, looping
+its assistant/tool turns until the run has produced --messages persisted messages (10k by
+default), and samples tracemalloc while the run is in flight. Memory that grows linearly with
+the message count shows up as a non-zero bytes/message slope.
+
+    python -m benchmarks.stream_memory [--messages 10000] [--samples 10]
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import os
+import shutil
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+# Imported first: cli_replay points the app at a scratch database before settings load
+from benchmarks.cli_replay import (
+    PROJECT_ID, TRANSCRIPTS_DIR, WORK_DIR, MemoryWebSocket, ReplayClaudeCLI, setup_database
+)
+from benchmarks.sdk_dispatch import load_transcripts
+
+from app.core.websocket.manager import manager as ws_manager
+from app.db.session import SessionLocal, engine
+from app.models.sessions import Session
+from app.services.cli.deltas import MessageDelta
+from app.services.cli.unified_manager import CLIType, UnifiedCLIManager
+
+
+class LoopingReplayCLI(ReplayClaudeCLI):
+    """Replays the transcript's middle turns over and over until `target` messages were yielded"""
+
+    def __init__(self, messages: List[Any], target: int):
+        super().__init__(messages)
+        self.target = target
+        self.samples: List[Tuple[int, int]] = []
+        self.sample_every = 0
+
+    async def execute_with_streaming(self, instruction: str, project_path: str, session_id: Optional[str] = None,
+                                     log_callback=None, images=None, model: Optional[str] = None,
+                                     is_initial_prompt: bool = False, unified_cli_manager=None):
+        context = {
+            "project_id": PROJECT_ID,
+            "project_path": project_path,
+            "session_id": session_id,
+            "cli_model": model or "claude-sonnet-4-20250514"
+        }
+        kinds = [self._dispatcher.classify(message_obj) for message_obj in self.messages]
+        head = [m for m, kind in zip(self.messages, kinds) if kind == "SystemMessage"]
+        body = [m for m, kind in zip(self.messages, kinds) if kind not in (None, "SystemMessage", "ResultMessage")]
+        tail = [m for m, kind in zip(self.messages, kinds) if kind == "ResultMessage"]
+
+        yielded = 0
+
+        def turns():
+            yield from head
+            while yielded < self.target:
+                yield from body
+            yield from tail
+
+        for message_obj in turns():
+            kind = self._dispatcher.classify(message_obj)
+            for message in await self._dispatcher.handler(kind)(message_obj, context):
+                if not isinstance(message, MessageDelta):
+                    yielded += 1
+                    if self.sample_every and yielded % self.sample_every == 0:
+                        # Sampled before handing the message over, so only retained state is counted
+                        gc.collect()
+                        self.samples.append((yielded, tracemalloc.get_traced_memory()[0]))
+                yield message
+
+
+async def run(args) -> Dict[str, Any]:
+    project_path = os.path.join(WORK_DIR, "projects", PROJECT_ID, "repo")
+    os.makedirs(project_path, exist_ok=True)
+    setup_database(project_path)
+    messages = load_transcripts(sorted(TRANSCRIPTS_DIR.glob("claude_sdk_*.jsonl")))
+
+    sink = MemoryWebSocket()
+    ws_manager.active_connections[PROJECT_ID] = [sink]
+    db = SessionLocal()
+    session_id = str(uuid.uuid4())
+    db.add(Session(id=session_id, project_id=PROJECT_ID, status="active", cli_type=CLIType.CLAUDE.value))
+    db.commit()
+    try:
+        cli_manager = UnifiedCLIManager(
+            project_id=PROJECT_ID,
+            project_path=project_path,
+            session_id=session_id,
+            conversation_id=str(uuid.uuid4()),
+            db=db
+        )
+        cli = LoopingReplayCLI(messages, args.messages)
+        cli.sample_every = max(1, args.messages // args.samples)
+        cli_manager.cli_adapters[CLIType.CLAUDE] = cli
+
+        gc.collect()
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await cli_manager.execute_instruction(instruction="Add a dark mode toggle", cli_type=CLIType.CLAUDE)
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        identity_map = len(db.identity_map)
+    finally:
+        db.close()
+        ws_manager.active_connections.pop(PROJECT_ID, None)
+
+    return {
+        "result": result,
+        "elapsed": elapsed,
+        "baseline": baseline,
+        "samples": cli.samples,
+        "retained": current - baseline,
+        "peak": peak - baseline,
+        "identity_map": identity_map,
+    }
+
+
+def report(stats: Dict[str, Any]) -> None:
+    result, samples, baseline = stats["result"], stats["samples"], stats["baseline"]
+    print(f"{result.get('messages_count')} messages in {stats['elapsed']:.1f}s (success={result.get('success')})")
+    for count, traced in samples:
+        print(f"  after {count:>6} messages: {(traced - baseline) / 1024:9.1f} KiB traced")
+    if len(samples) >= 2:
+        (first_count, first), (last_count, last) = samples[0], samples[-1]
+        slope = (last - first) / (last_count - first_count)
+        print(f"  growth          : {slope:9.1f} bytes/message")
+    print(f"  peak            : {stats['peak'] / 1024:9.1f} KiB")
+    print(f"  retained at end : {stats['retained'] / 1024:9.1f} KiB, {stats['identity_map']} objects in the session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--samples", type=int, default=10, help="memory samples taken during the run")
+    parser.add_argument("--keep", action="store_true", help=f"keep the scratch directory ({WORK_DIR})")
+    args = parser.parse_args()
+
+    try:
+        report(asyncio.run(run(args)))
+    finally:
+        if not args.keep:
+            engine.dispose()
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
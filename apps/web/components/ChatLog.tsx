@@ -171,11 +171,44 @@ export default function ChatLog({ projectId, onSessionStatusChange, onProjectSta
       }
       
       setMessages(prev => {
-        const exists = prev.some(msg => msg.id === chatMessage.id);
-        if (exists) {
+        const index = prev.findIndex(msg => msg.id === chatMessage.id);
+        if (index === -1) {
+          return [...prev, chatMessage];
+        }
+        // Final version of a message that was streamed with message_delta frames
+        if (prev[index].metadata_json?.streaming) {
+          const next = [...prev];
+          next[index] = chatMessage;
+          return next;
+        }
+        return prev;
+      });
+    },
+    onMessageDelta: (delta) => {
+      setIsWaitingForResponse(false);
+      
+      setMessages(prev => {
+        const index = prev.findIndex(msg => msg.id === delta.id);
+        if (index === -1) {
+          return [...prev, {
+            id: delta.id,
+            role: delta.role as ChatMessage['role'],
+            message_type: delta.message_type as ChatMessage['message_type'],
+            content: delta.delta,
+            metadata_json: { streaming: true },
+            session_id: delta.session_id,
+            conversation_id: delta.conversation_id,
+            created_at: new Date().toISOString()
+          }];
+        }
+        const existing = prev[index];
+        if (!existing.metadata_json?.streaming) {
+          // The persisted message already replaced the streaming one
           return prev;
         }
-        return [...prev, chatMessage];
+        const next = [...prev];
+        next[index] = { ...existing, content: existing.content + delta.delta };
+        return next;
       });
     },
     onStatus: (status, data) => {
@@ -5,9 +5,20 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
 import { Message } from '@/types/chat';
 
+export interface MessageDelta {
+  id: string;
+  seq: number;
+  delta: string;
+  role: string;
+  message_type: string;
+  session_id?: string;
+  conversation_id?: string;
+}
+
 interface WebSocketOptions {
   projectId: string;
   onMessage?: (message: Message) => void;
+  onMessageDelta?: (delta: MessageDelta) => void;
   onStatus?: (status: string, data?: any, requestId?: string) => void;
   onConnect?: () => void;
   onDisconnect?: () => void;
@@ -17,6 +28,7 @@ interface WebSocketOptions {
 export function useWebSocket({
   projectId,
   onMessage,
+  onMessageDelta,
   onStatus,
   onConnect,
   onDisconnect,
@@ -59,6 +71,8 @@ export function useWebSocket({
           
           if (data.type === 'message' && onMessage && data.data) {
             onMessage(data.data);
+          } else if (data.type === 'message_delta' && onMessageDelta && data.data) {
+            onMessageDelta(data.data);
           } else if (data.type === 'preview_error' && onMessage) {
             onMessage(data);
           } else if (data.type === 'preview_success' && onMessage) {
@@ -73,6 +87,8 @@ export function useWebSocket({
             onStatus('act_complete', data.data, data.data?.request_id);
           } else if (data.type === 'chat_complete' && onStatus) {
             onStatus('chat_complete', data.data, data.data?.request_id);
+          } else if (data.type === 'queue_update' && onStatus) {
+            onStatus('queue_update', data.data);
           } else {
           }
         } catch (error) {
@@ -110,7 +126,7 @@ export function useWebSocket({
       console.error('Failed to create WebSocket connection:', error);
       onError?.(error as Error);
     }
-  }, [projectId, onMessage, onStatus, onConnect, onDisconnect, onError]);
+  }, [projectId, onMessage, onMessageDelta, onStatus, onConnect, onDisconnect, onError]);
 
   const disconnect = useCallback(() => {
     shouldReconnectRef.current = false;